@@ -5,8 +5,7 @@ import tkinter as tk
 from settings import open_settings_window
 from models import app_context, command_queue, esp32_status, stopped, pipeline
 from enums import ConnectionState
-from lib.spectralcam.gentl import GCDevice, GCInterface, GCSystem
-from typing import Tuple
+from typing import Tuple, TYPE_CHECKING
 from models import app_context, camera_data
 import time
 import subprocess
@@ -14,6 +13,10 @@ from calibration import open_calibration_window
 import threading
 from time import sleep
 
+# The camera library is imported by camera_connector on first connection, not at app startup
+if TYPE_CHECKING:
+    from lib.spectralcam.gentl import GCDevice, GCInterface, GCSystem
+
 def start_pca_app():
     subprocess.Popen(['python', 'pca.py'])
 
@@ -150,7 +153,7 @@ def run_app():
             case ConnectionState.CONNECTING:
                 status = "Connecting..."
             case ConnectionState.CONNECTED:
-                cam: GCDevice = app_context["camera_data"]["cam"]
+                cam: "GCDevice" = app_context["camera_data"]["cam"]
                 ip = cam._info.host_address
                 status = f"Connected to {ip}"
         cam_connection_label.config(text=f"Connection status: {status}")
@@ -165,11 +168,11 @@ def run_app():
         logging.info("destroy")
         window.destroy()
         if (camera_data["system"]):
-            system: GCSystem = camera_data["system"]
+            system: "GCSystem" = camera_data["system"]
             system.close()
         exit()
 
-    def cam_event(event: event_handler.Events, args: Tuple[GCDevice, GCInterface]):
+    def cam_event(event: event_handler.Events, args: Tuple["GCDevice", "GCInterface"]):
         match event:
             case event_handler.Events.CAM_FOUND:
                 cam, intf = args
@@ -200,7 +203,7 @@ def run_app():
         command_queue.put("stop_scan")
         time.sleep(0.5)
         if (app_context["camera_data"]["system"]):
-            system: GCSystem = app_context["camera_data"]["system"]
+            system: "GCSystem" = app_context["camera_data"]["system"]
             system.close()
         exit()
 
@@ -1,9 +1,12 @@
 from tkinter import Toplevel, Button
-from lib.spectralcam.specim.fx10 import FX10
 from models import app_context
 import time
-import numpy as np
 import os
+from typing import TYPE_CHECKING
+
+# numpy and the camera library are imported when calibrating, not at app startup
+if TYPE_CHECKING:
+    from lib.spectralcam.specim.fx10 import FX10
 
 def calculate_reference_average(input_file, output_file=None, num_pixels=500):
         """
@@ -14,6 +17,7 @@ def calculate_reference_average(input_file, output_file=None, num_pixels=500):
         output_file (str): Pad voor output bestand (optioneel)
         num_pixels (int): Aantal pixels om te middelen (default: 500)
         """
+        import numpy as np
         
         # Laad het hyperspectrale beeld
         try:
@@ -86,7 +90,8 @@ def calculate_reference_average(input_file, output_file=None, num_pixels=500):
         return average_spectrum
 
 def calibrate_black():
-        cam: FX10 = app_context["camera_data"]["cam"]
+        import numpy as np
+        cam: "FX10" = app_context["camera_data"]["cam"]
         cam.set_defaults()
         cam.open_stream()
         cam.start_acquire(True)
@@ -101,7 +106,8 @@ def calibrate_black():
         app_context["message_box"]("Calibrated black reference")
     
 def calibrate_white():
-    cam: FX10 = app_context["camera_data"]["cam"]
+    import numpy as np
+    cam: "FX10" = app_context["camera_data"]["cam"]
     cam.set_defaults()
     cam.open_stream()
     cam.start_acquire(True)
@@ -1,26 +1,62 @@
-from lib.spectralcam.gentl.gentl import GCSystem
-from lib.spectralcam.specim.fx10 import FX10
-from lib.spectralcam.specim import FXBase
 from lib.spectralcam.exceptions import *
-import numpy as np
 import threading
 from models import app_context
 from enums import ConnectionState
-from lib.spectralcam.gentl import GCDevice
 from tkinter import Toplevel, Label, W
 import datetime
+import json
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# The camera library (GenICam, numpy, vispy) is imported on first connection, not at app startup
+if TYPE_CHECKING:
+    from lib.spectralcam.gentl import GCSystem, GCDevice
+    from lib.spectralcam.specim import FXBase, FX10
+
+# Camera of the last successful connection, it is tried first without broadcast discovery
+last_camera_path = Path(__file__).parent / "last_camera.json"
 
 def connect():
     if app_context["camera_data"]["system"] is None:
+        from lib.spectralcam.gentl import GCSystem
         app_context["camera_data"]["system"] = GCSystem()
 
     thread = threading.Thread(target=find_and_connect_camera)
     thread.start()
 
 def find_and_connect_camera():
+    from lib.spectralcam.specim.fx10 import FX10
     app_context["set_connection_state"](ConnectionState.CONNECTING)
     system: GCSystem = app_context["camera_data"]["system"]
-    system.discover(FX10)
+    cam, intf = None, None
+    last_camera = load_last_camera()
+    if last_camera is not None:
+        cam, intf = system.reconnect(FX10, last_camera["mac"], last_camera["ip"], last_camera["interface"])
+        if cam is None:
+            print("Last camera not found, searching all interfaces")
+    if cam is None:
+        cam, intf = system.discover(FX10)
+    if cam is not None:
+        save_last_camera(cam, intf)
+
+def load_last_camera():
+    try:
+        with open(last_camera_path) as file:
+            last_camera = json.load(file)
+        return last_camera if {"mac", "ip", "interface"} <= last_camera.keys() else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def save_last_camera(cam: "FXBase", intf):
+    from lib.spectralcam.gentl import IF_INFO_ID
+    device = cam.get_info().device
+    last_camera = { "mac": device.mac_address, "ip": device.current_ip, "interface": intf.get_info(IF_INFO_ID) }
+    try:
+        with open(last_camera_path, "w") as file:
+            json.dump(last_camera, file)
+    except OSError as error:
+        print(f"Could not save last camera: {error}")
 
 def quick_init_camera():
     cam: FX10 = app_context["camera_data"]["cam"]
@@ -31,20 +67,24 @@ def quick_init_camera():
     cam.open_stream()
     cam.init_preview()
     cam.show_preview()
-    cam.start_acquire(True)
+    now = datetime.datetime.now()
+    formatted_time = now.strftime("%Y-%m-%d_%H-%M-%S")
+    path = f"scan_{formatted_time}.npy"
+    app_context["camera_data"]["scan_path"] = path
+    cam.start_acquire(True, path=path)
 
 def extract_data():
     cam: FXBase = app_context["camera_data"]["cam"]
     if not cam:
         app_context["message_box"]("No cam to extract data from")
         return
-    data = cam.stop_acquire()
-    now = datetime.datetime.now()
-    formatted_time = now.strftime("%Y-%m-%d_%H-%M-%S")
-    np.save(f"scan_{formatted_time}.npy", data)
+    # Frames are streamed to the scan file during acquisition, stopping finalises the file
+    cam.stop_acquire()
+    logging.info(f"Stream stats: {cam.stream_stats}")
+    path = app_context["camera_data"]["scan_path"]
     cam.preview.close()
     app_context["message_box"]("Finished saving data")
-    return f"scan_{formatted_time}.npy"
+    return path
 
 def show_info(master):
     win = Toplevel(master)
@@ -1,5 +1,12 @@
-from . import gentl
-from . import gige
-from . import specim
-from . import exceptions
-from . import preview
+"""
+Subpackages are imported on first use, e.g. spectralcam.specim or "from spectralcam.gentl import
+GCSystem", so a program that uses only some of them does not wait for GenICam, numpy and vispy.
+"""
+import importlib
+
+__all__ = ["gentl", "gige", "specim", "exceptions", "preview"]
+
+def __getattr__(name: str):
+  if name in __all__:
+    return importlib.import_module(f".{name}", __name__)
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
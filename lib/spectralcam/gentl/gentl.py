@@ -8,7 +8,9 @@
   Also note that this module supports GigE Vision devices only.
 """
 
+import selectors
 import socket
+import time
 from typing import Union
 
 import psutil
@@ -17,7 +19,6 @@ from psutil._common import snicaddr
 from ...spectralcam.utils import ETH_MAX_MTU, netmask_to_short, ip_to_uint32, is_ipv4, is_normal_ip
 from ...spectralcam.gige import GVCP_PORT, GVCPRequestId, GVCPAck, GVCPDiscoveryAck, GVCPDiscoveryCmd, GVCPForceIPCmd
 from ...spectralcam.exceptions import AckError
-from ...spectralcam.preview import PreviewFactory
 from event_handler import fire_event, Events
 
 # GenICam transport layer type codes
@@ -174,6 +175,7 @@ class GCInterface:
     self._is_open = True
     self._socs: list[socket.socket] = []
     self._req_id = GVCPRequestId()
+    self._discovery_ids: dict[socket.socket, int] = {}
 
     for addr in self._info.addrs:
       soc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -290,13 +292,85 @@ class GCInterface:
     :param ack_bcast: Allow cameras to broadcast their acknowledgement. Note that this application cannot receive broadcasted acknowledgements.
     :raises RuntimeError: Interface is closed
     """
+    update_device_lists([self], timeout, ack_bcast)
+
+  def send_discovery(self, ack_bcast: bool = False) -> list[socket.socket]:
+    """
+    Broadcast GVCP DISCOVERY command from all addresses of the interface without waiting for
+    acknowledgements. Device list is cleared, call receive_discovery when a socket has data to add
+    the devices to the list. See update_device_lists.
+
+    :param ack_bcast: Allow cameras to broadcast their acknowledgement
+    :returns: Sockets the acknowledgements are received from
+    :raises RuntimeError: Interface is closed
+    """
     self._check_open()
     self._existing_devs = {}
+    self._discovery_ids = {}
+    for soc in self._socs:
+      request = GVCPDiscoveryCmd(self._req_id.get(), ack_bcast)
+      soc.sendto(request.data, ("255.255.255.255", GVCP_PORT))
+      self._discovery_ids[soc] = request.req_id
+    return list(self._socs)
+
+  def receive_discovery(self, soc: socket.socket) -> None:
+    """
+    Receive a DISCOVERY_ACK sent as a response to send_discovery and add the device to the device
+    list. Call only when the socket has data, otherwise this blocks.
+
+    :param soc: Socket returned by send_discovery
+    :raises RuntimeError: Interface is closed
+    """
+    self._check_open()
+    data = soc.recv(ETH_MAX_MTU)
+    try:
+      response = GVCPDiscoveryAck(data)
+    except AckError:
+      return
+    if response.ack_id == self._discovery_ids.get(soc):
+      addr = self._info.addrs[self._socs.index(soc)]
+      self._existing_devs.update({ response.mac_address: GCDeviceInfo(addr.address, addr.netmask, response) })
+
+  def find_device(self, ip: str, timeout: float = 0.2) -> Union[GCDeviceInfo, None]:
+    """
+    Send GVCP DISCOVERY command directly to a device with a known IP address instead of
+    broadcasting it. The device is added to the device list if it answers. The command is sent from
+    the address of this interface that is in the same network as the device.
+
+    :param ip: IP address of the device
+    :param timeout: Time to wait for an answer from the device (in seconds)
+    :returns: Device information or None if the device did not answer or is not in the network of this interface
+    :raises RuntimeError: Interface is closed
+    """
+    self._check_open()
+    ip_int = ip_to_uint32(ip)
     for i, addr in enumerate(self._info.addrs):
+      mask_int = ip_to_uint32(addr.netmask)
+      if (ip_to_uint32(addr.address) & mask_int) != (ip_int & mask_int):
+        continue
       soc = self._socs[i]
-      soc.settimeout(timeout)
-      for discovery in self.gvcp_discovery(soc, ack_bcast):
-        self._existing_devs.update({ discovery.mac_address: GCDeviceInfo(addr.address, addr.netmask, discovery) })
+      request = GVCPDiscoveryCmd(self._req_id.get())
+      soc.sendto(request.data, (ip, GVCP_PORT))
+
+      # Listen for DISCOVERY_ACK, other packets may arrive to the same port
+      deadline = time.monotonic() + timeout
+      while True:
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+          break
+        soc.settimeout(time_left)
+        try:
+          data = soc.recv(ETH_MAX_MTU)
+          response = GVCPDiscoveryAck(data)
+        except socket.timeout:
+          break
+        except AckError:
+          continue
+        if response.ack_id == request.req_id:
+          dev_info = GCDeviceInfo(addr.address, addr.netmask, response)
+          self._existing_devs.update({ response.mac_address: dev_info })
+          return dev_info
+    return None
 
   def gvcp_discovery(self, soc: socket.socket, ack_bcast: bool = False) -> list[GVCPDiscoveryAck]:
     """
@@ -410,6 +484,29 @@ class GCInterface:
     if not self.is_open:
       raise RuntimeError("Interface is closed")
 
+def update_device_lists(interfaces: list[GCInterface], timeout: float = 0.5, ack_bcast: bool = False) -> None:
+  """
+  Find GigE Vision devices connected to many interfaces at once. DISCOVERY command is broadcast from
+  all addresses of the interfaces first and the acknowledgements are collected during one shared
+  timeout, so the time does not grow with the number of interfaces and addresses.
+
+  :param interfaces: Open interfaces
+  :param timeout: Time to wait for an answer from devices (in seconds)
+  :param ack_bcast: Allow cameras to broadcast their acknowledgement
+  :raises RuntimeError: An interface is closed
+  """
+  with selectors.DefaultSelector() as selector:
+    for inf in interfaces:
+      for soc in inf.send_discovery(ack_bcast):
+        selector.register(soc, selectors.EVENT_READ, inf)
+    deadline = time.monotonic() + timeout
+    while True:
+      time_left = deadline - time.monotonic()
+      if time_left <= 0:
+        break
+      for key, _ in selector.select(time_left):
+        key.data.receive_discovery(key.fileobj)
+
 class GCSystem:
   """
   Class to find GigE Vision cameras in local network.
@@ -423,6 +520,7 @@ class GCSystem:
     self._existing_intfs: dict[str, GCInterfaceInfo] = {}
     self._open_intfs: list[GCInterface] = []
     self._is_open = True
+    from ...spectralcam.preview import PreviewFactory # vispy is imported only when a system is created
     self.preview_factory = PreviewFactory()
 
   def __del__(self) -> None:
@@ -549,7 +647,7 @@ class GCSystem:
     dev_list: list[tuple[str, GCInterface]] = []
     inf_list: list[GCInterface] = []
 
-    # Find all devices from all interfaces
+    # Open all interfaces
     self.update_interface_list()
     inf_len = self.get_num_interfaces()
     for inf_index in range(inf_len):
@@ -563,18 +661,17 @@ class GCSystem:
         inf = self.open_interface(inf_id)
       inf_list.append(inf)
 
-      # Find devices connected to the interface
-      inf_addrs = inf.get_info().addrs
-      inf_addrs = list(filter(is_normal_ip, inf_addrs))
-      if len(inf_addrs) > 0:
-        inf.update_device_list(timeout)
-        dev_len = inf.get_num_devices()
-        for dev_index in range(dev_len):
-          dev_id = inf.get_device_id(dev_index)
-          dev_vendor = inf.get_device_info(dev_id, DEV_INFO_VENDOR)
-          dev_model = inf.get_device_info(dev_id, DEV_INFO_MODEL)
-          if all or (device_type.DEV_INFO_VENDOR == dev_vendor and device_type.DEV_INFO_MODEL == dev_model):
-            dev_list.append((dev_id, inf))
+    # Find devices connected to all interfaces at once
+    search_list = [inf for inf in inf_list if len(list(filter(is_normal_ip, inf.get_info().addrs))) > 0]
+    update_device_lists(search_list, timeout)
+    for inf in search_list:
+      dev_len = inf.get_num_devices()
+      for dev_index in range(dev_len):
+        dev_id = inf.get_device_id(dev_index)
+        dev_vendor = inf.get_device_info(dev_id, DEV_INFO_VENDOR)
+        dev_model = inf.get_device_info(dev_id, DEV_INFO_MODEL)
+        if all or (device_type.DEV_INFO_VENDOR == dev_vendor and device_type.DEV_INFO_MODEL == dev_model):
+          dev_list.append((dev_id, inf))
 
     # Select device to open from found devices
     open_device: GCDevice = None
@@ -588,12 +685,8 @@ class GCSystem:
     # Found 1 matching device - open automatically
     elif not all and len(dev_list) == 1:
       dev_id, inf = dev_list[0]
-      dev_info = inf.get_device_info(dev_id)
-      open_device = inf.open_device(dev_id, device_type, GVCP_PORT, self.preview_factory)
+      open_device = self._open_found_device(inf, dev_id, device_type)
       open_interface = inf
-      if open_device.is_open:
-        print(f"Connected to {dev_info.device.mac_address}")
-        fire_event(Events.CAM_FOUND, (open_device, open_interface))
 
     # Found more than 1 device
     else:
@@ -607,6 +700,43 @@ class GCSystem:
 
     return (open_device, open_interface)
 
+  def reconnect(self, device_type: DiscoverableGigeDevice, mac: str, ip: str, interface: str, timeout: float = 0.2) -> tuple[GCDevice, GCInterface]:
+    """
+    Connect to a known device without broadcast discovery, e.g. the camera that was used last time.
+    DISCOVERY command is sent only to the given IP address through the given interface. If the
+    device does not answer, or the answer is from a different device, None is returned and discover
+    can be used instead.
+
+    :param device_type: Class that implements the device you are trying to connect to
+    :param mac: MAC address of the device
+    :param ip: IP address of the device
+    :param interface: ID (name) of the interface the device is connected to
+    :param timeout: How long to wait for a response from the device
+    :returns: Instance of GenTL device (camera) and interface or None, None if the device was not found
+    """
+    self.update_interface_list()
+    if interface not in self._existing_intfs:
+      return None, None
+    filtered_inf = tuple(filter(lambda inf: inf.get_info(IF_INFO_ID) == interface, self.open_interfaces))
+    inf = filtered_inf[0] if len(filtered_inf) > 0 else self.open_interface(interface)
+
+    # Check that the same device still has the address
+    dev_info = inf.find_device(ip, timeout)
+    if dev_info == None or dev_info.device.mac_address.lower() != mac.lower() \
+        or dev_info.get(DEV_INFO_VENDOR) != device_type.DEV_INFO_VENDOR or dev_info.get(DEV_INFO_MODEL) != device_type.DEV_INFO_MODEL:
+      if len(inf.open_devices) == 0:
+        inf.close()
+      return None, None
+    return self._open_found_device(inf, dev_info.device.mac_address, device_type), inf
+
+  def _open_found_device(self, inf: GCInterface, dev_id: str, device_type: DiscoverableGigeDevice) -> GCDevice:
+    dev_info = inf.get_device_info(dev_id)
+    open_device = inf.open_device(dev_id, device_type, GVCP_PORT, self.preview_factory)
+    if open_device.is_open:
+      print(f"Connected to {dev_info.device.mac_address}")
+      fire_event(Events.CAM_FOUND, (open_device, inf))
+    return open_device
+
   def _check_open(self):
     if not self.is_open:
       raise RuntimeError("Interface is closed")
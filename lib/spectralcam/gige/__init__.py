@@ -1,2 +1,10 @@
 from .gvcp import *
+from .message_channel import GVCPMessageChannel
 from . import gvsp
+
+def __getattr__(name: str):
+  # asyncio is imported only when AsyncGVCP is used
+  if name == "AsyncGVCP":
+    from .async_gvcp import AsyncGVCP
+    return AsyncGVCP
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,362 @@
+import asyncio
+import socket
+from typing import Union
+
+from ...spectralcam.utils import *
+from ...spectralcam.exceptions import *
+from .gvcp import *
+
+class _GVCPProtocol(asyncio.DatagramProtocol):
+  """Datagram protocol passing received acknowledgements to AsyncGVCP."""
+
+  def __init__(self, gvcp: "AsyncGVCP") -> None:
+    self._gvcp = gvcp
+
+  def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+    self._gvcp._handle_ack(data)
+
+  def error_received(self, exc: Exception) -> None:
+    self._gvcp._fail_all(exc)
+
+  def connection_lost(self, exc: Union[Exception, None]) -> None:
+    self._gvcp._fail_all(exc if exc != None else NotConnectedError("GVCP ERROR: Connection closed"))
+
+class _AckWaiter:
+  """Future of an acknowledgement and the time the camera asked to wait with PENDING_ACK."""
+
+  def __init__(self, future: asyncio.Future) -> None:
+    self.future = future
+    self.pending_timeout = None
+
+class AsyncGVCP:
+  """
+  GigE Vision control channel client for asyncio. Requests are not serialized behind a lock, each
+  request waits for the acknowledgement with its own request ID, so multiple coroutines can use the
+  same connection at the same time. PENDING_ACK extends the wait of the request without blocking
+  other requests.
+
+  Usage example:
+    gvcp = AsyncGVCP()
+    await gvcp.connect("169.254.1.2")
+    width = await gvcp.readreg(0x00300100)
+    await gvcp.disconnect()
+  """
+
+  def __init__(self) -> None:
+    # Transport / packets
+    self._transport = None
+    self._soc_timeout = 0.5 # in seconds
+    self._rtt = RTTEstimator(self._soc_timeout)
+    self.adaptive_timeout = True
+    """Set acknowledgement timeouts from measured round trip time, otherwise ack_timeout is always used."""
+    self._req_id = GVCPRequestId()
+    self._waiters: dict[int, _AckWaiter] = {}
+    self.retries = 3
+    """Number of times to send a command before raising an error. With adaptive_timeout a command is also resent until retries * ack_timeout seconds have passed."""
+
+    # Heartbeat
+    self._heartbeat_timeout = 5.0 # in seconds
+    self._heartbeat_task = None
+
+    # Support for optional features
+    self.concat_support = None
+    self.writemem_support = None
+
+    # Output formatting
+    self.verbose = False
+    self.debug = False
+
+  @property
+  def connected(self) -> bool:
+    """Connection is open."""
+    return self._transport != None
+
+  @property
+  def pending(self) -> bool:
+    """Received PENDING_ACK for a request and waiting for the actual response."""
+    return any(waiter.pending_timeout != None for waiter in self._waiters.values())
+
+  @property
+  def ack_timeout(self) -> float:
+    """Time to wait for an acknowledgement in seconds, before round trip time is measured if adaptive_timeout is set."""
+    return self._soc_timeout
+
+  @ack_timeout.setter
+  def ack_timeout(self, timeout: float) -> None:
+    self._soc_timeout = timeout
+    self._rtt.initial_timeout = timeout
+    if self._rtt.samples == 0:
+      self._rtt.reset()
+
+  @property
+  def min_ack_timeout(self) -> float:
+    """
+    Lower limit of the acknowledgement timeout in seconds when adaptive_timeout is set. Writes and
+    memory reads can take longer than fast register reads, so a low limit makes them resent.
+    """
+    return self._rtt.min_timeout
+
+  @min_ack_timeout.setter
+  def min_ack_timeout(self, timeout: float) -> None:
+    self._rtt.min_timeout = timeout
+
+  @property
+  def rtt_stats(self) -> dict[str, Union[float, int, None]]:
+    """Round trip time statistics of the connection, see RTTEstimator.stats."""
+    return self._rtt.stats
+
+  async def connect(self, addr: str, port: int = GVCP_PORT) -> None:
+    """
+    Connect to a camera with an IP address.
+
+    :param addr: IP address of the camera
+    :param port: UDP port of the camera (for GVCP), default is 3956
+    :returns: None
+    :raises NotConnectedError: Cannot connect
+    :raises IsConnectedError: Already connected
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if self.connected:
+      raise IsConnectedError("GVCP ERROR: GVCP is already connected")
+    loop = asyncio.get_running_loop()
+    self._rtt.reset()
+    self._transport, _ = await loop.create_datagram_endpoint(lambda: _GVCPProtocol(self), remote_addr=(addr, port))
+    try:
+      await self.writereg(REG_CCP, VAL_CONTROL_ACCESS)
+      await self.writereg(REG_HEARTBEAT_TIMEOUT, round(self._heartbeat_timeout * 1000))
+      ccp_status = await self.readreg(REG_CCP, int)
+    except:
+      self._close()
+      raise
+    if ccp_status != VAL_CONTROL_ACCESS:
+      self._close()
+      raise NotConnectedError(f"GVCP ERROR: Could not connect\nCCP register value: 0x{ccp_status:x}")
+    self._heartbeat_task = loop.create_task(self._heartbeat())
+    if self.verbose:
+      print("GVCP: Connected")
+
+  async def disconnect(self) -> None:
+    """
+    Disconnect from the camera.
+
+    :returns: None
+    :raises NotConnectedError: Already disconnected
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if not self.connected:
+      raise NotConnectedError("GVCP ERROR: Not connected, call gvcp.connect() first")
+    self._heartbeat_task.cancel()
+    try:
+      await self.writereg(REG_CCP, 0)
+    finally:
+      self._close()
+    if self.verbose:
+      print("GVCP: Disconnected")
+
+  async def readreg(self, addrs: Union[int, list[int]], return_type: type = int) -> Union[bytes, int, float, list[int], list[float]]:
+    """
+    Read single or multiple registers from the camera.
+
+    :param addrs: Register address or addresses
+    :param return_type: Type of the returned value
+    :returns: Value or values from camera registers
+    :raises NotConnectedError: No connection
+    :raises ValueError: Invalid value of address
+    :raises TypeError: Invalid return_type
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if type(addrs) == int:
+      addrs = [addrs]
+    if len(addrs) > 1:
+      await self._check_concat_support()
+    request = GVCPReadRegCmd(self._req_id.get(), addrs)
+    if self.verbose: print(request)
+    response = GVCPReadRegAck(await self._request(request))
+    if self.verbose: print(response)
+    values = response.get_values(return_type)
+    return values if type(values) == bytes or len(values) > 1 else values[0]
+
+  async def writereg(self, addrs: Union[int, list[int]], values: Union[bytes, int, float, list[Union[int, float]]], ack: bool = True) -> None:
+    """
+    Write single or multiple registers on the camera.
+
+    :param addrs: Register address or addresses
+    :param values: Register value or values corresponding to addresses
+    :param ack: Ask camera to acknowledge
+    :returns: None
+    :raises NotConnectedError: No connection
+    :raises ValueError: Invalid value of address
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if type(addrs) == int:
+      addrs = [addrs]
+    if type(values) == int or type(values) == float:
+      values = [values]
+    if len(addrs) > 1:
+      await self._check_concat_support()
+    request = GVCPWriteRegCmd(self._req_id.get(), addrs, values, ack)
+    if self.verbose: print(request)
+    response = await self._request(request)
+    if ack:
+      response = GVCPWriteRegAck(response)
+      if self.verbose: print(response)
+
+  async def readmem(self, addr: int, count: int, return_type: type = bytes) -> Union[bytes, str]:
+    """
+    Read multiple registers as a string from the camera.
+
+    :param addr: First register address
+    :param count: Amount of registers to read
+    :param return_type: Format of the returned value
+    :returns: Values of the registers
+    :raises NotConnectedError: No connection
+    :raises ValueError: Invalid value of address
+    :raises TypeError: Invalid return_type
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    request = GVCPReadMemCmd(self._req_id.get(), addr, count)
+    if self.verbose: print(request)
+    response = GVCPReadMemAck(await self._request(request))
+    if response.addr != addr:
+      raise AckValueError("GVCP ERROR: Acknowledged address was different to requested address", addr, response.addr)
+    if self.verbose: print(response)
+    return response.get_values(return_type)
+
+  async def writemem(self, addr: int, value: Union[str, bytes], ack: bool = True) -> None:
+    """
+    Write multiple registers with a string to the camera.
+
+    :param addr: First register address
+    :param value: String or bytes to write to camera memory
+    :param ack: Ask camera to acknowledge request
+    :returns: None
+    :raises NotConnectedError: No connection
+    :raises NotImplementedError: Device does not support WRITEMEM command
+    :raises ValueError: Invalid address or value
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if self.writemem_support == None:
+      await self._check_capability()
+    if not self.writemem_support:
+      raise NotImplementedError("GVCP ERROR: Device does not support WRITEMEM command")
+    request = GVCPWriteMemCmd(self._req_id.get(), addr, value, ack)
+    if self.verbose: print(request)
+    response = await self._request(request)
+    if ack:
+      response = GVCPWriteMemAck(response)
+      if self.verbose: print(response)
+
+  async def _request(self, request: GVCPCmd) -> Union[GVCPAck, None]:
+    if not self.connected:
+      raise NotConnectedError("GVCP ERROR: Not connected, call gvcp.connect() first")
+    if not request.ack:
+      self._send(request)
+      return None
+    waiter = _AckWaiter(asyncio.get_running_loop().create_future())
+    self._waiters[request.req_id] = waiter
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + self.retries * self._soc_timeout
+    attempt = 1
+    try:
+      while True:
+        self._send(request)
+        sent_time = loop.time()
+        timeout = self._rtt.timeout(attempt) if self.adaptive_timeout else self._soc_timeout
+        was_pending = False
+        while True:
+          try:
+            response = await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+          except asyncio.TimeoutError:
+            # Camera asked to wait longer, keep waiting without resending
+            if waiter.pending_timeout == None:
+              break
+            timeout = waiter.pending_timeout
+            waiter.pending_timeout = None
+            was_pending = True
+          else:
+            # Retried commands and commands the camera asked to wait for do not tell the round trip time
+            if attempt == 1 and not was_pending:
+              self._rtt.add_sample(loop.time() - sent_time)
+            return response
+        self._rtt.timeouts += 1
+        if attempt >= self.retries and (not self.adaptive_timeout or loop.time() >= deadline):
+          raise socket.timeout(f"GVCP ERROR: No acknowledgement to {request.cmd_name}, id: {request.req_id}")
+        if self.verbose:
+          print(f"GVCP: Attempt {attempt} timed out")
+        attempt += 1
+    finally:
+      del self._waiters[request.req_id]
+
+  def _send(self, request: GVCPCmd) -> None:
+    self._transport.sendto(request.data)
+    if self.debug:
+      print(f"GVCP: Sent {request.cmd_name}, id: {request.req_id}, length: {len(request.data)} bytes")
+
+  def _handle_ack(self, data: bytes) -> None:
+    # Acknowledgements without a waiting request are late duplicates of resent commands
+    if len(data) < GVCP_HEADER_SIZE:
+      return
+    waiter = self._waiters.get(bytes_to_uint16(data[6:8]))
+    if waiter == None or waiter.future.done():
+      if self.debug:
+        print(f"GVCP: Ignored acknowledgement, id: {bytes_to_uint16(data[6:8])}")
+      return
+    try:
+      response = GVCPAck(data)
+    except AckError as error:
+      waiter.future.set_exception(error)
+      return
+    if self.debug:
+      specific_msg = "(device specific code)" if response.device_specific else ""
+      print(f"GVCP: Received {response.ack_name} INFO: {response.status_name} {specific_msg}")
+    if response.ack == PENDING_ACK:
+      waiter.pending_timeout = bytes_to_uint16(data[10:12]) / 1000 + 0.01
+    else:
+      waiter.future.set_result(response)
+
+  def _fail_all(self, error: Exception) -> None:
+    for waiter in self._waiters.values():
+      if not waiter.future.done():
+        waiter.future.set_exception(error)
+
+  def _close(self) -> None:
+    if self._transport != None:
+      self._transport.close()
+      self._transport = None
+
+  async def _heartbeat(self) -> None:
+    if self.verbose:
+      print("GVCP: Starting to send heartbeat")
+    try:
+      while self.connected:
+        await asyncio.sleep(self._heartbeat_timeout / 3)
+        try:
+          ccp_status = await self.readreg(REG_CCP, int)
+        except socket.timeout:
+          ccp_status = 0
+        if ccp_status != VAL_CONTROL_ACCESS:
+          self._close()
+          print("GVCP ERROR: Connection lost")
+          return
+        elif self.debug:
+          print("GVCP: Sent heartbeat refresh packet")
+    except asyncio.CancelledError:
+      if self.verbose:
+        print("GVCP: Stopping heartbeat")
+
+  async def _check_concat_support(self) -> None:
+    if self.concat_support == None:
+      await self._check_capability()
+    if not self.concat_support:
+      raise NotImplementedError("GVCP ERROR: Device does not support register concatenation")
+
+  async def _check_capability(self) -> None:
+    capability = await self.readreg(REG_GVCP_CAPABILITY, int)
+    self.concat_support = bool(capability & 0x00000001)
+    self.writemem_support = bool(capability & 0x00000002)
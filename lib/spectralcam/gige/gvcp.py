@@ -7,13 +7,16 @@
   been done already as PortGVCP class provides the port interface for official
   GenAPI implementation to access cameras GVCP registers.
 """
+import hashlib
 import io
+import os
 import socket
 import threading
+import time
 from typing import Iterable, Union, Any
 import zipfile
+import struct
 
-import numpy as np
 from genicam.genapi import AbstractPort, EAccessMode
 
 from ...spectralcam.utils import *
@@ -26,6 +29,7 @@ GVCP_HEADER_SIZE = 8
 GVCP_MAX_PAYLOAD_SIZE = IP4_MAX_MTU - (IP4_HEADER_SIZE + UDP_HEADER_SIZE + GVCP_HEADER_SIZE)
 READMEM_HEADER_SIZE = 4
 READMEM_MAX_PAYLOAD_SIZE = GVCP_MAX_PAYLOAD_SIZE - READMEM_HEADER_SIZE
+READREG_MAX_COUNT = GVCP_MAX_PAYLOAD_SIZE // 4
 # TODO Support for extended id?
 
 # GVCP command and acknowledgement codes
@@ -115,6 +119,7 @@ GEV_STATUS_ACTION_LATE = 0x016
 GEV_STATUS_ERROR = 0xfff
 
 # Some GVCP bootstrap register addresses etc.
+REG_MANUFACTURER_NAME = 0x00000048
 REG_FIRST_URL = 0x00000200
 REG_FIRST_URL_LEN = 512
 REG_CCP = 0x00000A00
@@ -122,6 +127,50 @@ VAL_CONTROL_ACCESS = 0x00000002
 REG_HEARTBEAT_TIMEOUT = 0x00000938
 REG_GVCP_CAPABILITY = 0x00000934
 
+# Message channel bootstrap registers
+REG_NUM_MESSAGE_CHANNELS = 0x00000900
+REG_MCP = 0x00000B00 # Message channel port
+REG_MCDA = 0x00000B10 # Message channel destination address
+REG_MCTT = 0x00000B14 # Message channel transmission timeout (ms)
+REG_MCRC = 0x00000B18 # Message channel retry count
+EVENT_SIZE = 16
+
+# GigE Vision event identifiers
+EVENT_TRIGGER = 0x0000
+EVENT_START_OF_EXPOSURE = 0x0001
+EVENT_END_OF_EXPOSURE = 0x0002
+EVENT_START_OF_TRANSFER = 0x0003
+EVENT_END_OF_TRANSFER = 0x0004
+EVENT_PRIMARY_APP_SWITCH = 0x0005
+EVENT_LINK_SPEED_CHANGE = 0x0006
+EVENT_ACTION_LATE = 0x0007
+EVENT_ERROR_FIRST = 0x8001 # Error events are 0x8000 + status code
+EVENT_DEVICE_SPECIFIC_FIRST = 0x9000
+def format_event_name(event_id: int) -> str:
+  """Get name of GigE Vision event"""
+  if event_id == EVENT_TRIGGER:
+    return "TRIGGER"
+  elif event_id == EVENT_START_OF_EXPOSURE:
+    return "START_OF_EXPOSURE"
+  elif event_id == EVENT_END_OF_EXPOSURE:
+    return "END_OF_EXPOSURE"
+  elif event_id == EVENT_START_OF_TRANSFER:
+    return "START_OF_TRANSFER"
+  elif event_id == EVENT_END_OF_TRANSFER:
+    return "END_OF_TRANSFER"
+  elif event_id == EVENT_PRIMARY_APP_SWITCH:
+    return "PRIMARY_APP_SWITCH"
+  elif event_id == EVENT_LINK_SPEED_CHANGE:
+    return "LINK_SPEED_CHANGE"
+  elif event_id == EVENT_ACTION_LATE:
+    return "ACTION_LATE"
+  elif event_id >= EVENT_DEVICE_SPECIFIC_FIRST:
+    return f"DEVICE_SPECIFIC_0x{event_id:04x}"
+  elif event_id >= EVENT_ERROR_FIRST:
+    return f"ERROR_0x{event_id:04x}"
+  else:
+    return "Unknown"
+
 # GVCP device mode: Endianess
 DEV_MODE_LITTLE_ENDIAN = 0
 DEV_MODE_BIG_ENDIAN = 1
@@ -197,6 +246,67 @@ class GVCPRequestId:
       self.__req_id = 1
     return req_id
 
+class RTTEstimator:
+  """
+  Estimate round trip time to the camera to set acknowledgement timeouts, in the same way as TCP
+  (RFC 6298). Timeout is the smoothed RTT plus four times its variation, and it is doubled for every
+  retry of the same command. Only commands acknowledged on the first attempt are measured, as it is
+  not known which attempt a late acknowledgement belongs to.
+  """
+
+  def __init__(self, initial_timeout: float = 0.5, min_timeout: float = 0.1, max_timeout: float = 2.0) -> None:
+    self.initial_timeout = initial_timeout
+    """Timeout before the first measurement in seconds."""
+    self.min_timeout = min_timeout
+    """Lower limit of the timeout in seconds. It is well above the round trip time of a fast link, so that commands that take longer in the camera (writes, memory reads) are not resent."""
+    self.max_timeout = max_timeout
+    """Upper limit of the timeout, including backoff, in seconds."""
+    self.reset()
+
+  def reset(self) -> None:
+    """Forget measurements, e.g. after connecting to another camera."""
+    self.srtt = None
+    self.rttvar = None
+    self.samples = 0
+    self.timeouts = 0
+    self._rto = self.initial_timeout
+
+  def add_sample(self, rtt: float) -> None:
+    """
+    Update the estimate with a measured round trip time.
+
+    :param rtt: Time from sending a command to receiving its acknowledgement in seconds
+    :returns: None
+    """
+    if self.srtt == None:
+      self.srtt = rtt
+      self.rttvar = rtt / 2
+    else:
+      self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+      self.srtt = 0.875 * self.srtt + 0.125 * rtt
+    self.samples += 1
+    self._rto = min(max(self.srtt + 4 * self.rttvar, self.min_timeout), self.max_timeout)
+
+  def timeout(self, attempt: int = 1) -> float:
+    """
+    Time to wait for an acknowledgement.
+
+    :param attempt: Number of the attempt to send the same command, starting from 1
+    :returns: Timeout in seconds
+    """
+    return min(self._rto * 2 ** (attempt - 1), self.max_timeout)
+
+  @property
+  def stats(self) -> dict[str, Union[float, int, None]]:
+    """Smoothed RTT, RTT variation and current timeout in seconds, number of measurements and timeouts."""
+    return {
+      "srtt": self.srtt,
+      "rttvar": self.rttvar,
+      "timeout": self._rto,
+      "samples": self.samples,
+      "timeouts": self.timeouts
+    }
+
 class GVCPCmd:
   """Create GVCP command header. Base class for all GVCP commands."""
 
@@ -308,14 +418,52 @@ class GVCPForceIPCmd(GVCPCmd):
   def default_gateway(self) -> str:
     return self.__default_gateway
 
+class GVCPPacketResendCmd(GVCPCmd):
+  """Create GVCP packet resend command. It is never acknowledged, the packets are resent on the stream channel."""
+
+  def __init__(self, req_id: int, block_id: int, first_packet_id: int, last_packet_id: int, stream_channel: int = 0) -> None:
+    if block_id < 1 or block_id > 0xffff:
+      raise ValueError("GVCP ERROR: Block ID must be between 1 and 65535")
+    if first_packet_id > last_packet_id:
+      raise ValueError("GVCP ERROR: First packet ID must not be greater than last packet ID")
+    payload = uint16_to_bytes(stream_channel) + uint16_to_bytes(block_id) + uint32_to_bytes(first_packet_id) + uint32_to_bytes(last_packet_id)
+    super().__init__(req_id, PACKETRESEND_CMD, 0, payload, False)
+    self.__stream_channel = stream_channel
+    self.__block_id = block_id
+    self.__first_packet_id = first_packet_id
+    self.__last_packet_id = last_packet_id
+
+  def __str__(self) -> str:
+    text = super().__str__(16)
+    text += f"\n  Stream channel: {self.stream_channel}"
+    text += f"\n  Block ID:       {self.block_id}"
+    text += f"\n  Packets:        {self.first_packet_id}-{self.last_packet_id}"
+    return text
+
+  @property
+  def stream_channel(self) -> int:
+    return self.__stream_channel
+
+  @property
+  def block_id(self) -> int:
+    return self.__block_id
+
+  @property
+  def first_packet_id(self) -> int:
+    return self.__first_packet_id
+
+  @property
+  def last_packet_id(self) -> int:
+    return self.__last_packet_id
+
 class GVCPReadRegCmd(GVCPCmd):
   """Create GVCP read register command."""
 
   def __init__(self, req_id: int, addrs: list[int]) -> None:
     if len(addrs) < 1:
       raise ValueError("GVCP ERROR: At least one address is needed")
-    if len(addrs) > 135:
-      raise ValueError("GVCP ERROR: Cannot read over 135 addresses at once")
+    if len(addrs) > READREG_MAX_COUNT:
+      raise ValueError(f"GVCP ERROR: Cannot read over {READREG_MAX_COUNT} addresses at once")
     payload = bytes([])
     for i in range(len(addrs)):
       if not is_uint32_4_multiple(addrs[i]):
@@ -346,8 +494,7 @@ class GVCPWriteRegCmd(GVCPCmd):
     if len(addrs) > 67:
       raise ValueError("GVCP ERROR: Cannot write over 67 addresses at once")
     if type(values) == bytes:
-      dt = np.dtype(np.uint32).newbyteorder(">")
-      values = list(np.frombuffer(values, dt))
+      values = list(struct.unpack(f">{len(values) // 4}I", values))
     if len(addrs) != len(values):
       raise ValueError("GVCP ERROR: Address and value counts do not match")
     self.__values = values
@@ -799,10 +946,77 @@ class GVCPActionAck(GVCPAck):
     if self.length != 0:
       raise AckLengthError("GVCP ERROR: Length of the received packet is wrong", 0, self.length)
 
+class GVCPEvent:
+  """Single event of GVCP EVENT or EVENTDATA command sent by the camera."""
+
+  def __init__(self, data: bytes, event_data: bytes = bytes()) -> None:
+    if len(data) < EVENT_SIZE:
+      raise AckLengthError("GVCP ERROR: Event is too short", EVENT_SIZE, len(data))
+    self.event_id = bytes_to_uint16(data[2:4])
+    self.stream_channel = bytes_to_uint16(data[4:6])
+    self.block_id = bytes_to_uint16(data[6:8])
+    self.timestamp = (bytes_to_uint32(data[8:12]) << 32) + bytes_to_uint32(data[12:16])
+    self.data = event_data
+
+  def __str__(self) -> str:
+    text = f"{self.__class__.__name__}:\n"
+    text += f"  Event:     {self.name} (0x{self.event_id:04x})\n"
+    text += f"  Channel:   {self.stream_channel}\n"
+    text += f"  Block ID:  {self.block_id}\n"
+    text += f"  Timestamp: {self.timestamp}"
+    if len(self.data) > 0:
+      text += f"\n  Data:      {format_bytearray(self.data, 4)}"
+    return text
+
+  @property
+  def name(self) -> str:
+    return format_event_name(self.event_id)
+
+class GVCPEventCmd:
+  """
+  Parse GVCP EVENT or EVENTDATA command. These commands are sent by the camera through the message
+  channel, so unlike other commands they are received and acknowledged by this application.
+  """
+
+  def __init__(self, data: bytes) -> None:
+    if len(data) < GVCP_HEADER_SIZE:
+      raise AckLengthError("GVCP ERROR: Received packet was too short for GVCP command", GVCP_HEADER_SIZE, len(data))
+    if data[0] != GVCP_KEY:
+      raise AckValueError("GVCP ERROR: Received packet is not a GVCP command", GVCP_KEY, data[0])
+    self.ack_required = bool(data[1] & 0x01)
+    self.cmd = bytes_to_uint16(data[2:4])
+    self.length = bytes_to_uint16(data[4:6])
+    self.req_id = bytes_to_uint16(data[6:8])
+    if len(data) - GVCP_HEADER_SIZE < self.length:
+      raise AckLengthError("GVCP ERROR: Actual size of the payload does not match reported size", self.length, len(data) - GVCP_HEADER_SIZE)
+    payload = data[GVCP_HEADER_SIZE:GVCP_HEADER_SIZE + self.length]
+
+    # EVENT may contain many events, EVENTDATA contains one event and its data
+    if self.cmd == EVENT_CMD:
+      self.events = [GVCPEvent(payload[i:i + EVENT_SIZE]) for i in range(0, len(payload) - EVENT_SIZE + 1, EVENT_SIZE)]
+    elif self.cmd == EVENTDATA_CMD:
+      self.events = [GVCPEvent(payload[:EVENT_SIZE], payload[EVENT_SIZE:])]
+    else:
+      raise AckValueError("GVCP ERROR: Received packet is not an event command", EVENT_CMD, self.cmd)
+
+  def __str__(self) -> str:
+    text = f"{self.__class__.__name__}:\n"
+    text += f"  Command:     {format_cmd_ack_name(self.cmd)}\n"
+    text += f"  Acknowledge: {self.ack_required}\n"
+    text += f"  ID:          {self.req_id}\n"
+    text += f"  Events:      {', '.join(event.name for event in self.events)}"
+    return text
+
+  @property
+  def ack_data(self) -> bytes:
+    """Acknowledgement to send back to the camera."""
+    return uint16_to_bytes(GEV_STATUS_SUCCESS) + uint16_to_bytes(self.cmd + 1) + uint16_to_bytes(0) + uint16_to_bytes(self.req_id)
+
 class DeviceDescriptionUrl:
   """Parse GigE Vision device description URL."""
 
   def __init__(self, url_str: str) -> None:
+    self.url_str = url_str
     schema_list = url_str.rsplit("?SchemaVersion=", 1)
     url_part_wirh_loc = schema_list[0]
     self.schema_version = schema_list[1] if len(schema_list) > 1 else None
@@ -839,10 +1053,13 @@ class GVCP:
     self._soc = None
     self._soc_lock = threading.Lock()
     self._soc_timeout = 0.5 # in seconds
+    self._rtt = RTTEstimator(self._soc_timeout)
+    self.adaptive_timeout = True
+    """Set acknowledgement timeouts from measured round trip time, otherwise ack_timeout is always used."""
     self._req_id = GVCPRequestId()
     self._pending = False
     self.retries = 3
-    """Number of times to retry a command before raising an error."""
+    """Number of times to send a command before raising an error. With adaptive_timeout a command is also resent until retries * ack_timeout seconds have passed."""
 
     # Heartbeat
     self._heartbeat_timeout = 5.0 # in seconds
@@ -853,6 +1070,7 @@ class GVCP:
     # Support for optional features
     self.concat_support = None
     self.writemem_support = None
+    self.packetresend_support = None
     self.action_support = None
     self.scheduled_action_support = None
 
@@ -872,13 +1090,32 @@ class GVCP:
 
   @property
   def ack_timeout(self) -> float:
-    """Time to wait for an acknowledgement in seconds."""
+    """Time to wait for an acknowledgement in seconds, before round trip time is measured if adaptive_timeout is set."""
     return self._soc_timeout
 
   @ack_timeout.setter
   def ack_timeout(self, timeout: float) -> None:
     self._soc_timeout = timeout
-    self._soc.settimeout(timeout)
+    self._rtt.initial_timeout = timeout
+    if self._rtt.samples == 0:
+      self._rtt.reset()
+
+  @property
+  def min_ack_timeout(self) -> float:
+    """
+    Lower limit of the acknowledgement timeout in seconds when adaptive_timeout is set. Writes and
+    memory reads can take longer than fast register reads, so a low limit makes them resent.
+    """
+    return self._rtt.min_timeout
+
+  @min_ack_timeout.setter
+  def min_ack_timeout(self, timeout: float) -> None:
+    self._rtt.min_timeout = timeout
+
+  @property
+  def rtt_stats(self) -> dict[str, Union[float, int, None]]:
+    """Round trip time statistics of the connection, see RTTEstimator.stats."""
+    return self._rtt.stats
 
   @property
   def heartbeat_timeout(self) -> float:
@@ -892,6 +1129,17 @@ class GVCP:
     if self.connected:
       self.writereg(REG_HEARTBEAT_TIMEOUT, round(timeout * 1000))
 
+  def fileno(self) -> int:
+    """
+    File descriptor of the connected socket, e.g. for sending packet resend requests from the GVSP receiver.
+
+    :returns: File descriptor
+    :raises NotConnectedError: No connection
+    """
+    if not self.connected:
+      raise NotConnectedError("GVCP ERROR: Not connected, call gvcp.connect() first")
+    return self._soc.fileno()
+
   def connect(self, addr: str, port: int = GVCP_PORT) -> None:
     """
     Connect to a camera with an IP address.
@@ -912,6 +1160,7 @@ class GVCP:
       self._soc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
       # TODO Fetch GVCP pending timeout from device register 0x0958 if it is implemented
       self._soc.settimeout(self._soc_timeout)
+      self._rtt.reset()
       self._soc.connect((addr, port))
     finally:
       self._soc_lock.release()
@@ -1083,6 +1332,91 @@ class GVCP:
 
     return response.get_values(return_type)
 
+  def readmem_bulk(self, addr: int, length: int, window: int = 4) -> bytes:
+    """
+    Read a large block of camera memory. The block is read in chunks of maximum size and up to
+    window read memory commands are sent before waiting for their acknowledgements, so reading is
+    not limited by the round trip time. Some devices handle only one command at a time and drop
+    the rest, the window is halved every time a command times out.
+
+    :param addr: First register address
+    :param length: Amount of bytes to read
+    :param window: Maximum number of commands waiting for an acknowledgement
+    :returns: Content of the memory
+    :raises NotConnectedError: No connection
+    :raises ValueError: Invalid address, length or window
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if not self.connected:
+      raise NotConnectedError("GVCP ERROR: Not connected, call gvcp.connect() first")
+    if not is_uint32_4_multiple(addr):
+      raise ValueError("GVCP ERROR: Address must be multiple of 4")
+    if length < 0:
+      raise ValueError("GVCP ERROR: Length must not be negative")
+    if window < 1:
+      raise ValueError("GVCP ERROR: Window must be at least 1")
+
+    # Split the block to chunks, count must be multiple of 4
+    chunks = []
+    for offset in range(0, length, READMEM_MAX_PAYLOAD_SIZE):
+      count = min(READMEM_MAX_PAYLOAD_SIZE, length - offset)
+      chunks.append((offset, count + (-count % 4)))
+    data = bytearray(sum(chunk[1] for chunk in chunks))
+
+    self._soc_lock.acquire()
+    try:
+      self._soc.settimeout(self._ack_timeout())
+      pending = {} # Request ID: [request, offset, attempt]
+      next_chunk = 0
+      while next_chunk < len(chunks) or len(pending) > 0:
+
+        # Fill the window
+        while next_chunk < len(chunks) and len(pending) < window:
+          offset, count = chunks[next_chunk]
+          request = GVCPReadMemCmd(self._req_id.get(), addr + offset, count)
+          self._soc.send(request.data)
+          if self.debug:
+            print(f"GVCP: Sent {request.cmd_name}, id: {request.req_id}, address: 0x{request.addr:08x}")
+          pending[request.req_id] = [request, offset, 1]
+          next_chunk += 1
+
+        # Resend all unacknowledged commands if nothing is received in time
+        try:
+          ack_data = self._soc.recv(ETH_MAX_MTU)
+        except socket.timeout as err_timeout:
+          self._rtt.timeouts += 1
+          window = max(1, window // 2)
+          for entry in pending.values():
+            if entry[2] >= self.retries:
+              raise err_timeout
+            entry[2] += 1
+            self._soc.send(entry[0].data)
+          if self.verbose:
+            print(f"GVCP: Read memory timed out, resending {len(pending)} commands, window: {window}")
+          continue
+
+        # Acknowledgements of already handled commands are duplicates caused by resending
+        if len(ack_data) < GVCP_HEADER_SIZE or bytes_to_uint16(ack_data[6:8]) not in pending:
+          continue
+        response = self._handle_ack(ack_data, None)
+        if response.ack == PENDING_ACK:
+          continue
+        request, offset, _ = pending.pop(response.ack_id)
+        response = GVCPReadMemAck(response)
+        if response.addr != request.addr:
+          raise AckValueError("GVCP ERROR: Acknowledged address was different to requested address", request.addr, response.addr)
+        values = response.get_values(bytes)
+        if len(values) != request.count:
+          raise AckLengthError("GVCP ERROR: Length of the read memory ack does not match the count", request.count, len(values))
+        data[offset:offset + request.count] = values
+    except (AckError, socket.timeout):
+      self._discard_acks(pending)
+      raise
+    finally:
+      self._soc_lock.release()
+    return bytes(data[:length])
+
   def writemem(self, addr: int, value: Union[str, bytes], ack: bool = True) -> None:
     """
     Write multiple registers with a string to the camera.
@@ -1117,6 +1451,32 @@ class GVCP:
       if self.verbose:
         print(response)
 
+  def packetresend(self, block_id: int, first_packet_id: int, last_packet_id: int) -> None:
+    """
+    Ask the camera to send packets of a block again on the stream channel.
+
+    :param block_id: Block ID of the frame
+    :param first_packet_id: First packet to resend
+    :param last_packet_id: Last packet to resend
+    :returns: None
+    :raises NotConnectedError: No connection
+    :raises NotImplementedError: Device does not support PACKETRESEND command
+    :raises ValueError: Invalid block ID or packet IDs
+    """
+    if not self.connected:
+      raise NotConnectedError("GVCP ERROR: Not connected, call gvcp.connect() first")
+
+    # Check support for PACKETRESEND command
+    if self.packetresend_support == None:
+      self._check_capability()
+    if not self.packetresend_support:
+      raise NotImplementedError("GVCP ERROR: Device does not support PACKETRESEND command")
+
+    # Send a packet, there is no acknowledgement
+    request = GVCPPacketResendCmd(self._req_id.get(), block_id, first_packet_id, last_packet_id)
+    if self.verbose: print(request)
+    self._request(request)
+
   def action(self, device_key: int, group_key: int, group_mask: int, ack: bool = True, act_time: int = None) -> None:
     """
     Send action command to the camera. Note that this method cannot be used for broadcasting.
@@ -1175,11 +1535,17 @@ class GVCP:
       print("GVCP: Read device description URL")
     return url if return_type == str else DeviceDescriptionUrl(url)
 
-  def get_device_description_file(self, path: str = None) -> str:
+  def get_device_description_file(self, path: str = None, cache_dir: str = None) -> str:
     """
     Get the device description file automatically. Optionally you specify where to save the file.
 
+    Downloading the file from the camera memory takes hundreds of requests. With cache_dir the file
+    is downloaded only once and read from the cache directory afterwards. Cached files are identified
+    by manufacturer, model, device version (firmware), serial number and the URL of the file, if any
+    of them changes the file is downloaded again.
+
     :param path: Path where to save the file on hard drive, optional
+    :param cache_dir: Directory of cached device description files, optional
     :returns: Device description file XML
     :raises NotConnectedError: No connection
     :raises AckError: Problem with an acknowledgement from the camera
@@ -1192,12 +1558,21 @@ class GVCP:
 
     # Fetch address for device description file
     url = self.get_device_description_url(DeviceDescriptionUrl)
+    cache_path = None
+    if cache_dir != None:
+      cache_path = os.path.join(cache_dir, self._device_description_cache_name(url))
+      if os.path.isfile(cache_path) and path == None:
+        with open(cache_path, encoding="utf-8") as file:
+          xml_str = file.read()
+        if self.verbose:
+          print(f"GVCP: Device description file read from cache: {cache_path}")
+        return xml_str
 
     # Device description file is saved on the local machine
     if url.location == "file":
       if url.extension == "xml":
-        file = open(url.url)
-        xml_str = file.read()
+        with open(url.url, encoding="utf-8") as file:
+          xml_str = file.read()
       elif url.extension == "zip":
         file = zipfile.ZipFile(url.url)
         xml_str = file.read(file.namelist()[0]).decode("utf-8")
@@ -1206,28 +1581,12 @@ class GVCP:
 
     # Device description file is saved on the camera memory
     elif url.location == "local":
-      addr = url.address
-      len_total = url.length
-      len_left = len_total
-      packet_size = 512
-
-      # Fetch device decription file in 512 byte chunks
-      ddf = bytes()
-      while len_left >= packet_size:
-        ddf_part = self.readmem(addr, packet_size, bytes)
-        ddf = ddf + ddf_part
-        addr += packet_size
-        len_left -= packet_size
-      if len_left % 4:
-        len_left = len_left + 4 - (len_left % 4)
-      ddf_part = self.readmem(addr, len_left, bytes)
-      ddf = ddf + ddf_part
-      ddf = ddf[:len_total]
+      ddf = self.readmem_bulk(url.address, url.length)
 
       # Unzip if needed and save to string
       if url.extension == "xml":
-        xml_str = ddf
-      if url.extension == "zip":
+        xml_str = ddf.decode("utf-8")
+      elif url.extension == "zip":
         z_file = zipfile.ZipFile(io.BytesIO(ddf))
         xml_str = z_file.read(z_file.namelist()[0]).decode("utf-8")
       else:
@@ -1241,11 +1600,36 @@ class GVCP:
 
     # Save xml if path is given
     if (path != None):
-      z_file.extractall(path)
+      os.makedirs(path, exist_ok=True)
+      with open(os.path.join(path, url.file_name.rsplit(".", 1)[0] + ".xml"), "w", encoding="utf-8") as file:
+        file.write(xml_str)
       if self.verbose:
         print(f"GVCP: Device description file saved to: {path}")
+    if cache_path != None:
+      self._save_device_description_cache(cache_path, xml_str)
     return xml_str
 
+  def _device_description_cache_name(self, url: DeviceDescriptionUrl) -> str:
+    # Manufacturer, model, device version, manufacturer info and serial number are read at once
+    identity = self.readmem(REG_MANUFACTURER_NAME, 160, bytes)
+    names = [bytes_to_str(identity[start:end]) for start, end in ((0, 32), (32, 64), (64, 96), (144, 160))]
+    key = "\n".join(names + [url.url_str])
+    model = "".join(c if c.isalnum() else "_" for c in names[1])
+    return f"{model}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.xml"
+
+  def _save_device_description_cache(self, cache_path: str, xml_str: str) -> None:
+    # Cache is only an optimization, failing to write it is not an error
+    try:
+      os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+      tmp_path = cache_path + ".tmp"
+      with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(xml_str)
+      os.replace(tmp_path, cache_path)
+      if self.verbose:
+        print(f"GVCP: Device description file saved to cache: {cache_path}")
+    except OSError as error:
+      print(f"GVCP WARNING: Could not save device description file to cache: {error}")
+
   def _request(self, request: GVCPCmd) -> GVCPAck:
     self._soc_lock.acquire()
     try:
@@ -1255,24 +1639,46 @@ class GVCP:
     return response
 
   def _exec_request(self, request: GVCPCmd, retry: int) -> GVCPAck:
-    response = None
-    req_len = self._soc.send(request.data)
-    if self.debug:
-      print(f"GVCP: Sent {request.cmd_name}, id: {request.req_id}, length: {req_len} bytes")
-    if request.ack:
+    # Short adaptive timeouts are retried until the fixed timeouts would have expired
+    deadline = time.perf_counter() + self.retries * self._soc_timeout
+    while True:
+      self._soc.settimeout(self._ack_timeout(retry))
+      sent_time = time.perf_counter()
+      req_len = self._soc.send(request.data)
+      if self.debug:
+        print(f"GVCP: Sent {request.cmd_name}, id: {request.req_id}, length: {req_len} bytes")
+      if not request.ack:
+        return None
       try:
-        response = self._handle_ack(self._soc.recv(ETH_MAX_MTU), request.req_id)
+        response = self._handle_ack(self._recv_ack(request.req_id), request.req_id)
+        was_pending = self._pending
         while self._pending:
-          response = self._handle_ack(self._soc.recv(ETH_MAX_MTU), request.req_id)
+          response = self._handle_ack(self._recv_ack(request.req_id), request.req_id)
       except socket.timeout as err_timeout:
-        if retry < self.retries:
-          if self.verbose:
-            print(f"GVCP: Attempt {retry} timed out")
-          retry += 1
-          response = self._exec_request(request, retry)
-        else:
+        self._rtt.timeouts += 1
+        if retry >= self.retries and (not self.adaptive_timeout or time.perf_counter() >= deadline):
           raise err_timeout
-    return response
+        if self.verbose:
+          print(f"GVCP: Attempt {retry} timed out")
+        retry += 1
+        continue
+
+      # Retried commands and commands the camera asked to wait for do not tell the round trip time
+      if retry == 1 and not was_pending:
+        self._rtt.add_sample(time.perf_counter() - sent_time)
+      return response
+
+  def _recv_ack(self, req_id: int) -> bytes:
+    # Late acknowledgements to earlier attempts of resent commands are skipped
+    while True:
+      data = self._soc.recv(ETH_MAX_MTU)
+      if len(data) < GVCP_HEADER_SIZE or bytes_to_uint16(data[6:8]) == req_id:
+        return data
+      if self.debug:
+        print(f"GVCP: Ignored acknowledgement, id: {bytes_to_uint16(data[6:8])}")
+
+  def _ack_timeout(self, attempt: int = 1) -> float:
+    return self._rtt.timeout(attempt) if self.adaptive_timeout else self._soc_timeout
 
   def _handle_ack(self, data: bytes, req_id: int) -> GVCPAck:
     response = GVCPAck(data)
@@ -1290,12 +1696,23 @@ class GVCP:
         self._soc.settimeout(timeout / 1000 + 0.01)
         self._pending = True
     elif self._pending:
-      self._soc.settimeout(self._soc_timeout)
+      self._soc.settimeout(self._ack_timeout())
       self._pending = False
 
     # Return payload
     return response
 
+  def _discard_acks(self, pending: dict) -> None:
+    # Receive acknowledgements of unfinished commands so they are not mistaken for responses to the next command
+    while len(pending) > 0:
+      try:
+        ack_data = self._soc.recv(ETH_MAX_MTU)
+      except socket.timeout:
+        break
+      if len(ack_data) >= GVCP_HEADER_SIZE:
+        pending.pop(bytes_to_uint16(ack_data[6:8]), None)
+    self._pending = False
+
   def _heartbeat(self):
     if self.verbose:
       print("GVCP: Starting to send heartbeat")
@@ -1321,18 +1738,54 @@ class GVCP:
     capability = self.readreg(REG_GVCP_CAPABILITY, int)
     self.concat_support = bool(capability & 0x00000001)
     self.writemem_support = bool(capability & 0x00000002)
+    self.packetresend_support = bool(capability & 0x00000004)
     self.action_support = bool(capability & 0x00000040)
     self.scheduled_action_support = bool(capability & 0x00020000)
 
+# Register cache policies of PortGVCP
+CACHE_NEVER = 0 # Always read from the camera, for volatile registers like temperatures
+CACHE_UNTIL_WRITE = 1 # Cached until the register or a register that invalidates it is written (see PortGVCP.set_invalidators)
+CACHE_ALWAYS = 2 # Cached until the register itself is written, for constant registers
+def format_cache_policy(policy: int) -> str:
+  if policy == CACHE_NEVER:
+    return "Never"
+  elif policy == CACHE_UNTIL_WRITE:
+    return "Until write"
+  elif policy == CACHE_ALWAYS:
+    return "Always"
+  else:
+    return "Invalid policy"
+
 class PortGVCP(AbstractPort):
-  """GenICam port interface - to access GVCP module from device description NodeMap"""
+  """
+  GenICam port interface - to access GVCP module from device description NodeMap
+
+  Values read through the port are cached, so that reading the same register again does not need a
+  round trip to the camera. By default a cached value is valid until the register itself or
+  a register that invalidates it (pInvalidator in the device description) is written. Until the
+  invalidators are given with set_invalidators, any write invalidates all cached values. This can be
+  changed per register with set_cache_policy.
+  """
 
-  def __init__(self, gvcp: GVCP):
+  def __init__(self, gvcp: GVCP, cache: bool = True):
+    """
+    :param gvcp: Connected GVCP instance
+    :param cache: Cache read values
+    """
     super().__init__()
     if isinstance(gvcp, GVCP):
       self.gvcp = gvcp
     else:
       raise TypeError('Port must be initialized with a GVCP object.')
+    self.cache_enabled = cache
+    self.cache_hits = 0
+    self.cache_misses = 0
+    self._cache: dict[tuple[int, int], bytes] = {}
+    self._cache_policy: dict[int, int] = {}
+    self._cache_lock = threading.Lock()
+    self._cache_writes = 0
+    self._invalidators: Union[dict[int, set[int]], None] = None
+    self._recorded: Union[set[int], None] = None
 
   def is_open(self) -> bool:
     """Is connection to the camera open (for configuration)"""
@@ -1340,17 +1793,150 @@ class PortGVCP(AbstractPort):
 
   def write(self, address: int, value: bytes) -> None:
     """Write value through GVCP module"""
-    if len(value) <= 4:
-      self.gvcp.writereg(address, bytes_to_uint32(value))
-    else:
-      self.gvcp.writemem(address, value)
+    # Written value is not cached, the camera may clamp or round it. Invalidating again after the
+    # write drops values that were read while the write was on its way.
+    self._invalidate(address, len(value))
+    try:
+      if len(value) <= 4:
+        self.gvcp.writereg(address, bytes_to_uint32(value))
+      else:
+        self.gvcp.writemem(address, value)
+    finally:
+      self._invalidate(address, len(value))
 
   def read(self, address: int, length: int) -> bytes:
     """Read value through GVCP module"""
+    key = (address, length)
+    with self._cache_lock:
+      if self._recorded != None:
+        self._recorded.add(address)
+      policy = self._cache_policy.get(address, CACHE_UNTIL_WRITE) if self.cache_enabled else CACHE_NEVER
+      if policy != CACHE_NEVER:
+        if key in self._cache:
+          self.cache_hits += 1
+          return self._cache[key]
+        self.cache_misses += 1
+      writes = self._cache_writes
     if length <= 4:
-      return self.gvcp.readreg(address, bytes)
+      value = self.gvcp.readreg(address, bytes)
     else:
-      return self.gvcp.readmem(address, length, bytes)
+      value = self.gvcp.readmem(address, length, bytes)
+    if policy != CACHE_NEVER:
+      with self._cache_lock:
+        # Value may be outdated already if something was written in the meantime
+        if writes == self._cache_writes:
+          self._cache[key] = value
+    return value
+
+  def prefetch(self, addresses: Iterable[int]) -> None:
+    """
+    Read 4 byte registers into the cache with as few concatenated READREG commands as possible.
+    Registers that are cached already or never cached are skipped. Nothing is done if the camera
+    does not support register concatenation.
+
+    :param addresses: Addresses of the registers
+    :returns: None
+    :raises NotConnectedError: No connection
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if not self.cache_enabled:
+      return
+    if self.gvcp.concat_support == None:
+      self.gvcp._check_capability()
+    if not self.gvcp.concat_support:
+      return
+    with self._cache_lock:
+      addresses = [address for address in dict.fromkeys(addresses) if (address, 4) not in self._cache and
+        self._cache_policy.get(address, CACHE_UNTIL_WRITE) != CACHE_NEVER]
+    for i in range(0, len(addresses), READREG_MAX_COUNT):
+      chunk = addresses[i:i+READREG_MAX_COUNT]
+      with self._cache_lock:
+        writes = self._cache_writes
+      try:
+        values = self.gvcp.readreg(chunk, bytes) if len(chunk) > 1 else self.gvcp.readreg(chunk[0], bytes)
+      except AckError:
+        continue # Some register is not readable, leave them to be read one by one
+      with self._cache_lock:
+        self.cache_misses += len(chunk)
+        if writes == self._cache_writes:
+          for j, address in enumerate(chunk):
+            self._cache[(address, 4)] = values[4*j:4*j+4]
+
+  def set_cache_policy(self, address: int, policy: int) -> None:
+    """
+    Set cache policy of a register.
+
+    :param address: Address of the register
+    :param policy: CACHE_NEVER, CACHE_UNTIL_WRITE (default) or CACHE_ALWAYS
+    :returns: None
+    :raises ValueError: Invalid policy
+    """
+    if policy not in (CACHE_NEVER, CACHE_UNTIL_WRITE, CACHE_ALWAYS):
+      raise ValueError("Invalid cache policy")
+    with self._cache_lock:
+      self._cache_policy[address] = policy
+      for key in [key for key in self._cache if key[0] == address]:
+        del self._cache[key]
+
+  def set_invalidators(self, invalidators: dict[int, Iterable[int]]) -> None:
+    """
+    Set which registers are invalidated when a register is written, usually collected from pInvalidator
+    elements of the device description. After this a write invalidates only the written register and
+    the registers that depend on it.
+
+    :param invalidators: Register address: addresses of the registers that change when it is written
+    :returns: None
+    """
+    with self._cache_lock:
+      self._invalidators = {address: set(dependents) for address, dependents in invalidators.items()}
+      self._cache.clear()
+
+  def clear_cache(self, addresses: Union[Iterable[int], None] = None) -> None:
+    """
+    Forget cached values.
+
+    :param addresses: Addresses of the registers to forget, or None to forget all
+    :returns: None
+    """
+    with self._cache_lock:
+      if addresses == None:
+        self._cache.clear()
+        return
+      addresses = set(addresses)
+      for key in [key for key in self._cache if key[0] in addresses]:
+        del self._cache[key]
+
+  def record_reads(self, enable: bool) -> set[int]:
+    """
+    Start or stop recording addresses read through the port, e.g. to find registers of a feature.
+
+    :param enable: Start (True) or stop (False) recording
+    :returns: Addresses read since recording was started
+    """
+    with self._cache_lock:
+      recorded = self._recorded if self._recorded != None else set()
+      self._recorded = set() if enable else None
+    return recorded
+
+  def _invalidate(self, address: int, length: int) -> None:
+    # Written register is invalidated, other registers if their policy is CACHE_UNTIL_WRITE and they
+    # depend on the written register (directly or through other registers), or all of them if the
+    # dependencies are not known
+    with self._cache_lock:
+      self._cache_writes += 1
+      dependents = set()
+      if self._invalidators != None:
+        pending = [reg for reg in self._invalidators if reg < address + length and address <= reg]
+        while len(pending) > 0:
+          for reg in self._invalidators.get(pending.pop(), ()):
+            if reg not in dependents:
+              dependents.add(reg)
+              pending.append(reg)
+      for key in list(self._cache):
+        if key[0] < address + length and address < key[0] + key[1]:
+          del self._cache[key]
+        elif self._cache_policy.get(key[0], CACHE_UNTIL_WRITE) == CACHE_UNTIL_WRITE and (self._invalidators == None or key[0] in dependents):
+          del self._cache[key]
 
   def get_access_mode(self) -> EAccessMode:
     """Get access mode of this port (read / write)"""
@@ -10,6 +10,12 @@
   #pragma comment(lib, "ws2_32.lib")
 #endif
 
+// Linux can receive many packets with a single system call
+#if defined(__linux__)
+  #define _GNU_SOURCE 1
+  #define HAS_RECVMMSG 1
+#endif
+
 #define PY_SSIZE_T_CLEAN
 #define NPY_NO_DEPRECATED_API NPY_1_21_API_VERSION // Prevent usage of deprecated Numpy API
 
@@ -22,18 +28,40 @@
   #include <netinet/in.h>
   #include <arpa/inet.h>
   #include <pthread.h>
+  #include <time.h>
+  #include <math.h>
 #elif defined IS_WIN32
   #include <Ws2tcpip.h>
   #include <winsock2.h>
   #include <windows.h>
+  #include <math.h>
 #endif
 
 #define false 0
 #define true 1
 
 #define BUF_SIZE 2048
+#if defined HAS_RECVMMSG
+  #define RECV_BATCH 32 // Max number of packets per system call
+#else
+  #define RECV_BATCH 1
+#endif
 #define GVSP_HEADER_SIZE 8
 #define GVSP_TOTAL_HEADER_SIZE 36 // IP + UDP + GVSP header
+#define GVCP_HEADER_SIZE 8
+#define GVCP_KEY 0x42
+#define PACKETRESEND_CMD 0x0040
+
+// Status codes are compared without the severity bit (0x8000) and the reserved bits, see status_code
+#define STATUS_CODE_MASK 0x0FFF
+#define STATUS_PACKET_UNAVAILABLE 0x000C
+#define STATUS_PACKET_AND_PREV_REMOVED_FROM_MEMORY 0x0011
+#define STATUS_PACKET_REMOVED_FROM_MEMORY 0x0012
+#define STATUS_PACKET_RESEND 0x0100
+#define TRAILER_TIMEOUT 20 // Time (ms) without packets before the rest of a block without trailer is requested again
+
+#define POOL_SIZE 8 // Max number of free output buffers kept for reuse
+#define POOL_HEADER_SIZE 16 // Keeps the data of pool buffers 16-byte aligned
 
 #define MONO8 0x01080001
 #define MONO10 0x01100003
@@ -45,6 +73,7 @@
 typedef unsigned char bool;
 typedef unsigned short ushort;
 typedef unsigned long ulong;
+typedef unsigned long long ulonglong;
 typedef unsigned char byte;
 
 char errmsg[256];
@@ -53,6 +82,7 @@ char errmsg[256];
   typedef int soc_t;
   typedef pthread_mutex_t mutex_t;
   typedef pthread_t thread_t;
+  typedef pthread_cond_t cond_t;
   int lock_mutex(pthread_mutex_t *mutex)
   {
     return pthread_mutex_lock(mutex);
@@ -61,10 +91,19 @@ char errmsg[256];
   {
     return pthread_mutex_unlock(mutex);
   }
+  int wait_cond(pthread_cond_t *cond, pthread_mutex_t *mutex)
+  {
+    return pthread_cond_wait(cond, mutex);
+  }
+  int signal_cond(pthread_cond_t *cond)
+  {
+    return pthread_cond_signal(cond);
+  }
 #elif defined IS_WIN32
   typedef SOCKET soc_t;
   typedef HANDLE thread_t;
   typedef HANDLE mutex_t;
+  typedef HANDLE cond_t; // Auto-reset event
   typedef unsigned long in_addr_t;
   int lock_mutex(HANDLE *mutex)
   {
@@ -74,7 +113,177 @@ char errmsg[256];
   {
     return ReleaseMutex(mutex);
   }
+  int wait_cond(HANDLE *cond, HANDLE *mutex)
+  {
+    unlock_mutex(mutex);
+    WaitForSingleObject(*cond, INFINITE);
+    return lock_mutex(mutex);
+  }
+  int signal_cond(HANDLE *cond)
+  {
+    return SetEvent(*cond);
+  }
+#endif
+
+// Pool of output buffers. A buffer handed over to Python returns to the pool when its numpy array
+// is deleted. The pool is freed when it has been released and all of its buffers have returned.
+struct pool
+{
+  mutex_t lock;
+  ulong refs;       // Owner + buffers in use
+  size_t buf_size;
+  ulong free_count;
+  void *free_bufs[POOL_SIZE];
+};
+
+struct pool * create_pool(void)
+{
+  struct pool *p = malloc(sizeof (struct pool));
+  if (p == NULL)
+  {
+    return NULL;
+  }
+#if defined IS_UNIX
+  pthread_mutex_init(&p->lock, NULL);
+#elif defined IS_WIN32
+  p->lock = CreateMutex(NULL, false, NULL);
+#endif
+  p->refs = 1;
+  p->buf_size = 0;
+  p->free_count = 0;
+  return p;
+}
+
+// Protected by p->lock
+void free_pool_buffers(struct pool *p)
+{
+  while (p->free_count > 0)
+  {
+    p->free_count--;
+    free((byte *)p->free_bufs[p->free_count] - POOL_HEADER_SIZE);
+  }
+}
+
+// Drop a reference to the pool, the last one frees it
+void release_pool(struct pool *p)
+{
+  bool last;
+  lock_mutex(&p->lock);
+  p->refs--;
+  last = p->refs == 0;
+  if (last) free_pool_buffers(p);
+  unlock_mutex(&p->lock);
+  if (last)
+  {
+#if defined IS_UNIX
+    pthread_mutex_destroy(&p->lock);
+#elif defined IS_WIN32
+    CloseHandle(p->lock);
 #endif
+    free(p);
+  }
+}
+
+// Get a buffer of the given size from the pool, returns NULL if memory cannot be allocated
+void * pool_get(struct pool *p, size_t size)
+{
+  byte *buf = NULL;
+  lock_mutex(&p->lock);
+  // Frame format has changed, buffers of the old size are not needed anymore
+  if (size != p->buf_size)
+  {
+    free_pool_buffers(p);
+    p->buf_size = size;
+  }
+  if (p->free_count > 0)
+  {
+    p->free_count--;
+    buf = p->free_bufs[p->free_count];
+  }
+  else
+  {
+    // Header in front of the buffer tells where the buffer returns to
+    buf = malloc(POOL_HEADER_SIZE + size);
+    if (buf != NULL)
+    {
+      *(struct pool **)buf = p;
+      *(size_t *)(buf + sizeof (struct pool *)) = size;
+      buf += POOL_HEADER_SIZE;
+    }
+  }
+  if (buf != NULL) p->refs++;
+  unlock_mutex(&p->lock);
+  return buf;
+}
+
+// Return a buffer to its pool
+void pool_put(void *buf)
+{
+  byte *header = (byte *)buf - POOL_HEADER_SIZE;
+  struct pool *p = *(struct pool **)header;
+  size_t size = *(size_t *)(header + sizeof (struct pool *));
+  lock_mutex(&p->lock);
+  if (size == p->buf_size && p->free_count < POOL_SIZE)
+  {
+    p->free_bufs[p->free_count] = buf;
+    p->free_count++;
+  }
+  else
+  {
+    free(header);
+  }
+  unlock_mutex(&p->lock);
+  release_pool(p);
+}
+
+// States of a block reassembly slot
+#define BLOCK_FREE 0
+#define BLOCK_RECEIVING 1
+#define BLOCK_COMPLETE 2
+#define BLOCK_DROPPED 3
+#define BLOCK_DECODING 4 // Queued or being decoded by the delivery thread
+
+// Reassembly slot of a single block (frame). Several blocks can be received at the same time, so
+// that missing packets of a block can be requested again while the following blocks are arriving.
+struct block
+{
+  byte state;
+  ulong seq;              // Order in which leaders were received, blocks are output in this order
+  ulong block_id;
+  ulonglong timestamp;    // Camera timestamp from the leader
+  ulong pixel_format;
+  ulong size_x;
+  ulong size_s;
+  ulong frame_size;
+  ulong received_packets;
+  ulong next_packet_id;   // Packets before this have been received or requested again
+  bool trailer_received;
+  ulonglong deadline;     // Time (ms) to give up waiting for resent packets, 0 if not waiting yet
+  ulonglong last_packet;  // Time (ms) the last packet of the block was received
+  byte *packet_received;  // Flag for each packet of the block
+  byte *frame_buf;
+};
+
+// Stream statistics, counted since receiving was started
+struct stats
+{
+  ulonglong packets_received;
+  ulonglong bytes_received;
+  ulonglong packets_dropped;    // Missing packets of discarded frames
+  ulonglong packets_resent;     // Received with resend status
+  ulonglong resend_requests;
+  ulonglong frames_completed;
+  ulonglong frames_discarded;
+  // Interval between completed frames, running mean and sum of squared deviations (Welford)
+  ulonglong last_frame_time;    // us
+  ulonglong intervals;
+  double interval_mean;         // us
+  double interval_m2;
+  // Time spent in the frame callback
+  ulonglong callbacks;
+  double callback_time;         // Total, us
+  double callback_time_max;     // us
+};
 
 struct gvsp
 {
@@ -86,26 +295,61 @@ struct gvsp
   soc_t sockfd;
   ushort port;
   thread_t recv_thread;
+  thread_t deliver_thread;
 
   // Receiving enabled (this must be protected by g_en_lock)
   bool recv_en;
   mutex_t en_lock;
 
   // Image (these must be protected by g_frame_lock)
-  ulong size_x;
-  ulong size_s;
-  ulong frame_size;
-  bool leader_received;
-  ulong received_packets;
   ulong packet_count;
   ulong packet_size;
   ulong payload_size;
-  ulong pixel_format;
-  byte *frame_buf;
+  ulong block_count;
+  struct block *blocks;
+  ulong next_seq;
+  ulong output_seq;
   mutex_t frame_lock;
 
+  // Complete blocks waiting to be decoded and output (these must be protected by g_frame_lock)
+  struct block **queue;
+  ulong queue_start;
+  ulong queue_len;
+  bool deliver_en;
+  bool deliver_error;
+  cond_t deliver_cond;
+
+  // Packet resend (these must be protected by g_frame_lock)
+  soc_t resend_sockfd;    // Connected GVCP socket, -1 if resend is disabled
+  ulong resend_window;    // ms
+  ushort resend_req_id;
+
+  // Decoded lines waiting to be output (only used by the delivery thread)
+  ulong batch_lines;
+  ulong batch_count;
+  ulong batch_size_x;
+  ulong batch_size_s;
+  int batch_typenum;
+  int batch_bit_depth;
+  void *batch_buf;
+  ulonglong *batch_meta;  // Block ID and timestamp of each line in the batch
+  struct pool *pool;
+
+  // Band filter (set only while not receiving, used by the delivery thread)
+  ulong *bands;           // Indices of the bands to output, NULL for all bands
+  ulong band_count;
+  ulong band_max;         // Largest index in bands
+  ulong band_binning;     // Number of adjacent output bands to average into one
+  ulong *band_sum;        // Sums of binned pixels
+  void *band_row;         // One decoded band
+  ulong band_row_len;     // Pixels allocated for band_sum and band_row
+
   // Output for frame data
   PyObject *frame_cb;
+  bool frame_cb_meta;     // Pass metadata of the lines to the callback
+
+  // Statistics (these must be protected by g_frame_lock)
+  struct stats stats;
 };
 
 ulong bytes_to_uint16(byte *bytes)
@@ -123,6 +367,53 @@ ulong bytes_to_uint32(byte *bytes)
   return (*bytes << 24) + (*(bytes+1) << 16) + (*(bytes+2) << 8) + *(bytes+3);
 }
 
+ulonglong bytes_to_uint64(byte *bytes)
+{
+  return ((ulonglong)bytes_to_uint32(bytes) << 32) + bytes_to_uint32(bytes + 4);
+}
+
+void uint16_to_bytes(ulong value, byte *bytes)
+{
+  *bytes = (value >> 8) & 0xff;
+  *(bytes+1) = value & 0xff;
+}
+
+void uint32_to_bytes(ulong value, byte *bytes)
+{
+  *bytes = (value >> 24) & 0xff;
+  *(bytes+1) = (value >> 16) & 0xff;
+  *(bytes+2) = (value >> 8) & 0xff;
+  *(bytes+3) = value & 0xff;
+}
+
+// Monotonic time in milliseconds
+ulonglong now_ms(void)
+{
+#if defined IS_UNIX
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (ulonglong)ts.tv_sec * 1000 + ts.tv_nsec / 1000000;
+#elif defined IS_WIN32
+  return GetTickCount64();
+#endif
+}
+
+// Monotonic time in microseconds
+ulonglong now_us(void)
+{
+#if defined IS_UNIX
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (ulonglong)ts.tv_sec * 1000000 + ts.tv_nsec / 1000;
+#elif defined IS_WIN32
+  LARGE_INTEGER count;
+  LARGE_INTEGER freq;
+  QueryPerformanceCounter(&count);
+  QueryPerformanceFrequency(&freq);
+  return (ulonglong)(count.QuadPart / freq.QuadPart * 1000000 + count.QuadPart % freq.QuadPart * 1000000 / freq.QuadPart);
+#endif
+}
+
 PyObject * handle_py_error(void)
 {
   if (errno != 0)
@@ -224,7 +515,7 @@ bool has_no_socket(struct gvsp *g)
 
 bool has_buffer(struct gvsp *g)
 {
-  if (g->frame_buf != NULL)
+  if (g->blocks != NULL)
   {
     PyErr_SetString(PyExc_MemoryError, "Buffer already exists");
     return true;
@@ -234,7 +525,7 @@ bool has_buffer(struct gvsp *g)
 
 bool has_no_buffer(struct gvsp *g)
 {
-  if (g->frame_buf == NULL)
+  if (g->blocks == NULL)
   {
     PyErr_SetString(PyExc_MemoryError, "Buffer does not exist, you must first call gvsp.create_buffer()");
     return true;
@@ -247,9 +538,11 @@ void init_gvsp(struct gvsp *g)
 #if defined IS_UNIX
   mutex_t en_lock = PTHREAD_MUTEX_INITIALIZER;
   mutex_t frame_lock = PTHREAD_MUTEX_INITIALIZER;
+  cond_t deliver_cond = PTHREAD_COND_INITIALIZER;
 #elif defined IS_WIN32
   mutex_t en_lock = CreateMutex(NULL, false, NULL);
   mutex_t frame_lock = CreateMutex(NULL, false, NULL);
+  cond_t deliver_cond = CreateEvent(NULL, false, false, NULL);
 #endif
 
   g->verbose = false;
@@ -261,17 +554,46 @@ void init_gvsp(struct gvsp *g)
   g->recv_en = false;
   g->en_lock = en_lock;
 
-  g->size_x = 0;
-  g->size_s = 0;
-  g->leader_received = false;
-  g->received_packets = 0;
   g->packet_count = 0;
   g->packet_size = 0;
   g->payload_size = 0;
-  g->frame_buf = NULL;
+  g->block_count = 0;
+  g->blocks = NULL;
+  g->next_seq = 0;
+  g->output_seq = 0;
   g->frame_lock = frame_lock;
 
+  g->queue = NULL;
+  g->queue_start = 0;
+  g->queue_len = 0;
+  g->deliver_en = false;
+  g->deliver_error = false;
+  g->deliver_cond = deliver_cond;
+
+  g->resend_sockfd = -1;
+  g->resend_window = 50;
+  g->resend_req_id = 1;
+
+  g->batch_lines = 1;
+  g->batch_count = 0;
+  g->batch_size_x = 0;
+  g->batch_size_s = 0;
+  g->batch_buf = NULL;
+  g->batch_meta = NULL;
+  g->pool = NULL;
+
+  g->bands = NULL;
+  g->band_count = 0;
+  g->band_max = 0;
+  g->band_binning = 1;
+  g->band_sum = NULL;
+  g->band_row = NULL;
+  g->band_row_len = 0;
+
   g->frame_cb = NULL;
+  g->frame_cb_meta = false;
+
+  memset(&g->stats, 0, sizeof g->stats);
 }
 
 struct gvsp * get_gvsp(PyObject *args, PyObject *kwargs)
@@ -288,15 +610,27 @@ struct gvsp * get_gvsp(PyObject *args, PyObject *kwargs)
 void free_frame(void *caps)
 {
   void *buf = PyCapsule_GetPointer(caps, PyCapsule_GetName(caps));
-  free(buf);
+  pool_put(buf);
+}
+
+ulong status_code(byte *buf)
+{
+  return bytes_to_uint16(buf) & STATUS_CODE_MASK;
+}
+
+// Camera does not have the requested packet anymore
+bool is_packet_unavailable(ulong code)
+{
+  return code == STATUS_PACKET_UNAVAILABLE || code == STATUS_PACKET_AND_PREV_REMOVED_FROM_MEMORY ||
+    code == STATUS_PACKET_REMOVED_FROM_MEMORY;
 }
 
 bool validate_header(struct gvsp *g, byte *buf)
 {
-  ulong status;
-  if (*buf != 0 || *(buf+1) != 0)
+  ulong status = bytes_to_uint16(buf);
+  ulong code = status & STATUS_CODE_MASK;
+  if (code != 0 && code != STATUS_PACKET_RESEND)
   {
-    status = bytes_to_uint16(buf);
     if (g->warnings) printf("GVSP WARNING: Received packet with status: 0x%04lx\n", status);
     return false;
   }
@@ -312,139 +646,543 @@ bool validate_header(struct gvsp *g, byte *buf)
   return true;
 }
 
-void * decode_mono8(struct gvsp *g, int *typenum)
+// Decoders write a span of pixels (a whole frame or a single band of it) to the output buffer
+void decode_mono8(byte *buf, byte *frame, ulong pixels)
 {
-  ulong payload_size = (g->size_s * g->size_x);
-  byte *frame = malloc(g->size_s * g->size_x * sizeof(byte));
-  if (frame == NULL)
-  {
-    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
-    return NULL;
-  }
-  memcpy(frame, g->frame_buf, payload_size);
-  *typenum = NPY_UINT8;
-  return frame;
+  memcpy(frame, buf, pixels);
 }
 
-void * decode_mono10(struct gvsp *g, int *typenum)
+void decode_mono10(byte *buf, ushort *frame, ulong pixels)
 {
-  ulong payload_size = g->size_s * g->size_x * 2;
-  ushort *frame = malloc(g->size_s * g->size_x * sizeof(ushort));
+  ulong payload_size = pixels * 2;
   ulong buf_i;
   byte *buf_p;
 
-  if (frame == NULL)
-  {
-    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
-    return NULL;
-  }
   for (buf_i = 0; buf_i < payload_size; buf_i += 2)
   {
-    buf_p = g->frame_buf + buf_i;
+    buf_p = buf + buf_i;
     *(frame + (buf_i >> 1)) = ((*(buf_p+1) & 0x03) << 8) + *buf_p;
   }
-
-  *typenum = NPY_UINT16;
-  return frame;
 }
 
-void * decode_mono10packed(struct gvsp *g, int *typenum)
+void decode_mono10packed(byte *buf, ushort *frame, ulong pixels)
 {
-  ulong payload_size = ((g->size_s * g->size_x) >> 1) * 3;
-  ushort *frame = malloc(g->size_s * g->size_x * sizeof(ushort));
+  ulong payload_size = (pixels >> 1) * 3;
   ulong frame_i = 0;
   ulong buf_i;
   byte *buf_p;
 
-  if (frame == NULL)
-  {
-    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
-    return NULL;
-  }
   for (buf_i = 0; buf_i < payload_size; buf_i += 3)
   {
-    frame_i += 2;
-    buf_p = g->frame_buf + buf_i;
+    buf_p = buf + buf_i;
     *(frame + frame_i) = (*(buf_p) << 2) + (*(buf_p+1) & 0x03);
     *(frame + frame_i + 1) = (*(buf_p+2) << 2) + ((*(buf_p+1) & 0x30) >> 4);
+    frame_i += 2;
   }
-
-  *typenum = NPY_UINT16;
-  return frame;
 }
 
-void * decode_mono12(struct gvsp *g, int *typenum)
+void decode_mono12(byte *buf, ushort *frame, ulong pixels)
 {
-  ulong payload_size = g->size_s * g->size_x * 2;
-  ushort *frame = malloc(g->size_s * g->size_x * sizeof(ushort));
+  ulong payload_size = pixels * 2;
   ulong buf_i;
   byte *buf_p;
 
-  if (frame == NULL)
-  {
-    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
-    return NULL;
-  }
   for (buf_i = 0; buf_i < payload_size; buf_i += 2)
   {
-    buf_p = g->frame_buf + buf_i;
+    buf_p = buf + buf_i;
     *(frame + (buf_i >> 1)) = ((*(buf_p+1) & 0x0f) << 8) + *buf_p;
   }
-
-  *typenum = NPY_UINT16;
-  return frame;
 }
 
-void * decode_mono12packed(struct gvsp *g, int *typenum)
+void decode_mono12packed(byte *buf, ushort *frame, ulong pixels)
 {
-  ulong payload_size = ((g->size_s * g->size_x) >> 1) * 3;
-  ushort *frame = malloc(g->size_s * g->size_x * sizeof(ushort));
+  ulong payload_size = (pixels >> 1) * 3;
   ulong frame_i = 0;
   ulong buf_i;
   byte *buf_p;
 
-  if (frame == NULL)
-  {
-    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
-    return NULL;
-  }
   for (buf_i = 0; buf_i < payload_size; buf_i += 3)
   {
-    frame_i += 2;
-    buf_p = g->frame_buf + buf_i;
+    buf_p = buf + buf_i;
     *(frame + frame_i) = (*(buf_p) << 4) + (*(buf_p+1) & 0x0f);
     *(frame + frame_i + 1) = (*(buf_p+2) << 4) + ((*(buf_p+1) & 0xf0) >> 4);
+    frame_i += 2;
   }
-
-  *typenum = NPY_UINT16;
-  return frame;
 }
 
-void * decode_mono16(struct gvsp *g, int *typenum)
+void decode_mono16(byte *buf, ushort *frame, ulong pixels)
 {
-  ulong payload_size = g->size_s * g->size_x * 2;
-  ushort *frame = malloc(g->size_s * g->size_x * sizeof(ushort));
+  ulong payload_size = pixels * 2;
   ulong buf_i;
   byte *buf_p;
 
-  if (frame == NULL)
-  {
-    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
-    return NULL;
-  }
   for (buf_i = 0; buf_i < payload_size; buf_i += 2)
   {
-    buf_p = g->frame_buf + buf_i;
+    buf_p = buf + buf_i;
     *(frame + (buf_i >> 1)) = (*(buf_p+1) << 8) + *buf_p;
   }
+}
+
+// Get numpy type number and bit depth of a pixel format, returns false if format is not supported
+bool get_pixel_format(ulong pixel_format, int *typenum, int *bit_depth)
+{
+  switch (pixel_format)
+  {
+    case MONO8:
+      *typenum = NPY_UINT8;
+      *bit_depth = 8;
+      return true;
+    case MONO10:
+    case MONO10PACKED:
+      *typenum = NPY_UINT16;
+      *bit_depth = 10;
+      return true;
+    case MONO12:
+    case MONO12PACKED:
+      *typenum = NPY_UINT16;
+      *bit_depth = 12;
+      return true;
+    case MONO16:
+      *typenum = NPY_UINT16;
+      *bit_depth = 16;
+      return true;
+    default:
+      return false;
+  }
+}
+
+// Decode a span of pixels starting from the given pixel of the received frame data (pixel format must
+// be supported)
+void decode_pixels(struct block *b, ulong start, void *frame, ulong pixels)
+{
+  switch (b->pixel_format)
+  {
+    case MONO8:
+      decode_mono8(b->frame_buf + start, frame, pixels);
+      break;
+    case MONO10:
+      decode_mono10(b->frame_buf + start * 2, frame, pixels);
+      break;
+    case MONO10PACKED:
+      decode_mono10packed(b->frame_buf + (start >> 1) * 3, frame, pixels);
+      break;
+    case MONO12:
+      decode_mono12(b->frame_buf + start * 2, frame, pixels);
+      break;
+    case MONO12PACKED:
+      decode_mono12packed(b->frame_buf + (start >> 1) * 3, frame, pixels);
+      break;
+    case MONO16:
+      decode_mono16(b->frame_buf + start * 2, frame, pixels);
+      break;
+  }
+}
+
+// Decode received frame data to the output buffer (pixel format must be supported)
+void decode_frame(struct block *b, void *frame)
+{
+  decode_pixels(b, 0, frame, b->frame_size);
+}
+
+// Number of bands in an output frame, 0 if the band filter does not fit the frame
+ulong output_band_count(struct gvsp *g, struct block *b)
+{
+  if (g->bands != NULL)
+  {
+    return g->band_max < b->size_s ? g->band_count / g->band_binning : 0;
+  }
+  return b->size_s / g->band_binning;
+}
+
+// Decode the bands selected by the band filter and average binned bands (only used by the delivery
+// thread)
+int decode_bands(struct gvsp *g, struct block *b, void *frame, int typenum, ulong out_bands)
+{
+  ulong band;
+  ulong out_i;
+  ulong bin_i;
+  ulong i;
+  ulong size_x = b->size_x;
+  ulong pixel_bytes = typenum == NPY_UINT8 ? sizeof (byte) : sizeof (ushort);
+
+  // Without binning selected bands are decoded straight to the output
+  if (g->band_binning == 1)
+  {
+    for (out_i = 0; out_i < out_bands; out_i++)
+    {
+      band = g->bands != NULL ? g->bands[out_i] : out_i;
+      decode_pixels(b, band * size_x, (byte *)frame + out_i * size_x * pixel_bytes, size_x);
+    }
+    return 0;
+  }
+
+  if (g->band_row_len < size_x)
+  {
+    free(g->band_sum);
+    free(g->band_row);
+    g->band_sum = malloc(size_x * sizeof (ulong));
+    g->band_row = malloc(size_x * sizeof (ushort));
+    g->band_row_len = size_x;
+    if (g->band_sum == NULL || g->band_row == NULL)
+    {
+      g->band_row_len = 0;
+      return -1;
+    }
+  }
+
+  for (out_i = 0; out_i < out_bands; out_i++)
+  {
+    memset(g->band_sum, 0, size_x * sizeof (ulong));
+    for (bin_i = 0; bin_i < g->band_binning; bin_i++)
+    {
+      band = out_i * g->band_binning + bin_i;
+      band = g->bands != NULL ? g->bands[band] : band;
+      decode_pixels(b, band * size_x, g->band_row, size_x);
+      if (typenum == NPY_UINT8)
+      {
+        for (i = 0; i < size_x; i++) g->band_sum[i] += ((byte *)g->band_row)[i];
+      }
+      else
+      {
+        for (i = 0; i < size_x; i++) g->band_sum[i] += ((ushort *)g->band_row)[i];
+      }
+    }
+    // Average keeps the bit depth of the pixels
+    if (typenum == NPY_UINT8)
+    {
+      for (i = 0; i < size_x; i++) ((byte *)frame)[out_i * size_x + i] = g->band_sum[i] / g->band_binning;
+    }
+    else
+    {
+      for (i = 0; i < size_x; i++) ((ushort *)frame)[out_i * size_x + i] = g->band_sum[i] / g->band_binning;
+    }
+  }
+  return 0;
+}
+
+void free_band_filter(struct gvsp *g)
+{
+  free(g->bands);
+  free(g->band_sum);
+  free(g->band_row);
+  g->bands = NULL;
+  g->band_count = 0;
+  g->band_max = 0;
+  g->band_binning = 1;
+  g->band_sum = NULL;
+  g->band_row = NULL;
+  g->band_row_len = 0;
+}
+
+// Output decoded lines of the batch buffer as a numpy.ndarray and start a new batch
+int output_batch(struct gvsp *g)
+{
+  PyGILState_STATE gil;
+  PyObject *frame_py;
+  PyObject *args_py;
+  PyObject *caps_py;
+  PyObject *meta_py;
+  PyObject *result_py;
+  npy_intp nds[] = {g->batch_count, g->batch_size_s, g->batch_size_x};
+  npy_intp meta_nds[] = {g->batch_count, 2};
+  int nd = g->batch_lines > 1 ? 3 : 2;
+  int status = 0;
+  ulonglong start;
+  double duration;
+
+  if (g->batch_count == 0)
+  {
+    return 0;
+  }
+
+  // Create numpy.ndarray of the batch, single lines are output as 2D arrays
+  gil = PyGILState_Ensure();
+  frame_py = PyArray_SimpleNewFromData(nd, nd == 3 ? nds : nds + 1, g->batch_typenum, g->batch_buf);
+  if (frame_py == NULL)
+  {
+    strcpy(errmsg, "GVSP ERROR: Failed to create numpy.ndarray from a frame, STOPPING THREAD");
+    pool_put(g->batch_buf);
+    status = -1;
+    goto out;
+  }
+  caps_py = PyCapsule_New(g->batch_buf, "wrapped_buffer", (PyCapsule_Destructor)&free_frame);
+  if (PyArray_SetBaseObject((PyArrayObject*)frame_py, caps_py) == -1)
+  {
+    strcpy(errmsg, "GVSP ERROR: Failed to set destructor function for frame, STOPPING THREAD");
+    Py_DECREF(frame_py);
+    status = -1;
+    goto out;
+  }
+
+  // Ouput frame
+  if (g->frame_cb != NULL)
+  {
+    if (g->frame_cb_meta)
+    {
+      // Metadata has the same leading dimension as the frame data
+      meta_py = PyArray_SimpleNew(nd - 1, nd == 3 ? meta_nds : meta_nds + 1, NPY_UINT64);
+      if (meta_py == NULL)
+      {
+        strcpy(errmsg, "GVSP ERROR: Failed to create numpy.ndarray from frame metadata, STOPPING THREAD");
+        Py_DECREF(frame_py);
+        status = -1;
+        goto out;
+      }
+      memcpy(PyArray_DATA((PyArrayObject*)meta_py), g->batch_meta, g->batch_count * 2 * sizeof (ulonglong));
+      args_py = Py_BuildValue("(OiN)", frame_py, g->batch_bit_depth, meta_py);
+    }
+    else
+    {
+      args_py = Py_BuildValue("(Oi)", frame_py, g->batch_bit_depth);
+    }
+    start = now_us();
+    result_py = PyObject_CallObject(g->frame_cb, args_py);
+    duration = (double)(now_us() - start);
+    if (result_py == NULL)
+    {
+      PyErr_Print();
+    }
+    Py_XDECREF(result_py);
+    Py_DECREF(args_py);
+    lock_mutex(&g->frame_lock);
+    g->stats.callbacks++;
+    g->stats.callback_time += duration;
+    if (duration > g->stats.callback_time_max) g->stats.callback_time_max = duration;
+    unlock_mutex(&g->frame_lock);
+  }
+  Py_DECREF(frame_py);
+
+out:
+  PyGILState_Release(gil);
+  g->batch_buf = NULL;
+  g->batch_count = 0;
+  return status;
+}
+
+// A completed frame cannot be output, count it as discarded instead (only used by the delivery thread)
+void discard_output_frame(struct gvsp *g)
+{
+  lock_mutex(&g->frame_lock);
+  g->stats.frames_completed--;
+  g->stats.frames_discarded++;
+  unlock_mutex(&g->frame_lock);
+}
+
+// Decode a complete block to the batch buffer and output the batch when it is full (only used by the
+// delivery thread)
+int output_frame(struct gvsp *g, struct block *b)
+{
+  int typenum;
+  int bit_depth;
+  ulong size_s;
+  ulong frame_bytes;
+
+  if (!get_pixel_format(b->pixel_format, &typenum, &bit_depth))
+  {
+    if (g->warnings) printf("GVSP WARNING: Pixel format is not supported\n");
+    discard_output_frame(g);
+    return 0;
+  }
+  size_s = output_band_count(g, b);
+  if (size_s == 0)
+  {
+    if (g->warnings) printf("GVSP WARNING: Band filter does not match the frame, frame dropped\n");
+    discard_output_frame(g);
+    return 0;
+  }
+
+  // Frame format changed in the middle of a batch, output lines received so far
+  if (g->batch_buf != NULL && (g->batch_typenum != typenum || g->batch_bit_depth != bit_depth ||
+    g->batch_size_s != size_s || g->batch_size_x != b->size_x))
+  {
+    if (output_batch(g) < 0) return -1;
+  }
+
+  // Start a new batch
+  frame_bytes = size_s * b->size_x * (typenum == NPY_UINT8 ? sizeof (byte) : sizeof (ushort));
+  if (g->batch_buf == NULL)
+  {
+    g->batch_buf = pool_get(g->pool, frame_bytes * g->batch_lines);
+    if (g->batch_buf == NULL)
+    {
+      strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for a frame, STOPPING THREAD");
+      return -1;
+    }
+    g->batch_typenum = typenum;
+    g->batch_bit_depth = bit_depth;
+    g->batch_size_s = size_s;
+    g->batch_size_x = b->size_x;
+  }
+
+  // Decode received frame data and output the batch when it is full
+  if (g->bands == NULL && g->band_binning == 1)
+  {
+    decode_frame(b, (byte *)g->batch_buf + g->batch_count * frame_bytes);
+  }
+  else if (decode_bands(g, b, (byte *)g->batch_buf + g->batch_count * frame_bytes, typenum, size_s) < 0)
+  {
+    strcpy(errmsg, "GVSP ERROR: Failed to allocate memory for band binning, STOPPING THREAD");
+    return -1;
+  }
+  g->batch_meta[g->batch_count * 2] = b->block_id;
+  g->batch_meta[g->batch_count * 2 + 1] = b->timestamp;
+  g->batch_count++;
+  if (g->batch_count >= g->batch_lines)
+  {
+    return output_batch(g);
+  }
+  return 0;
+}
+
+// Count a completed frame and the interval since the previous one (protected by g_frame_lock)
+void count_frame(struct gvsp *g)
+{
+  ulonglong now = now_us();
+  double interval;
+  double delta;
+
+  g->stats.frames_completed++;
+  if (g->stats.last_frame_time != 0)
+  {
+    interval = (double)(now - g->stats.last_frame_time);
+    g->stats.intervals++;
+    delta = interval - g->stats.interval_mean;
+    g->stats.interval_mean += delta / g->stats.intervals;
+    g->stats.interval_m2 += delta * (interval - g->stats.interval_mean);
+  }
+  g->stats.last_frame_time = now;
+}
+
+// Queue finished blocks for the delivery thread in the order their leaders were received. A block
+// that is still receiving holds back the blocks after it, so that lines are never reordered.
+void output_blocks(struct gvsp *g)
+{
+  struct block *b;
+  ulong i;
 
-  *typenum = NPY_UINT16;
-  return frame;
+  while (true)
+  {
+    b = NULL;
+    for (i = 0; i < g->block_count; i++)
+    {
+      if (g->blocks[i].state != BLOCK_FREE && g->blocks[i].state != BLOCK_DECODING && g->blocks[i].seq == g->output_seq)
+      {
+        b = &g->blocks[i];
+        break;
+      }
+    }
+    if (b == NULL || b->state == BLOCK_RECEIVING)
+    {
+      return;
+    }
+    if (b->state == BLOCK_COMPLETE)
+    {
+      count_frame(g);
+      b->state = BLOCK_DECODING;
+      g->queue[(g->queue_start + g->queue_len) % g->block_count] = b;
+      g->queue_len++;
+      signal_cond(&g->deliver_cond);
+    }
+    else
+    {
+      b->state = BLOCK_FREE;
+    }
+    g->output_seq++;
+  }
+}
+
+struct block * find_block(struct gvsp *g, ulong block_id)
+{
+  ulong i;
+  for (i = 0; i < g->block_count; i++)
+  {
+    if (g->blocks[i].state == BLOCK_RECEIVING && g->blocks[i].block_id == block_id)
+    {
+      return &g->blocks[i];
+    }
+  }
+  return NULL;
+}
+
+void drop_block(struct gvsp *g, struct block *b)
+{
+  if (g->warnings) printf("GVSP WARNING: %ld packets dropped\n", g->packet_count - b->received_packets);
+  g->stats.packets_dropped += g->packet_count - b->received_packets;
+  g->stats.frames_discarded++;
+  b->state = BLOCK_DROPPED;
+}
+
+// Ask the camera to send packets first...last of a block again (through the GVCP control channel)
+void request_resend(struct gvsp *g, struct block *b, ulong first, ulong last)
+{
+  byte cmd[GVCP_HEADER_SIZE + 12];
+
+  cmd[0] = GVCP_KEY;
+  cmd[1] = 0x00; // Packet resend is never acknowledged
+  uint16_to_bytes(PACKETRESEND_CMD, cmd + 2);
+  uint16_to_bytes(12, cmd + 4);
+  uint16_to_bytes(g->resend_req_id, cmd + 6);
+  uint16_to_bytes(0, cmd + 8); // Stream channel
+  uint16_to_bytes(b->block_id, cmd + 10);
+  uint32_to_bytes(first, cmd + 12);
+  uint32_to_bytes(last, cmd + 16);
+  g->resend_req_id = g->resend_req_id == 0xffff ? 1 : g->resend_req_id + 1;
+
+  if (send(g->resend_sockfd, (const char *)cmd, sizeof cmd, 0) < 0)
+  {
+    if (g->warnings) printf("GVSP WARNING: Failed to send packet resend request\n");
+    return;
+  }
+  g->stats.resend_requests++;
+  if (g->verbose) printf("GVSP: Requested packets %ld-%ld of block %ld again\n", first, last, b->block_id);
+}
+
+// No more packets of a block are expected but its trailer has not arrived, request the rest of the
+// block again including the trailer and wait for them until the end of the resend window
+void request_tail(struct gvsp *g, struct block *b, ulonglong now)
+{
+  request_resend(g, b, b->next_packet_id, g->packet_count + 1);
+  b->next_packet_id = g->packet_count + 1;
+  b->deadline = now + g->resend_window;
+}
+
+// Give up on blocks whose resend window has passed, and request the end of blocks whose trailer
+// has not arrived although no packets have been received for a while (e.g. last block of a burst)
+int check_deadlines(struct gvsp *g)
+{
+  ulonglong now;
+  bool dropped = false;
+  struct block *b;
+  ulong i;
+
+  if (g->resend_sockfd < 0) return 0;
+  now = now_ms();
+  for (i = 0; i < g->block_count; i++)
+  {
+    b = &g->blocks[i];
+    if (b->state != BLOCK_RECEIVING) continue;
+    if (b->deadline == 0 && now >= b->last_packet + TRAILER_TIMEOUT)
+    {
+      request_tail(g, b, now);
+    }
+    else if (b->deadline != 0 && now >= b->deadline)
+    {
+      drop_block(g, b);
+      dropped = true;
+    }
+  }
+  if (dropped) output_blocks(g);
+  return 0;
 }
 
 // Protected by g_frame_lock
 int handle_leader(struct gvsp *g, byte *buf, ulong buf_len)
 {
+  struct block *b = NULL;
+  struct block *oldest;
+  ulong block_id;
+  ulong i;
+
   // General for all payload types
   if (!validate_header(g, buf) || buf_len < 12)
   {
@@ -465,17 +1203,78 @@ int handle_leader(struct gvsp *g, byte *buf, ulong buf_len)
     if (g->warnings) printf("GVSP WARNING: Received invalid uncompressed image leader packet\n");
     return 0;
   }
-  if (*payload != 0)
+  if (*payload != 0)
+  {
+    if (g->warnings) printf("GVSP WARNING: Interlacing is not supported\n");
+    return 0;
+  }
+
+  // Leader was sent again
+  block_id = bytes_to_uint16(buf + 2);
+  if (find_block(g, block_id) != NULL)
+  {
+    return 0;
+  }
+
+  // Blocks before this one should have been received by now. Without resend they are lost, with
+  // resend the rest of a block without trailer is requested again and they get until the end of
+  // the window to receive the missing packets.
+  for (i = 0; i < g->block_count; i++)
+  {
+    if (g->blocks[i].state != BLOCK_RECEIVING) continue;
+    if (g->resend_sockfd < 0)
+    {
+      drop_block(g, &g->blocks[i]);
+    }
+    else if (g->blocks[i].deadline == 0)
+    {
+      request_tail(g, &g->blocks[i], now_ms());
+    }
+  }
+  output_blocks(g);
+
+  // Get a free slot, if all of them are in use give up on the oldest block
+  while (b == NULL)
   {
-    if (g->warnings) printf("GVSP WARNING: Interlacing is not supported\n");
-    return 0;
+    oldest = NULL;
+    for (i = 0; i < g->block_count; i++)
+    {
+      if (g->blocks[i].state == BLOCK_FREE)
+      {
+        b = &g->blocks[i];
+        break;
+      }
+      if (g->blocks[i].state == BLOCK_RECEIVING && g->blocks[i].seq == g->output_seq)
+      {
+        oldest = &g->blocks[i];
+      }
+    }
+    if (b != NULL) break;
+    if (oldest == NULL)
+    {
+      // All blocks are waiting for the delivery thread
+      if (g->warnings) printf("GVSP WARNING: Frame buffers are full, frame dropped\n");
+      g->stats.frames_discarded++;
+      return 0;
+    }
+    drop_block(g, oldest);
+    output_blocks(g);
   }
-  g->pixel_format = bytes_to_uint32(payload + 12);
-  g->size_x = bytes_to_uint32(payload + 16);
-  g->size_s = bytes_to_uint32(payload + 20);
-  g->frame_size = g->size_x * g->size_s;
-  g->received_packets = 0;
-  g->leader_received = true;
+
+  b->state = BLOCK_RECEIVING;
+  b->seq = g->next_seq++;
+  b->block_id = block_id;
+  b->timestamp = bytes_to_uint64(payload + 4);
+  b->pixel_format = bytes_to_uint32(payload + 12);
+  b->size_x = bytes_to_uint32(payload + 16);
+  b->size_s = bytes_to_uint32(payload + 20);
+  b->frame_size = b->size_x * b->size_s;
+  b->received_packets = 0;
+  b->next_packet_id = 1;
+  b->trailer_received = false;
+  b->deadline = 0;
+  b->last_packet = now_ms();
+  memset(b->packet_received, 0, g->packet_count);
   // TODO support for ROI / offset
   // TODO support for padding
   return 0;
@@ -484,119 +1283,211 @@ int handle_leader(struct gvsp *g, byte *buf, ulong buf_len)
 // Protected by g_frame_lock
 int handle_frame(struct gvsp *g, byte *buf, ulong buf_len)
 {
+  ulong status = bytes_to_uint16(buf);
+  ulong code = status & STATUS_CODE_MASK;
   ulong packet_id = bytes_to_uint24(buf + 5);
   ulong start = (packet_id - 1) * g->packet_size;
-  ulong i;
+  struct block *b = find_block(g, bytes_to_uint16(buf + 2));
+
+  // Leader has been lost or the block has been output or dropped already
+  if (b == NULL)
+  {
+    return 0;
+  }
+  if (code != 0 && code != STATUS_PACKET_RESEND)
+  {
+    if (g->warnings) printf("GVSP WARNING: Received packet with status: 0x%04lx\n", status);
+    // Camera does not have the requested packets anymore
+    if (is_packet_unavailable(code))
+    {
+      drop_block(g, b);
+      output_blocks(g);
+    }
+    return 0;
+  }
   if (GVSP_HEADER_SIZE + g->packet_size > buf_len)
   {
     if (g->warnings) printf("GVSP WARNING: Received data payload packet is too small, expected %ld bytes, received %ld bytes\n", GVSP_HEADER_SIZE + g->packet_size, buf_len);
     return 0;
   }
-  if (start + g->packet_size > g->payload_size)
+  if (packet_id < 1 || start + g->packet_size > g->payload_size)
   {
     if (g->warnings) printf("GVSP WARNING: Received data payload packet exceeds frame buffer size\n");
     return 0;
   }
-  for (i = 0; i < g->packet_size; i++)
+
+  // Packet was sent again
+  if (b->packet_received[packet_id - 1])
+  {
+    return 0;
+  }
+  memcpy(b->frame_buf + start, buf + GVSP_HEADER_SIZE, g->packet_size);
+  b->packet_received[packet_id - 1] = true;
+  b->received_packets++;
+  b->last_packet = now_ms();
+  if (code == STATUS_PACKET_RESEND) g->stats.packets_resent++;
+
+  // Request packets that were skipped
+  if (packet_id > b->next_packet_id)
   {
-    *(g->frame_buf + start + i) = *(buf + GVSP_HEADER_SIZE + i);
+    if (g->resend_sockfd >= 0) request_resend(g, b, b->next_packet_id, packet_id - 1);
+  }
+  if (packet_id >= b->next_packet_id)
+  {
+    b->next_packet_id = packet_id + 1;
+  }
+
+  // Last missing packet of a block waiting for resends
+  if (b->trailer_received && b->received_packets == g->packet_count)
+  {
+    b->state = BLOCK_COMPLETE;
+    output_blocks(g);
   }
-  g->received_packets++;
   return 0;
 }
 
 // Protected by g_frame_lock
 int handle_trailer(struct gvsp *g, byte *buf, ulong buf_len)
 {
-
-  if (!g->leader_received)
+  // Requested trailer is not available anymore, the block cannot be completed
+  if (is_packet_unavailable(status_code(buf)))
   {
-    if (g->warnings) printf("GVSP WARNING: Trailer received before leader\n");
+    struct block *b = find_block(g, bytes_to_uint16(buf + 2));
+    if (g->warnings) printf("GVSP WARNING: Received packet with status: 0x%04lx\n", bytes_to_uint16(buf));
+    if (b != NULL)
+    {
+      drop_block(g, b);
+      output_blocks(g);
+    }
     return 0;
   }
-  g->leader_received = false;
   if (!validate_header(g, buf) || buf_len < 12)
   {
     if (g->warnings) printf("GVSP WARNING: Received invalid trailer packet\n");
     return 0;
   }
-  if (g->received_packets != g->packet_count)
+  struct block *b = find_block(g, bytes_to_uint16(buf + 2));
+  if (b == NULL)
   {
-    if (g->warnings) printf("GVSP WARNING: %ld packets dropped\n", g->packet_count - g->received_packets);
+    if (g->warnings) printf("GVSP WARNING: Trailer received before leader\n");
     return 0;
   }
 
-  PyGILState_STATE gil;
-  PyObject *frame_py;
-  PyObject *args_py;
-  PyObject *caps_py;
-  void *frame = NULL; // unsigend char or usinged short
-  npy_intp nds[] = {g->size_s, g->size_x};
-  int typenum;
-  int bit_depth = 0;
+  // Trailer was sent again
+  if (b->trailer_received)
+  {
+    return 0;
+  }
+  b->trailer_received = true;
+  if (b->received_packets == g->packet_count)
+  {
+    b->state = BLOCK_COMPLETE;
+    output_blocks(g);
+    return 0;
+  }
+  if (g->resend_sockfd < 0)
+  {
+    drop_block(g, b);
+    output_blocks(g);
+    return 0;
+  }
 
-  // Decode received frame data
-  switch (g->pixel_format)
+  // Request missing packets at the end of the block and wait for the resent packets
+  if (b->next_packet_id <= g->packet_count)
   {
-    case MONO8:
-      frame = decode_mono8(g, &typenum);
-      bit_depth = 8;
-      break;
-    case MONO10:
-      frame = decode_mono10(g, &typenum);
-      bit_depth = 10;
-      break;
-    case MONO10PACKED:
-      frame = decode_mono10packed(g, &typenum);
-      bit_depth = 10;
-      break;
-    case MONO12:
-      frame = decode_mono12(g, &typenum);
-      bit_depth = 12;
-      break;
-    case MONO12PACKED:
-      frame = decode_mono12packed(g, &typenum);
-      bit_depth = 12;
-      break;
-    case MONO16:
-      frame = decode_mono16(g, &typenum);
-      bit_depth = 16;
-      break;
-    default:
-      if (g->warnings) printf("GVSP WARNING: Pixel format is not supported\n");
+    request_resend(g, b, b->next_packet_id, g->packet_count);
+    b->next_packet_id = g->packet_count + 1;
   }
-  if (frame == NULL)
+  if (b->deadline == 0)
   {
-    return -1;
+    b->deadline = now_ms() + g->resend_window;
   }
+  return 0;
+}
 
-  // Create numpy.ndarray of the frame
-  gil = PyGILState_Ensure();
-  frame_py = PyArray_SimpleNewFromData(2, nds, typenum, frame);
-  if (frame_py == NULL)
+// Protected by g_frame_lock
+int handle_packet(struct gvsp *g, byte *buf, ulong buf_len)
+{
+  ushort packet_format;
+
+  // E.g. the dummy packet sent to open the firewall
+  if (buf_len < GVSP_HEADER_SIZE)
   {
-    strcpy(errmsg, "GVSP ERROR: Failed to create numpy.ndarray from a frame, STOPPING THREAD");
-    return -1;
+    return 0;
   }
-  caps_py = PyCapsule_New(frame, "wrapped_buffer", (PyCapsule_Destructor)&free_frame);
-  if (PyArray_SetBaseObject((PyArrayObject*)frame_py, caps_py) == -1)
+  g->stats.packets_received++;
+  g->stats.bytes_received += buf_len;
+  packet_format = *(buf + 4) & 0x0f;
+  if (packet_format == 3)
   {
-    strcpy(errmsg, "GVSP ERROR: Failed to set destructor function for frame, STOPPING THREAD");
-    Py_DECREF(frame_py);
-    return -1;
+    return handle_frame(g, buf, buf_len);
+  }
+  else if (packet_format == 1)
+  {
+    return handle_leader(g, buf, buf_len);
+  }
+  else if (packet_format == 2)
+  {
+    return handle_trailer(g, buf, buf_len);
   }
+  return 0;
+}
 
-  // Ouput frame
-  if (g->frame_cb != NULL)
+// Decode queued blocks and output them. Runs in its own thread, so that the receiver can keep
+// reassembling the next blocks meanwhile.
+#if defined IS_UNIX
+void * deliver(void *vargp)
+#elif defined IS_WIN32
+DWORD deliver(void *vargp)
+#endif
+{
+  struct gvsp *g = vargp;
+  struct block *b;
+  int result = 0;
+
+  while (result == 0)
   {
-    args_py = Py_BuildValue("(Oi)", frame_py, bit_depth);
-    PyObject_CallObject(g->frame_cb, args_py);
-    Py_DECREF(args_py);
+    // Wait for a block, stop when receiving has stopped and the queue is empty
+    lock_mutex(&g->frame_lock);
+    while (g->queue_len == 0 && g->deliver_en)
+    {
+      wait_cond(&g->deliver_cond, &g->frame_lock);
+    }
+    if (g->queue_len == 0)
+    {
+      unlock_mutex(&g->frame_lock);
+      break;
+    }
+    b = g->queue[g->queue_start];
+    g->queue_start = (g->queue_start + 1) % g->block_count;
+    g->queue_len--;
+    unlock_mutex(&g->frame_lock);
+
+    // Block is not touched by the receiver until it is freed
+    result = output_frame(g, b);
+
+    lock_mutex(&g->frame_lock);
+    b->state = BLOCK_FREE;
+    unlock_mutex(&g->frame_lock);
   }
-  Py_DECREF(frame_py);
-  PyGILState_Release(gil);
 
+  // Flush partial batch
+  if (result == 0)
+  {
+    result = output_batch(g);
+  }
+  if (result < 0)
+  {
+    printf(errmsg);
+    lock_mutex(&g->frame_lock);
+    g->deliver_error = true;
+    unlock_mutex(&g->frame_lock);
+  }
+#if defined IS_UNIX
+  return NULL;
+#elif defined IS_WIN32
   return 0;
+#endif
 }
 
 #if defined IS_UNIX
@@ -607,15 +1498,19 @@ DWORD receive(void *vargp)
 {
   struct gvsp *g = vargp;
   byte *buf;
-#if defined IS_UNIX
+  int count;
+  int i;
+#if defined HAS_RECVMMSG
+  struct mmsghdr msgs[RECV_BATCH];
+  struct iovec iovecs[RECV_BATCH];
+#elif defined IS_UNIX
   ssize_t buf_len;
 #elif defined IS_WIN32
   int buf_len;
 #endif
-  ushort packet_format;
   int result = 0;
 
-  buf = malloc(BUF_SIZE);
+  buf = malloc(BUF_SIZE * RECV_BATCH);
   if (buf == NULL)
   {
     printf("GVSP ERROR: Failed to allocate memory, aborting thread");
@@ -626,26 +1521,42 @@ DWORD receive(void *vargp)
     return 0;
 #endif
   }
+#if defined HAS_RECVMMSG
+  memset(msgs, 0, sizeof msgs);
+  for (i = 0; i < RECV_BATCH; i++)
+  {
+    iovecs[i].iov_base = buf + i * BUF_SIZE;
+    iovecs[i].iov_len = BUF_SIZE;
+    msgs[i].msg_hdr.msg_iov = &iovecs[i];
+    msgs[i].msg_hdr.msg_iovlen = 1;
+  }
+#endif
   if (g->verbose) printf("GVSP: Receiver is listening port: %d\n", g->port);
   while (true)
   {
+    // Wait for a packet, with recvmmsg also take the packets already waiting in the socket buffer
+#if defined HAS_RECVMMSG
+    count = recvmmsg(g->sockfd, msgs, RECV_BATCH, MSG_WAITFORONE, NULL);
+#else
     buf_len = recv(g->sockfd, buf, BUF_SIZE, 0);
+    count = buf_len > 0 ? 1 : 0;
+#endif
     lock_mutex(&g->frame_lock);
-    if (buf_len > 0)
+    for (i = 0; i < count && result == 0; i++)
     {
-      packet_format = *(buf + 4) & 0x0f;
-      if (packet_format == 3)
-      {
-        result = handle_frame(g, buf, (ulong)buf_len);
-      }
-      else if (packet_format == 1)
-      {
-        result = handle_leader(g, buf, (ulong)buf_len);
-      }
-      else if (packet_format == 2)
-      {
-        result = handle_trailer(g, buf, (ulong)buf_len);
-      }
+#if defined HAS_RECVMMSG
+      result = handle_packet(g, buf + i * BUF_SIZE, msgs[i].msg_len);
+#else
+      result = handle_packet(g, buf, (ulong)buf_len);
+#endif
+    }
+    if (result == 0)
+    {
+      result = check_deadlines(g);
+    }
+    if (g->deliver_error)
+    {
+      result = -1;
     }
     lock_mutex(&g->en_lock);
     if (!g->recv_en)
@@ -658,7 +1569,6 @@ DWORD receive(void *vargp)
     unlock_mutex(&g->frame_lock);
     if (result < 0)
     {
-      printf(errmsg);
       break;
     }
   }
@@ -670,11 +1580,26 @@ DWORD receive(void *vargp)
 #endif
 }
 
+int set_recv_buffer_size(struct gvsp *g, int size)
+{
+  int actual = 0;
+  socklen_t actual_len = sizeof actual;
+  if (setsockopt(g->sockfd, SOL_SOCKET, SO_RCVBUF, (const char*)&size, sizeof size) < 0) return -1;
+  if (getsockopt(g->sockfd, SOL_SOCKET, SO_RCVBUF, (char*)&actual, &actual_len) < 0) return -1;
+#if defined(__linux__)
+  actual /= 2; // Linux reports double the size to account for bookkeeping overhead
+#endif
+  if (actual < size && g->warnings) printf("GVSP WARNING: Receive buffer is limited to %d bytes by the system\n", actual);
+  return 0;
+}
+
 int init_receive(struct gvsp *g)
 {
 #if defined IS_UNIX
+  pthread_create(&g->deliver_thread, NULL, deliver, g);
   pthread_create(&g->recv_thread, NULL, receive, g);
 #elif defined IS_WIN32
+  g->deliver_thread = CreateThread(NULL, 0, deliver, g, 0, NULL);
   g->recv_thread = CreateThread(NULL, 0, receive, g, 0, NULL);
 #endif
   return 0;
@@ -704,6 +1629,8 @@ int open_connection(struct gvsp *g, char *ip_str)
 
 static const char DOC_CREATE_SOCKET[] = "Create and bind a socket to receive frames from the camera.\n\n"
 ":param addr: Host IP address\n"
+":param recv_buffer_size: Size of the kernel receive buffer of the socket in bytes, default 0 (system default).\n"
+"  A large buffer prevents dropped packets during bursts, the OS may limit the size (e.g. net.core.rmem_max on Linux).\n"
 ":returns: Tuple of GVSP instance and host port\n"
 ":raises MemoryError: Failed to allocate memory for GVSP instance\n";
 static PyObject * create_socket(PyObject *self, PyObject *args, PyObject *kwargs)
@@ -712,8 +1639,9 @@ static PyObject * create_socket(PyObject *self, PyObject *args, PyObject *kwargs
 
   // Parse arguments
   char *ip_str;
-  static char *kwlist[] = {"addr", NULL};
-  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s", kwlist, &ip_str)) goto err1;
+  int rcvbuf = 0;
+  static char *kwlist[] = {"addr", "recv_buffer_size", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|i", kwlist, &ip_str, &rcvbuf)) goto err1;
 
   // Create an "instance" of GVSP
   struct gvsp *g;
@@ -756,6 +1684,7 @@ static PyObject * create_socket(PyObject *self, PyObject *args, PyObject *kwargs
   g->sockfd = socket(AF_INET, SOCK_DGRAM, 0);
   if (g->sockfd < 0) goto err2;
   if (setsockopt(g->sockfd, SOL_SOCKET, SO_RCVTIMEO, (const char*)&tv, sizeof tv) < 0) goto err3;
+  if (rcvbuf > 0 && set_recv_buffer_size(g, rcvbuf) < 0) goto err3;
   if (bind(g->sockfd, (struct sockaddr*) &addr_init, sizeof addr_init) < 0) goto err3;
   if (getsockname(g->sockfd, (struct sockaddr*) &addr_fin, &addr_fin_len) < 0) goto err3;
   g->port = ntohs(addr_fin.sin_port);
@@ -795,20 +1724,44 @@ static PyObject * close_socket(PyObject *self, PyObject *args, PyObject *kwargs)
   if (closesocket(g->sockfd) < 0) goto err;
 #endif
   g->sockfd = -1;
+  free_band_filter(g);
   if (g->verbose) printf("GVSP: Socket closed\n");
   free(g);
 
 err: return handle_py_error();
 }
 
+void free_blocks(struct gvsp *g)
+{
+  ulong i;
+  for (i = 0; i < g->block_count; i++)
+  {
+    free(g->blocks[i].frame_buf);
+    free(g->blocks[i].packet_received);
+  }
+  free(g->blocks);
+  g->blocks = NULL;
+  g->block_count = 0;
+  free(g->queue);
+  g->queue = NULL;
+  free(g->batch_meta);
+  g->batch_meta = NULL;
+  if (g->pool != NULL) release_pool(g->pool);
+  g->pool = NULL;
+}
+
 static const char DOC_CREATE_BUFFER[] = "Create buffer to receive frames.\n\n"
 ":param g: GVSP instance\n"
 ":param payload_size: Payload size of one full frame + possible padding\n"
 ":param packet_size: Size of a single packet\n"
+":param lines: Number of frames to output per callback, default 1. With more than 1 line frames are\n"
+"  output as 3D arrays (lines, height, width), the last array may have fewer lines.\n"
+":param blocks: Number of frame buffers, default 8. They hold frames being received, frames missing packets\n"
+"  while the packets are requested again (see set_resend) and frames waiting to be decoded and output.\n"
 ":returns: None\n"
 ":raises ConnectionError: GVSP is receiving frames, buffer must have been created already\n"
 ":raises MemoryError: Failed to allocate memory or buffer is created already\n"
-":raises ValueError: Problem with payload size or packet size\n";
+":raises ValueError: Problem with payload size, packet size, lines or blocks\n";
 static PyObject * create_buffer(PyObject *self, PyObject *args, PyObject *kwargs)
 {
   errno = 0;
@@ -818,44 +1771,77 @@ static PyObject * create_buffer(PyObject *self, PyObject *args, PyObject *kwargs
   ulong payload_size = 0;
   ulong packet_size = 0;
   ulong packet_payload_size = 0;
-  static char *kwlist[] = {"g", "payload_size", "packet_size", NULL};
-  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Okk", kwlist, &g_caps, &payload_size, &packet_size)) goto err1;
+  ulong lines = 1;
+  ulong blocks = 8;
+  ulong i;
+  static char *kwlist[] = {"g", "payload_size", "packet_size", "lines", "blocks", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Okk|kk", kwlist, &g_caps, &payload_size, &packet_size, &lines, &blocks)) goto err1;
   struct gvsp *g = PyCapsule_GetPointer(g_caps, "gvsp");
   if (g == NULL) goto err1;
 
   // Check state of GVSP
   if (is_receiving(g)) goto err1;
   if (has_buffer(g)) goto err1;
-
-  // Create buffer to receive frames
-  g->frame_buf = malloc(payload_size);
-  if (g->frame_buf == NULL)
+  if (lines < 1)
   {
-    PyErr_SetString(PyExc_MemoryError, "Failed to allocate memory for frame buffer");
+    PyErr_SetString(PyExc_ValueError, "Number of lines per callback must be greater than 0");
     goto err1;
   }
-  packet_payload_size = packet_size - GVSP_TOTAL_HEADER_SIZE;
-  if (packet_payload_size <= 0)
+  if (blocks < 1)
+  {
+    PyErr_SetString(PyExc_ValueError, "Number of blocks must be greater than 0");
+    goto err1;
+  }
+  if (packet_size <= GVSP_TOTAL_HEADER_SIZE)
   {
     PyErr_SetString(PyExc_ValueError, "Packet size must be greater than 0 (without headers)");
-    goto err2;
+    goto err1;
   }
+  packet_payload_size = packet_size - GVSP_TOTAL_HEADER_SIZE;
   if (payload_size % packet_payload_size != 0)
   {
     PyErr_SetString(PyExc_ValueError, "Payload size must be multiple of packet size");
+    goto err1;
+  }
+
+  // Create buffers to receive frames
+  g->blocks = calloc(blocks, sizeof (struct block));
+  if (g->blocks == NULL)
+  {
+    PyErr_SetString(PyExc_MemoryError, "Failed to allocate memory for frame buffer");
+    goto err1;
+  }
+  g->block_count = blocks;
+  g->queue = malloc(blocks * sizeof (struct block *));
+  g->batch_meta = malloc(lines * 2 * sizeof (ulonglong));
+  g->pool = create_pool();
+  if (g->queue == NULL || g->batch_meta == NULL || g->pool == NULL)
+  {
+    PyErr_SetString(PyExc_MemoryError, "Failed to allocate memory for frame buffer");
     goto err2;
   }
   g->payload_size = payload_size;
   g->packet_size = packet_payload_size;
   g->packet_count = payload_size / g->packet_size;
+  for (i = 0; i < blocks; i++)
+  {
+    g->blocks[i].frame_buf = malloc(payload_size);
+    g->blocks[i].packet_received = malloc(g->packet_count);
+    if (g->blocks[i].frame_buf == NULL || g->blocks[i].packet_received == NULL)
+    {
+      PyErr_SetString(PyExc_MemoryError, "Failed to allocate memory for frame buffer");
+      goto err2;
+    }
+  }
+  g->batch_lines = lines;
 
   if (g->verbose)
   {
     printf("GVSP: Packet size: %ld, packet count: %ld\n", g->packet_size, g->packet_count);
-    printf("GVSP: Frame buffer created, %ld bytes\n", payload_size);
+    printf("GVSP: Frame buffer created, %ld blocks of %ld bytes, %ld lines per callback\n", blocks, payload_size, lines);
   }
   return PyLong_FromLong(0);
-err2: free(g->frame_buf);
+err2: free_blocks(g);
 err1: return handle_py_error();
 }
 
@@ -880,8 +1866,11 @@ static PyObject * free_buffer(PyObject *self, PyObject *args, PyObject *kwargs)
   g->payload_size = 0;
   g->packet_size = 0;
   g->packet_count = 0;
-  free(g->frame_buf);
-  g->frame_buf = NULL;
+  if (g->batch_buf != NULL) pool_put(g->batch_buf);
+  g->batch_buf = NULL;
+  free_blocks(g);
+  g->batch_count = 0;
+  g->batch_lines = 1;
 
   if (g->verbose) printf("GVSP: Frame buffer freed\n");
 err: return handle_py_error();
@@ -914,13 +1903,25 @@ static PyObject * start_receive(PyObject *self, PyObject *args, PyObject *kwargs
   if (open_connection(g, ip_str) < 0) goto err;
 
   // Start listening for incoming packets
+  for (ulong i = 0; i < g->block_count; i++)
+  {
+    g->blocks[i].state = BLOCK_FREE;
+  }
+  g->next_seq = 0;
+  g->output_seq = 0;
+  g->queue_start = 0;
+  g->queue_len = 0;
+  g->deliver_en = true;
+  g->deliver_error = false;
+  memset(&g->stats, 0, sizeof g->stats);
   g->recv_en = true;
   init_receive(g);
 
 err: return handle_py_error();
 }
 
-static const char DOC_STOP_RECEIVE[] = "Stop listening packets.\n\n"
+static const char DOC_STOP_RECEIVE[] = "Stop listening packets. Lines waiting in a partial batch are output before returning,\n"
+"frames still missing packets are dropped.\n\n"
 ":param g: GVSP instance\n"
 ":returns: None\n"
 ":raises ConnectionError: Already stopped receiving frames\n";
@@ -945,15 +1946,43 @@ static PyObject * stop_receive(PyObject *self, PyObject *args, PyObject *kwargs)
   WaitForSingleObject(g->recv_thread, INFINITE);
 #endif
   PyEval_RestoreThread(tstate);
+
+  // Give up on incomplete frames and let the delivery thread output the rest
+  lock_mutex(&g->frame_lock);
+  for (ulong i = 0; i < g->block_count; i++)
+  {
+    if (g->blocks[i].state == BLOCK_RECEIVING) drop_block(g, &g->blocks[i]);
+  }
+  output_blocks(g);
+  g->deliver_en = false;
+  signal_cond(&g->deliver_cond);
+  unlock_mutex(&g->frame_lock);
+  tstate = PyEval_SaveThread();
+#if defined IS_UNIX
+  pthread_join(g->deliver_thread, NULL);
+#elif defined IS_WIN32
+  WaitForSingleObject(g->deliver_thread, INFINITE);
+#endif
+  PyEval_RestoreThread(tstate);
   // Only single thread should be running now
 
+  if (g->deliver_error)
+  {
+    PyErr_SetString(PyExc_MemoryError, errmsg);
+    goto err;
+  }
+
   if (g->verbose) printf("GVSP: Stopped listening incoming packets\n");
 err: return handle_py_error();
 }
 
 static const char DOC_FRAME_CB[] = "Set a callback function to get frames.\n\n"
 ":param g: GVSP instance\n"
-":param callback: Function to call when a frame is received or None\n"
+":param callback: Function to call when a frame is received or None. It is called with the frame (or\n"
+"  a batch of frames, see create_buffer) and bit depth of the pixels.\n"
+":param metadata: Pass metadata of the frames to the callback as a third argument, default False. It is\n"
+"  a numpy.ndarray of uint64 with block ID and camera timestamp of each frame, shape (2,) for a single\n"
+"  frame and (lines, 2) for a batch of frames.\n"
 ":returns: None\n"
 ":raises TypeError: Callback is not a function or None\n";
 static PyObject * set_frame_cb(PyObject *self, PyObject *args, PyObject *kwargs)
@@ -963,8 +1992,9 @@ static PyObject * set_frame_cb(PyObject *self, PyObject *args, PyObject *kwargs)
   // Parse arguments
   PyObject *g_caps;
   PyObject *cb;
-  static char *kwlist[] = {"g", "callback", NULL};
-  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO", kwlist, &g_caps, &cb)) goto err;
+  int metadata = 0;
+  static char *kwlist[] = {"g", "callback", "metadata", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|p", kwlist, &g_caps, &cb, &metadata)) goto err;
   struct gvsp *g = PyCapsule_GetPointer(g_caps, "gvsp");
   if (g == NULL) goto err;
   if (!PyCallable_Check(cb) && cb != NULL) {
@@ -977,12 +2007,165 @@ static PyObject * set_frame_cb(PyObject *self, PyObject *args, PyObject *kwargs)
   lock_mutex(&g->frame_lock);
   Py_XDECREF(g->frame_cb);
   g->frame_cb = cb;
+  g->frame_cb_meta = metadata;
   unlock_mutex(&g->frame_lock);
 
   if (g->verbose) printf("GVSP: Frame callback function set\n");
 err: return handle_py_error();
 }
 
+static const char DOC_SET_RESEND[] = "Set requesting of dropped packets again on or off.\n\n"
+":param g: GVSP instance\n"
+":param sockfd: File descriptor of the GVCP control socket (connected to the camera) or -1 to set off\n"
+":param window: Time to wait for the missing packets of a frame before dropping it in seconds, default 0.05\n"
+":returns: None\n"
+":raises ValueError: Window is negative\n";
+static PyObject * set_resend(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+  errno = 0;
+
+  // Parse arguments
+  PyObject *g_caps;
+  long long sockfd;
+  double window = 0.05;
+  static char *kwlist[] = {"g", "sockfd", "window", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OL|d", kwlist, &g_caps, &sockfd, &window)) goto err;
+  struct gvsp *g = PyCapsule_GetPointer(g_caps, "gvsp");
+  if (g == NULL) goto err;
+  if (window < 0)
+  {
+    PyErr_SetString(PyExc_ValueError, "Resend window must not be negative");
+    goto err;
+  }
+
+  // Set socket for packet resend requests
+  lock_mutex(&g->frame_lock);
+  g->resend_sockfd = sockfd < 0 ? -1 : (soc_t)sockfd;
+  g->resend_window = (ulong)(window * 1000);
+  unlock_mutex(&g->frame_lock);
+
+  if (g->verbose) printf("GVSP: Packet resend %s\n", sockfd < 0 ? "off" : "on");
+err: return handle_py_error();
+}
+
+static const char DOC_SET_BAND_FILTER[] = "Output only selected spectral bands (rows) of frames.\n\n"
+":param g: GVSP instance\n"
+":param bands: Sequence of band indices to output or None for all bands, default None\n"
+":param binning: Number of adjacent bands (after selection) to average into one, default 1. Remaining\n"
+"  bands that do not fill a whole bin are left out.\n"
+":returns: None\n"
+":raises ConnectionError: GVSP is receiving frames\n"
+":raises MemoryError: Failed to allocate memory\n"
+":raises TypeError: Bands is not a sequence of integers\n"
+":raises ValueError: Problem with bands or binning\n";
+static PyObject * set_band_filter(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+  errno = 0;
+
+  // Parse arguments
+  PyObject *g_caps;
+  PyObject *bands_py = Py_None;
+  PyObject *seq_py = NULL;
+  ulong binning = 1;
+  ulong count = 0;
+  ulong *bands = NULL;
+  ulong band_max = 0;
+  ulong i;
+  static char *kwlist[] = {"g", "bands", "binning", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|Ok", kwlist, &g_caps, &bands_py, &binning)) goto err;
+  struct gvsp *g = PyCapsule_GetPointer(g_caps, "gvsp");
+  if (g == NULL) goto err;
+
+  // Check state of GVSP
+  if (is_receiving(g)) goto err;
+  if (binning < 1)
+  {
+    PyErr_SetString(PyExc_ValueError, "Binning must be greater than 0");
+    goto err;
+  }
+
+  // Copy band indices
+  if (bands_py != Py_None)
+  {
+    seq_py = PySequence_Fast(bands_py, "Bands must be a sequence of integers");
+    if (seq_py == NULL) goto err;
+    count = PySequence_Fast_GET_SIZE(seq_py);
+    if (count < binning)
+    {
+      PyErr_SetString(PyExc_ValueError, "Number of bands must be at least the binning factor");
+      goto err;
+    }
+    bands = malloc(count * sizeof (ulong));
+    if (bands == NULL)
+    {
+      PyErr_SetString(PyExc_MemoryError, "Failed to allocate memory for band filter");
+      goto err;
+    }
+    for (i = 0; i < count; i++)
+    {
+      long band = PyLong_AsLong(PySequence_Fast_GET_ITEM(seq_py, i));
+      if (band == -1 && PyErr_Occurred()) goto err;
+      if (band < 0)
+      {
+        PyErr_SetString(PyExc_ValueError, "Band index must not be negative");
+        goto err;
+      }
+      bands[i] = band;
+      if (bands[i] > band_max) band_max = bands[i];
+    }
+  }
+
+  // Set band filter
+  free_band_filter(g);
+  g->bands = bands;
+  g->band_count = count;
+  g->band_max = band_max;
+  g->band_binning = binning;
+  bands = NULL;
+
+  if (g->verbose) printf("GVSP: Band filter set, %ld bands, binning %ld\n", count, binning);
+err:
+  free(bands);
+  Py_XDECREF(seq_py);
+  return handle_py_error();
+}
+
+static const char DOC_GET_STATS[] = "Get statistics of the stream since receiving was started.\n\n"
+":param g: GVSP instance\n"
+":returns: Dictionary of packets_received, bytes_received, packets_dropped (missing packets of discarded\n"
+"  frames), packets_resent, resend_requests, frames_completed, frames_discarded, frame_interval (mean time\n"
+"  between completed frames), frame_jitter (standard deviation of the interval), callbacks, callback_time\n"
+"  (mean) and callback_time_max. Times are in seconds.\n";
+static PyObject * get_stats(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+  errno = 0;
+
+  // Parse arguments
+  struct gvsp *g = get_gvsp(args, kwargs);
+  if (g == NULL) goto err;
+
+  // Copy statistics, so that the lock is held only briefly
+  struct stats stats;
+  lock_mutex(&g->frame_lock);
+  stats = g->stats;
+  unlock_mutex(&g->frame_lock);
+
+  return Py_BuildValue("{sKsKsKsKsKsKsKsdsdsKsdsd}",
+    "packets_received", stats.packets_received,
+    "bytes_received", stats.bytes_received,
+    "packets_dropped", stats.packets_dropped,
+    "packets_resent", stats.packets_resent,
+    "resend_requests", stats.resend_requests,
+    "frames_completed", stats.frames_completed,
+    "frames_discarded", stats.frames_discarded,
+    "frame_interval", stats.interval_mean / 1e6,
+    "frame_jitter", stats.intervals > 1 ? sqrt(stats.interval_m2 / (stats.intervals - 1)) / 1e6 : 0.0,
+    "callbacks", stats.callbacks,
+    "callback_time", stats.callbacks > 0 ? stats.callback_time / stats.callbacks / 1e6 : 0.0,
+    "callback_time_max", stats.callback_time_max / 1e6);
+err: return handle_py_error();
+}
+
 static const char DOC_SET_VERBOSE[] = "Set verbose messages on or off.\n\n"
 ":param g: GVSP instance\n"
 ":param verbose: True to set verbose mode on, False to set it off\n"
@@ -1035,6 +2218,9 @@ static PyMethodDef gvspmethods[] = {
   { "start_receive", (PyCFunction)start_receive, METH_VARARGS | METH_KEYWORDS, DOC_START_RECEIVE },
   { "stop_receive", (PyCFunction)stop_receive, METH_VARARGS | METH_KEYWORDS, DOC_STOP_RECEIVE },
   { "set_frame_cb", (PyCFunction)set_frame_cb, METH_VARARGS | METH_KEYWORDS, DOC_FRAME_CB },
+  { "set_resend", (PyCFunction)set_resend, METH_VARARGS | METH_KEYWORDS, DOC_SET_RESEND },
+  { "set_band_filter", (PyCFunction)set_band_filter, METH_VARARGS | METH_KEYWORDS, DOC_SET_BAND_FILTER },
+  { "get_stats", (PyCFunction)get_stats, METH_VARARGS | METH_KEYWORDS, DOC_GET_STATS },
   { "set_verbose", (PyCFunction)set_verbose, METH_VARARGS | METH_KEYWORDS, DOC_SET_VERBOSE },
   { "set_warnings", (PyCFunction)set_warnings, METH_VARARGS | METH_KEYWORDS, DOC_SET_WARNINGS },
   { NULL, NULL, 0, NULL }
@@ -0,0 +1,167 @@
+import socket
+import threading
+from collections import deque
+from typing import Callable, Union
+
+from ...spectralcam.utils import *
+from ...spectralcam.exceptions import *
+from .gvcp import *
+
+class GVCPMessageChannel:
+  """
+  Receive events from the camera through GigE Vision message channel. The camera sends EVENT and
+  EVENTDATA commands to the host, they are acknowledged and passed to callbacks in a thread of this
+  class. Callbacks are called with a GVCPEvent and must not block for long, the camera waits for the
+  acknowledgement of the next event meanwhile.
+
+  Usage example:
+    channel = GVCPMessageChannel(gvcp)
+    channel.add_callback(EVENT_END_OF_TRANSFER, lambda event: print(event.block_id))
+    channel.open(host_address)
+    ...
+    channel.close()
+  """
+
+  def __init__(self, gvcp: GVCP) -> None:
+    self._gvcp = gvcp
+    self._soc = None
+    self._port = 0
+    self._thread = None
+    self._stop = threading.Event()
+    self._callbacks: dict[Union[int, None], list[Callable[[GVCPEvent], None]]] = {}
+    self._callback_lock = threading.Lock()
+    self._recent_ids = deque(maxlen=16) # Request IDs of resent commands are the same
+    self.events_received = 0
+    self.duplicates = 0
+    self.verbose = False
+
+  @property
+  def is_open(self) -> bool:
+    """Message channel is open."""
+    return self._soc != None
+
+  @property
+  def port(self) -> int:
+    """UDP port events are received from."""
+    return self._port
+
+  def open(self, host_addr: str, timeout: float = 0.2, retries: int = 3) -> None:
+    """
+    Open message channel and start receiving events.
+
+    :param host_addr: IP address of the host interface the camera is connected to
+    :param timeout: Time the camera waits for an acknowledgement before sending the event again (in seconds)
+    :param retries: Number of times the camera sends an event again
+    :returns: None
+    :raises NotConnectedError: Control channel is not connected
+    :raises NotImplementedError: Camera has no message channel
+    :raises IsConnectedError: Message channel is already open
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if not self._gvcp.connected:
+      raise NotConnectedError("GVCP ERROR: Not connected, call gvcp.connect() first")
+    if self.is_open:
+      raise IsConnectedError("GVCP ERROR: Message channel is already open")
+    if self._gvcp.readreg(REG_NUM_MESSAGE_CHANNELS, int) == 0:
+      raise NotImplementedError("GVCP ERROR: Device does not have a message channel")
+
+    self._soc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self._soc.bind((host_addr, 0))
+    self._soc.settimeout(0.1)
+    self._port = self._soc.getsockname()[1]
+    self._recent_ids.clear()
+    try:
+      self._gvcp.writereg(REG_MCTT, round(timeout * 1000))
+      self._gvcp.writereg(REG_MCRC, retries)
+      self._gvcp.writereg(REG_MCDA, ip_to_uint32(host_addr))
+      self._gvcp.writereg(REG_MCP, self._port)
+    except:
+      self._soc.close()
+      self._soc = None
+      raise
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._receive_loop)
+    self._thread.start()
+    if self.verbose:
+      print(f"GVCP: Message channel open, port: {self._port}")
+
+  def close(self) -> None:
+    """
+    Stop the camera sending events and close message channel.
+
+    :returns: None
+    :raises NotConnectedError: Message channel is already closed
+    :raises AckError: Problem with an acknowledgement from the camera
+    :raises socket.timeout: Camera didn't send an acknowledgement in time
+    """
+    if not self.is_open:
+      raise NotConnectedError("GVCP ERROR: Message channel is not open")
+    try:
+      if self._gvcp.connected:
+        self._gvcp.writereg(REG_MCP, 0)
+    finally:
+      self._stop.set()
+      self._thread.join()
+      self._soc.close()
+      self._soc = None
+      self._port = 0
+    if self.verbose:
+      print("GVCP: Message channel closed")
+
+  def add_callback(self, event_id: Union[int, None], callback: Callable[[GVCPEvent], None]) -> None:
+    """
+    Call a function when an event is received.
+
+    :param event_id: Event identifier (EVENT_* constant or device specific ID) or None for all events
+    :param callback: Function that takes GVCPEvent as a parameter
+    :returns: None
+    """
+    with self._callback_lock:
+      self._callbacks.setdefault(event_id, []).append(callback)
+
+  def remove_callback(self, event_id: Union[int, None], callback: Callable[[GVCPEvent], None]) -> None:
+    """
+    Remove a function added with add_callback.
+
+    :param event_id: Event identifier given to add_callback
+    :param callback: Function given to add_callback
+    :returns: None
+    :raises ValueError: Callback was not added
+    """
+    with self._callback_lock:
+      self._callbacks.get(event_id, []).remove(callback)
+
+  def _receive_loop(self) -> None:
+    while not self._stop.is_set():
+      try:
+        data, addr = self._soc.recvfrom(ETH_MAX_MTU)
+        message = GVCPEventCmd(data)
+      except socket.timeout:
+        continue
+      except (AckError, OSError) as error:
+        if self.verbose:
+          print(f"GVCP: Invalid message channel packet: {error}")
+        continue
+
+      # Acknowledge first so the camera does not resend while callbacks run
+      if message.ack_required:
+        self._soc.sendto(message.ack_data, addr)
+      if message.req_id in self._recent_ids:
+        self.duplicates += 1
+        continue
+      self._recent_ids.append(message.req_id)
+      if self.verbose:
+        print(message)
+      for event in message.events:
+        self.events_received += 1
+        self._dispatch(event)
+
+  def _dispatch(self, event: GVCPEvent) -> None:
+    with self._callback_lock:
+      callbacks = self._callbacks.get(event.event_id, []) + self._callbacks.get(None, [])
+    for callback in callbacks:
+      try:
+        callback(event)
+      except Exception as error:
+        print(f"GVCP ERROR: Event callback failed: {error}")
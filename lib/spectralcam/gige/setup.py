@@ -1,3 +1,4 @@
+import sys
 from setuptools import setup, Extension
 # For this to work, you might need to remove noexec option from /tmp on linux systems
 import numpy
@@ -9,7 +10,8 @@ setup(
     Extension(
       "gvsp",
       sources = ["./gvsp.c"],
-      include_dirs = [numpy.get_include()]
+      include_dirs = [numpy.get_include()],
+      libraries = [] if sys.platform == "win32" else ["m"]
     )
   ]
 )
@@ -1,7 +1,7 @@
 import time
 from threading import Thread, Event, Lock
 from collections import deque
-from typing import Union
+from typing import Callable, Union
 
 import numpy as np
 from vispy import gloo, app
@@ -13,16 +13,19 @@ from vispy.util.transforms import ortho
 class PreviewWindow(app.Canvas):
   """Actual preview window class. Creates a vispy canvas on a window to display frames from a camera."""
 
-  def __init__(self, width: int, height: int, title: str, display_rate: float = 30.0):
+  def __init__(self, width: int, height: int, title: str, display_rate: float = 30.0,
+               row_source: Callable[[int], Union[np.ndarray, None]] = None):
     super().__init__(title=title, size=(width, height), autoswap=True, vsync=True, keys='interactive')
 
     self._background_color = "gray"
     self._width, self._height = width, height
-    self._row = self._height - 1
+    self._head = self._height # Texture row of the newest line, the texture is a ring buffer
+    self._full = False
     self._is_dragging = False
     self._origin = [0, 0]
     self._display_rate = display_rate
-    self._timer = app.Timer(1. / self._display_rate, connect=self.update, start=True)
+    self._row_source = row_source # Called on every display tick for rows received meanwhile
+    self._next_tick = 0. # Display ticks are driven by PreviewFactory
 
     self._buffers = []
 
@@ -43,12 +46,14 @@ class PreviewWindow(app.Canvas):
       }
     """
 
+    # Rows are written to the texture as a ring buffer, u_offset moves the newest row to the top
     fragment_shader = """
       varying vec2 v_texcoord;
       uniform sampler2D texture;
+      uniform float u_offset;
       void main()
       {
-        gl_FragColor = texture2D(texture, v_texcoord);
+        gl_FragColor = texture2D(texture, vec2(v_texcoord.x, fract(v_texcoord.y + u_offset)));
       }
     """
 
@@ -67,14 +72,15 @@ class PreviewWindow(app.Canvas):
       [[0., 1.], [1., 1.], [0., 0.], [1., 0.]]
     )
 
-    self._texture = np.zeros(
-      (self._height, self._width, 3),
-      dtype="uint8"
+    self._texture = gloo.Texture2D(
+      np.zeros((self._height, self._width, 3), dtype="uint8"),
+      interpolation="nearest"
     )
 
     self._program['u_model'] = np.eye(4, dtype=np.float32)
     self._program['u_view'] = np.eye(4, dtype=np.float32)
     self._program['texture'] = self._texture
+    self._program['u_offset'] = 0.
 
     self._coordinate = [0, 0]
 
@@ -87,8 +93,7 @@ class PreviewWindow(app.Canvas):
   @display_rate.setter
   def display_rate(self, value):
     self._display_rate = value
-    self._timer.stop()
-    self._timer.start(interval=1./self._display_rate)
+    self._next_tick = 0.
 
   def set_size(self, width: int, height: int) -> None:
     updated = False
@@ -106,25 +111,51 @@ class PreviewWindow(app.Canvas):
         _buffer.queue()
     self._buffers.clear()
 
+  def _on_tick(self) -> None:
+    # Draw only when there are new rows, moving and zooming the view request drawing themselves
+    if self._row_source != None:
+      rows = self._row_source(self._height)
+      if rows is not None:
+        self.push_rows(rows)
+        self.update()
+
   def on_draw(self, event):
     gloo.clear(color=self._background_color)
     self._program.draw('triangle_strip')
 
   def push_row(self, row: np.ndarray) -> None:
     """Add new row to the preview window."""
-    if len(row) != self._width:
-      multiplier = self._width / len(row)
+    self.push_rows(row[np.newaxis])
+
+  def push_rows(self, rows: np.ndarray) -> None:
+    """
+    Add new rows to the preview window, oldest row first. Only the new rows are uploaded to the
+    texture, so the cost does not depend on the window height.
+    """
+    if rows.shape[1] != self._width:
+      multiplier = self._width / rows.shape[1]
       if multiplier.is_integer():
-        row = np.repeat(row, multiplier, 0)
+        rows = np.repeat(rows, multiplier, 1)
       else:
         raise ValueError("Preview row length is invalid")
-    if self._row >= 0:
-      self._texture[self._row] = row
-      self._row -= 1
+    rows = np.ascontiguousarray(rows[::-1][:self._height], dtype=np.uint8) # Newest first
+
+    # Until the texture is full rows fill it from the bottom up, after that the newest row is on top
+    head = self._head - len(rows)
+    if head >= 0:
+      self._texture.set_data(rows, offset=(head, 0))
     else:
-      self._texture = np.roll(self._texture, 1, 0)
-      self._texture[0] = row
-    self._program['texture'] = self._texture
+      wrapped = -head # Rows that go to the end of the texture
+      self._texture.set_data(rows[:wrapped], offset=(self._height - wrapped, 0))
+      if wrapped < len(rows):
+        self._texture.set_data(rows[wrapped:], offset=(0, 0))
+      head += self._height
+      self._full = True
+    self._head = head
+    if head == 0:
+      self._full = True
+    if self._full:
+      self._program['u_offset'] = head / self._height
 
   def apply_magnification(self):
     canvas_w, canvas_h = self.physical_size
@@ -148,6 +179,7 @@ class PreviewWindow(app.Canvas):
     )
 
     self._program.bind(gloo.VertexBuffer(self._vertices))
+    self.update()
 
   def on_mouse_wheel(self, event):
     self._translate += event.delta[1]
@@ -186,37 +218,44 @@ PREVIEW_SHOW = 3
 PREVIEW_HIDE = 4
 
 class Preview():
-  """Class to control the preview window."""
+  """
+  Class to control the preview window. Rows are queued and the window takes them in its own thread
+  on every display tick, so pushing rows never waits for drawing. If the window falls behind, the
+  oldest rows are dropped.
+  """
 
-  def __init__(self, params: tuple[int, int, str], event: Event, lock: Lock) -> None:
+  def __init__(self, params: tuple[int, int, str], notify: Callable[["Preview"], None]) -> None:
     self._params = params
     self._cmds = deque()
-    self._event = event
-    self._lock = lock
+    self._notify = notify # Wakes up the preview thread to run the commands
     self._preview: Union[None, PreviewWindow] = None
+    self._rows = deque() # Blocks of (rows, shift, band-major), oldest first
+    self._rows_lock = Lock() # Held only to add or take blocks, never while drawing
+    self._queued_rows = 0 # Rows in self._rows, at most the window height (and the newest block)
+    self._max_rows = max(params[1], 1)
+    self._next_push = 0.
+    self.max_line_rate: Union[float, None] = None
+    """Lines per second passed on to the window at most, None passes all lines."""
+    self._lines_shown = 0
+    self._lines_skipped = 0 # Dropped by the producer (max_line_rate, full queue)
+    self._lines_overflow = 0 # Dropped by the window (more rows than fit the window)
     self._cmds.appendleft(PREVIEW_CREATE)
-    self._event.set()
+    self._notify(self)
 
   def close(self) -> None:
     """Close the window permanently. All resources reserved by the window instance will be freed."""
-    self._lock.acquire()
     self._cmds.appendleft(PREVIEW_DESTROY)
-    self._event.set()
-    self._lock.release()
+    self._notify(self)
 
   def show(self) -> None:
     """Make the window visible on screen."""
-    self._lock.acquire()
     self._cmds.appendleft(PREVIEW_SHOW)
-    self._event.set()
-    self._lock.release()
+    self._notify(self)
 
   def hide(self) -> None:
     """Hide the window from screen."""
-    self._lock.acquire()
     self._cmds.appendleft(PREVIEW_HIDE)
-    self._event.set()
-    self._lock.release()
+    self._notify(self)
 
   def getcmd(self) -> Union[None, int]:
     if len(self._cmds) > 0:
@@ -228,13 +267,83 @@ class Preview():
     """Returns true when the window is visible on the screen."""
     return self._preview != None and self._preview.native.isVisible()
 
-  def push_row(self, row: np.ndarray) -> None:
+  def push_row(self, row: np.ndarray) -> bool:
     """
     Add new row of pixels to the preview.
     
     :param row: Row of pixels to add
+    :returns: False if the row was dropped because of max_line_rate
+    """
+    return self.push_rows(row[np.newaxis])
+
+  def push_rows(self, rows: np.ndarray) -> bool:
+    """
+    Add a block of new rows of pixels to the preview.
+
+    :param rows: Rows of pixels to add (rows, width, RGB), oldest row first
+    :returns: False if the rows were dropped because of max_line_rate
+    """
+    return self._queue(rows, 0, False)
+
+  def push_bands(self, frames: np.ndarray, shift: int = 0) -> bool:
+    """
+    Add a block of frames to the preview. Only a view or a copy of the 3 preview bands is needed,
+    conversion to RGB rows is done later in the preview thread.
+
+    :param frames: Red, green and blue bands of frames (frames, 3, width), oldest frame first
+    :param shift: Number of bits values are shifted right to get 8 bit colors
+    :returns: False if the frames were dropped because of max_line_rate
     """
-    self._preview.push_row(row)
+    return self._queue(frames, shift, True)
+
+  @property
+  def stats(self) -> dict:
+    """Number of lines shown and dropped by the preview."""
+    return {"lines_shown": self._lines_shown, "lines_dropped": self._lines_skipped + self._lines_overflow}
+
+  def _queue(self, rows: np.ndarray, shift: int, bands: bool) -> bool:
+    # Called by the producer, the lock is only held by the window to take the queued blocks
+    if self.max_line_rate != None:
+      now = time.perf_counter()
+      if now < self._next_push:
+        self._lines_skipped += len(rows)
+        return False
+      self._next_push = now + len(rows) / self.max_line_rate
+    with self._rows_lock:
+      self._rows.append((rows, shift, bands))
+      self._queued_rows += len(rows)
+      # Oldest blocks are dropped while more rows are queued than fit the window
+      while self._queued_rows > self._max_rows and len(self._rows) > 1:
+        dropped = len(self._rows.popleft()[0])
+        self._queued_rows -= dropped
+        self._lines_skipped += dropped
+    return True
+
+  def _take_rows(self, max_rows: int) -> Union[np.ndarray, None]:
+    # Called by the window, returns RGB rows received since the last call, at most the newest
+    # blocks that fill the window
+    with self._rows_lock:
+      blocks = list(self._rows)
+      self._rows.clear()
+      self._queued_rows = 0
+    if len(blocks) == 0:
+      return None
+    start, count = len(blocks), 0
+    while start > 0 and count < max_rows:
+      start -= 1
+      count += len(blocks[start][0])
+    for rows, _, _ in blocks[:start]:
+      self._lines_overflow += len(rows)
+    result = []
+    for rows, shift, bands in blocks[start:]:
+      if bands:
+        rows = rows.swapaxes(1, 2)
+      if shift > 0:
+        rows = rows >> shift
+      result.append(rows)
+    result = [rows for rows in result if rows.shape[1:] == result[-1].shape[1:]] # Width may change
+    self._lines_shown += sum(len(rows) for rows in result)
+    return np.concatenate(result) if len(result) > 1 else result[0]
 
 class PreviewFactory():
   """
@@ -242,51 +351,71 @@ class PreviewFactory():
   during a program lifecycle.
 
   QT does not support multiple threads very well, or like, at all...
+
+  The thread sleeps until a command (create, show, hide, close) arrives or the next frame of a
+  visible window is due. On every frame queued rows are drawn and window events are processed.
   """
   def __init__(self) -> None:
-    self._instances: list[Preview] = []
+    self._instances: list[Preview] = [] # Used only by the preview thread
+    self._pending: deque[Preview] = deque() # Instances with new commands
     self._event = Event()
-    self._lock = Lock()
     self._quit = False
     self._thread = Thread(target=self._loop)
     self._thread.start()
 
+  def _notify(self, instance: Preview) -> None:
+    self._pending.append(instance)
+    self._event.set()
+
   def _loop(self):
     while True:
-      visible_count = 0
+      self._event.clear()
       if self._quit:
         for instance in self._instances:
           instance._preview.native.destroy()
           instance._preview.app.process_events()
         break
-      self._lock.acquire()
-      for instance in self._instances:
-        if self._event.is_set():
-          while True:
-            cmd = instance.getcmd()
-            if cmd == None:
-              break
-            elif cmd == PREVIEW_CREATE and instance._preview == None:
-              width, height, title = instance._params
-              instance._preview = PreviewWindow(width, height, title)
-            elif cmd == PREVIEW_DESTROY and instance._preview != None:
-              instance._preview.native.destroy()
-              self._instances.remove(instance)
-            elif cmd == PREVIEW_SHOW and instance._preview != None:
-              instance._preview.native.show()
-            elif cmd == PREVIEW_HIDE and instance._preview != None:
-              instance._preview.native.hide()
-            else:
-              print("WARNING: Cannot complete the command, a preview window is probably not created.")
-        if instance._preview != None and instance._preview.native.isVisible():
-          instance._preview.app.process_events()
-          visible_count += 1
-      self._event.clear()
-      self._lock.release()
-      if visible_count == 0:
-        self._event.wait()
-      else:
-        time.sleep(0.05)
+      self._run_commands()
+
+      windows = [instance._preview for instance in self._instances if instance.is_visible()]
+      if len(windows) == 0:
+        self._event.wait() # Nothing to draw, sleep until a command
+        continue
+      now = time.perf_counter()
+      for window in windows:
+        if now >= window._next_tick:
+          window._on_tick()
+          window._next_tick += 1. / window.display_rate
+          if window._next_tick < now:
+            window._next_tick = now + 1. / window.display_rate # Fell behind, skip missed frames
+      windows[0].app.process_events() # Draws and handles input of all windows
+      next_tick = min(window._next_tick for window in windows)
+      self._event.wait(max(next_tick - time.perf_counter(), 0.))
+
+  def _run_commands(self) -> None:
+    while True:
+      try:
+        instance = self._pending.popleft()
+      except IndexError:
+        break
+      while True:
+        cmd = instance.getcmd()
+        if cmd == None:
+          break
+        elif cmd == PREVIEW_CREATE and instance._preview == None:
+          width, height, title = instance._params
+          instance._preview = PreviewWindow(width, height, title, row_source=instance._take_rows)
+          self._instances.append(instance)
+        elif cmd == PREVIEW_DESTROY and instance._preview != None:
+          instance._preview.native.destroy()
+          if instance in self._instances:
+            self._instances.remove(instance)
+        elif cmd == PREVIEW_SHOW and instance._preview != None:
+          instance._preview.native.show()
+        elif cmd == PREVIEW_HIDE and instance._preview != None:
+          instance._preview.native.hide()
+        else:
+          print("WARNING: Cannot complete the command, a preview window is probably not created.")
 
   def create(self, width: int = 640, height: int = 480, title: str = "Preview") -> Preview:
     """
@@ -299,15 +428,13 @@ class PreviewFactory():
     :returns: Instance of preview class
     """
     params = (width, height, title)
-    instance = Preview(params, self._event, self._lock)
-    self._instances.append(instance)
-    return instance
+    return Preview(params, self._notify)
 
   def join(self):
     """
     Close all window instances and shut down the thread. Call this only when you want to close the
     whole python program.
     """
-    self._event.set()
     self._quit = True
+    self._event.set()
     self._thread.join()
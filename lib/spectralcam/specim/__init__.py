@@ -1,2 +1,4 @@
 from .fxbase import FXBase
 from .fx10 import FX10
+from .recorder import FrameRecorder, MemoryRecorder, DiskRecorder
+from .emulator import FX10Emulator
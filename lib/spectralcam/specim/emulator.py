@@ -0,0 +1,759 @@
+"""
+  Software emulator of a Specim FX10e camera. It answers GVCP commands
+  (discovery, register and memory access, packet resend) on a UDP port and
+  streams synthetic frames over GVSP, so the whole acquisition path can be
+  exercised and benchmarked without a camera:
+
+    emulator = FX10Emulator(loss=0.001)
+    emulator.start()
+    fx10 = FX10(emulator.device_info(), emulator.port)
+    fx10.set_defaults()
+    fx10.init_preview()
+    fx10.open_stream()
+    fx10.start_acquire(True)
+    ...
+    data = fx10.stop_acquire()
+    fx10.close()
+    emulator.stop()
+
+  The device description file contains the features FXBase and
+  FX10.set_defaults use.
+
+  Acquisition start and end are sent as events through the message channel
+  (EVENT_ACQUISITION_START/END). Other events can be sent with send_event.
+
+  Broadcast discovery (GCSystem.discover) only finds the emulator when it runs
+  on another host, because the host side binds the GVCP port on every
+  interface itself.
+"""
+import io
+import random
+import socket
+import struct
+import threading
+import time
+import zipfile
+from collections import deque
+from typing import Union
+
+import numpy as np
+
+from ...spectralcam.utils import *
+from ...spectralcam.gige.gvcp import *
+from ...spectralcam.gentl.gentl import GCDeviceInfo
+
+# Device specific registers, temperature registers must match the addresses used in FXBase
+REG_TEMPERATURE_PROC = 0x00300040
+REG_TEMPERATURE_PROC_LIMIT = 0x00300044
+REG_TEMPERATURE_FPGA = 0x00300050
+REG_TEMPERATURE_FPGA_LIMIT = 0x00300054
+REG_TEMPERATURE_UPDATE = 0x00300068
+REG_TRIGGER_INTERLEAVE = 0x00300100
+REG_ABER_CORRECTION = 0x00300104
+REG_TRIGGER_MODE = 0x00300108
+REG_EXPOSURE_MODE = 0x0030010C
+REG_EN_FRAME_RATE = 0x00300110
+REG_EXPOSURE_TIME = 0x00300114
+REG_FRAME_RATE = 0x00300118
+REG_ACQUISITION_MODE = 0x0030011C
+REG_ACQUISITION_START = 0x00300120
+REG_ACQUISITION_STOP = 0x00300124
+REG_SHUTTER_FWD = 0x00300130
+REG_SHUTTER_REV = 0x00300134
+REG_WIDTH = 0x00300200
+REG_HEIGHT = 0x00300204
+REG_BINNING_HORIZONTAL = 0x00300208
+REG_BINNING_VERTICAL = 0x0030020C
+REG_PIXEL_FORMAT = 0x00300210
+REG_PAYLOAD_SIZE = 0x00300214
+
+# Bootstrap registers (see GigE Vision specification)
+REG_VERSION = 0x0000
+REG_DEVICE_MODE = 0x0004
+REG_MAC_HIGH = 0x0008
+REG_MAC_LOW = 0x000C
+REG_CURRENT_IP = 0x0024
+REG_CURRENT_SUBNET = 0x0034
+REG_CURRENT_GATEWAY = 0x0044
+REG_MANUFACTURER_NAME = 0x0048
+REG_MODEL_NAME = 0x0068
+REG_DEVICE_VERSION = 0x0088
+REG_MANUFACTURER_INFO = 0x00A8
+REG_SERIAL_NUMBER = 0x00D8
+REG_USER_DEFINED_NAME = 0x00E8
+REG_SCP = 0x0D00
+REG_SCPS = 0x0D04
+REG_SCPD = 0x0D08
+REG_SCDA = 0x0D18
+
+# Device specific event IDs of the emulator
+EVENT_ACQUISITION_START = 0x9000
+EVENT_ACQUISITION_END = 0x9001
+EVENT_TEMPERATURE = 0x9002
+
+XML_ADDRESS = 0x10000000
+XML_FILE_NAME = "Specim_FX10e_Emulator.xml"
+XML_MEMORY_SIZE = 0x00100000
+
+GVSP_TOTAL_HEADER_SIZE = 36 # IP + UDP + GVSP header
+MONO8 = 0x01080001
+MONO12 = 0x01100005
+
+SENSOR_WIDTH = 1024
+SENSOR_HEIGHT = 224
+CUBE_LINES = 64 # Number of distinct synthetic frames, they are streamed in a loop
+RESEND_HISTORY = 16 # Number of recent blocks that can be sent again
+
+def _invalidators(invalidators: tuple[str, ...]) -> str:
+  # Nodes that change the value of a register when they are written
+  return "".join(f"""    <pInvalidator>{name}</pInvalidator>
+""" for name in invalidators)
+
+def _int_reg(name: str, addr: int, access: str = "RW", length: int = 4, invalidators: tuple[str, ...] = ()) -> str:
+  return f"""  <IntReg Name="{name}">
+    <Address>0x{addr:08x}</Address>
+    <Length>{length}</Length>
+    <AccessMode>{access}</AccessMode>
+    <pPort>Device</pPort>
+    <Cachable>NoCache</Cachable>
+{_invalidators(invalidators)}    <Sign>Unsigned</Sign>
+    <Endianess>BigEndian</Endianess>
+  </IntReg>
+"""
+
+def _masked_int_reg(name: str, addr: int, access: str = "RW") -> str:
+  # Lower 16 bits of a register
+  return f"""  <MaskedIntReg Name="{name}">
+    <Address>0x{addr:08x}</Address>
+    <Length>4</Length>
+    <AccessMode>{access}</AccessMode>
+    <pPort>Device</pPort>
+    <Cachable>NoCache</Cachable>
+    <LSB>31</LSB>
+    <MSB>16</MSB>
+    <Sign>Unsigned</Sign>
+    <Endianess>BigEndian</Endianess>
+  </MaskedIntReg>
+"""
+
+def _float_reg(name: str, addr: int, access: str = "RW", unit: str = "") -> str:
+  return f"""  <FloatReg Name="{name}">
+    <Address>0x{addr:08x}</Address>
+    <Length>4</Length>
+    <AccessMode>{access}</AccessMode>
+    <pPort>Device</pPort>
+    <Cachable>NoCache</Cachable>
+    <Endianess>BigEndian</Endianess>
+    <Unit>{unit}</Unit>
+  </FloatReg>
+"""
+
+def _string_reg(name: str, addr: int, length: int) -> str:
+  return f"""  <StringReg Name="{name}">
+    <Address>0x{addr:08x}</Address>
+    <Length>{length}</Length>
+    <AccessMode>RO</AccessMode>
+    <pPort>Device</pPort>
+  </StringReg>
+"""
+
+def _boolean(name: str, addr: int) -> str:
+  return f"""  <Boolean Name="{name}">
+    <pValue>{name}Reg</pValue>
+    <OnValue>1</OnValue>
+    <OffValue>0</OffValue>
+  </Boolean>
+""" + _int_reg(f"{name}Reg", addr)
+
+def _command(name: str, addr: int) -> str:
+  return f"""  <Command Name="{name}">
+    <pValue>{name}Reg</pValue>
+    <CommandValue>1</CommandValue>
+  </Command>
+""" + _int_reg(f"{name}Reg", addr, "RW")
+
+def _enumeration(name: str, addr: int, entries: dict[str, int]) -> str:
+  xml = f"""  <Enumeration Name="{name}">
+"""
+  for entry, value in entries.items():
+    xml += f"""    <EnumEntry Name="{entry}">
+      <Value>{value}</Value>
+    </EnumEntry>
+"""
+  xml += f"""    <pValue>{name}Reg</pValue>
+  </Enumeration>
+"""
+  return xml + _int_reg(f"{name}Reg", addr)
+
+def _category(name: str, features: list[str]) -> str:
+  xml = f"""  <Category Name="{name}" NameSpace="{'Standard' if name == 'Root' else 'Custom'}">
+"""
+  for feature in features:
+    xml += f"""    <pFeature>{feature}</pFeature>
+"""
+  return xml + """  </Category>
+"""
+
+def create_device_description() -> str:
+  """
+  Create GenICam device description file of the emulator.
+
+  :returns: Device description XML
+  """
+  categories = {
+    "DeviceControl": ["DeviceVendorName", "DeviceModelName", "DeviceSerialNumber", "Temperature_Update", "Temperature_Proc", "Temperature_ProcLowLimit", "Temperature_FPGA", "Temperature_FPGALowLimit", "MotorShutter_PulseFwd", "MotorShutter_PulseRev"],
+    "ImageFormatControl": ["Width", "Height", "BinningHorizontal", "BinningVertical", "PixelFormat", "AberCorrection_Enable"],
+    "AcquisitionControl": ["AcquisitionMode", "AcquisitionStart", "AcquisitionStop", "AcquisitionFrameRate", "EnAcquisitionFrameRate", "ExposureMode", "ExposureTime", "FrameStart_TriggerMode", "Trigger_Interleave"],
+    "TransportLayerControl": ["PayloadSize", "GevSCPHostPort", "DeviceStreamChannelPacketSize", "GevSCPD", "GevSCDAReg"],
+  }
+  xml = """<?xml version="1.0" encoding="utf-8"?>
+<RegisterDescription ModelName="FX10e" VendorName="Specim" ToolTip="Specim FX10e emulator" StandardNameSpace="None" SchemaMajorVersion="1" SchemaMinorVersion="1" SchemaSubMinorVersion="0" MajorVersion="1" MinorVersion="0" SubMinorVersion="0" ProductGuid="3a7e2f50-1c4b-4f0e-9d2a-6b1f0c8e5a10" VersionGuid="8d4c1e2a-5b3f-4a6d-9e7c-2f1a0b3c4d5e" xmlns="http://www.genicam.org/GenApi/Version_1_1" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.genicam.org/GenApi/Version_1_1 http://www.genicam.org/GenApi/GenApiSchema_Version_1_1.xsd">
+"""
+  xml += _category("Root", list(categories.keys()))
+  for name, features in categories.items():
+    xml += _category(name, features)
+  xml += _string_reg("DeviceVendorName", REG_MANUFACTURER_NAME, 32)
+  xml += _string_reg("DeviceModelName", REG_MODEL_NAME, 32)
+  xml += _string_reg("DeviceSerialNumber", REG_SERIAL_NUMBER, 16)
+  xml += _command("Temperature_Update", REG_TEMPERATURE_UPDATE)
+  xml += _float_reg("Temperature_Proc", REG_TEMPERATURE_PROC, "RO", "C")
+  xml += _float_reg("Temperature_ProcLowLimit", REG_TEMPERATURE_PROC_LIMIT, "RO", "C")
+  xml += _float_reg("Temperature_FPGA", REG_TEMPERATURE_FPGA, "RO", "C")
+  xml += _float_reg("Temperature_FPGALowLimit", REG_TEMPERATURE_FPGA_LIMIT, "RO", "C")
+  xml += _int_reg("MotorShutter_PulseFwd", REG_SHUTTER_FWD)
+  xml += _int_reg("MotorShutter_PulseRev", REG_SHUTTER_REV)
+  xml += _int_reg("Width", REG_WIDTH, "RO", invalidators=("BinningHorizontal",))
+  xml += _int_reg("Height", REG_HEIGHT, "RO", invalidators=("BinningVertical",))
+  xml += _int_reg("BinningHorizontal", REG_BINNING_HORIZONTAL)
+  xml += _int_reg("BinningVertical", REG_BINNING_VERTICAL)
+  xml += _enumeration("PixelFormat", REG_PIXEL_FORMAT, {"Mono8": MONO8, "Mono12": MONO12})
+  xml += _boolean("AberCorrection_Enable", REG_ABER_CORRECTION)
+  xml += _enumeration("AcquisitionMode", REG_ACQUISITION_MODE, {"Continuous": 0, "SingleFrame": 1, "MultiFrame": 2})
+  xml += _command("AcquisitionStart", REG_ACQUISITION_START)
+  xml += _command("AcquisitionStop", REG_ACQUISITION_STOP)
+  xml += _float_reg("AcquisitionFrameRate", REG_FRAME_RATE, "RW", "Hz")
+  xml += _boolean("EnAcquisitionFrameRate", REG_EN_FRAME_RATE)
+  xml += _enumeration("ExposureMode", REG_EXPOSURE_MODE, {"Timed": 1, "TriggerWidth": 2})
+  xml += _float_reg("ExposureTime", REG_EXPOSURE_TIME, "RW", "us")
+  xml += _enumeration("FrameStart_TriggerMode", REG_TRIGGER_MODE, {"Off": 0, "On": 1})
+  xml += _boolean("Trigger_Interleave", REG_TRIGGER_INTERLEAVE)
+  xml += _int_reg("PayloadSize", REG_PAYLOAD_SIZE, "RO", invalidators=("BinningHorizontal", "BinningVertical", "PixelFormatReg", "DeviceStreamChannelPacketSize"))
+  xml += _masked_int_reg("GevSCPHostPort", REG_SCP)
+  xml += _masked_int_reg("DeviceStreamChannelPacketSize", REG_SCPS)
+  xml += _int_reg("GevSCPD", REG_SCPD)
+  xml += _int_reg("GevSCDAReg", REG_SCDA)
+  xml += """  <Port Name="Device" NameSpace="Standard">
+  </Port>
+</RegisterDescription>
+"""
+  return xml
+
+class FX10Emulator:
+  """
+  Emulate Specim FX10e camera on a UDP port.
+
+  Frames are synthetic: a spectral ramp multiplied by a stripe pattern that moves along the scan.
+  When the shutter is closed (MotorShutter_PulseFwd) the frames contain only dark noise.
+  """
+
+  def __init__(self, addr: str = "127.0.0.1", port: int = 0, frame_rate: float = 30.0, loss: float = 0.0, seed: int = None) -> None:
+    """
+    :param addr: IP address to listen for GVCP commands
+    :param port: UDP port to listen for GVCP commands, default 0 picks a free port (see port property)
+    :param frame_rate: Initial value of AcquisitionFrameRate
+    :param loss: Probability to drop each GVSP packet on its first transmission (0.0 - 1.0)
+    :param seed: Seed for the random number generator of packet loss and noise, optional
+    """
+    if loss < 0.0 or loss > 1.0:
+      raise ValueError("Packet loss must be between 0 and 1")
+    self.addr = addr
+    self.loss = loss
+    self.mac = "02:00:00:00:10:0e"
+    self.serial_number = "EMU00001"
+    self.verbose = False
+    self._random = random.Random(seed)
+    self._noise = np.random.default_rng(seed)
+
+    # Registers are 32-bit words
+    self._regs: dict[int, int] = {}
+    self._regs_lock = threading.Lock()
+    self._xml = self._create_xml_zip()
+    self._init_registers(frame_rate)
+
+    # GVCP
+    self._soc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self._soc.bind((addr, port))
+    self._soc.settimeout(0.1)
+    self._gvcp_thread: threading.Thread = None
+    self._stop = threading.Event()
+
+    # GVSP
+    self._gvsp_soc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self._gvsp_lock = threading.Lock()
+    self._stream_thread: threading.Thread = None
+    self._stream_stop = threading.Event()
+    self._block_id = 0
+    self._history: deque[tuple[int, list[bytes]]] = deque(maxlen=RESEND_HISTORY)
+    self._cube: np.ndarray = None
+    self._shutter_open = True
+    self.frames_sent = 0
+    self.packets_sent = 0
+    self.packets_lost = 0
+    self.packets_resent = 0
+
+    # Message channel
+    self._msg_lock = threading.Lock()
+    self._msg_req_id = GVCPRequestId()
+    self.events_sent = 0
+    self.events_acknowledged = 0
+
+  def __del__(self) -> None:
+    if self.is_running:
+      self.stop()
+
+  @property
+  def port(self) -> int:
+    """UDP port the emulator listens for GVCP commands."""
+    return self._soc.getsockname()[1]
+
+  @property
+  def is_running(self) -> bool:
+    """Emulator is answering GVCP commands."""
+    return self._gvcp_thread != None and self._gvcp_thread.is_alive()
+
+  @property
+  def is_streaming(self) -> bool:
+    """Acquisition is active and frames are being streamed."""
+    return self._stream_thread != None and self._stream_thread.is_alive()
+
+  def start(self) -> None:
+    """
+    Start answering GVCP commands.
+
+    :returns: None
+    :raises RuntimeError: Emulator is already running
+    """
+    if self.is_running:
+      raise RuntimeError("Emulator is already running")
+    self._stop.clear()
+    self._gvcp_thread = threading.Thread(target=self._gvcp_loop, daemon=True)
+    self._gvcp_thread.start()
+    if self.verbose:
+      print(f"EMU: Listening GVCP on {self.addr}:{self.port}")
+
+  def stop(self) -> None:
+    """
+    Stop streaming and answering GVCP commands.
+
+    :returns: None
+    """
+    self._stop_stream()
+    self._stop.set()
+    if self._gvcp_thread != None:
+      self._gvcp_thread.join()
+    self._soc.close()
+    self._gvsp_soc.close()
+    if self.verbose:
+      print("EMU: Stopped")
+
+  def device_info(self, host_addr: str = None) -> GCDeviceInfo:
+    """
+    Create device info to connect to the emulator without discovery, e.g. FX10(emulator.device_info(), emulator.port).
+
+    :param host_addr: Host address to receive frames, default is the address of the emulator
+    :returns: Device info
+    """
+    host_addr = self.addr if host_addr == None or self.addr == "0.0.0.0" else host_addr
+    if host_addr == "0.0.0.0":
+      host_addr = "127.0.0.1"
+    return GCDeviceInfo(host_addr, "255.0.0.0", GVCPDiscoveryAck(self._ack(GEV_STATUS_SUCCESS, DISCOVERY_ACK, 0, self._discovery_payload())))
+
+  def read(self, addr: int) -> int:
+    """Read a register of the emulated camera."""
+    with self._regs_lock:
+      return self._regs[addr]
+
+  def write(self, addr: int, value: int) -> None:
+    """Write a register of the emulated camera, like the host would do."""
+    self._write_registers([addr], [value])
+
+  def send_event(self, event_id: int, data: bytes = bytes()) -> None:
+    """
+    Send an event through the message channel if it is open, like the camera would do. The event is
+    sent in the background and resent until acknowledged as set in the message channel registers.
+
+    :param event_id: Event identifier, e.g. EVENT_TEMPERATURE
+    :param data: Event data, sent with EVENTDATA command if not empty
+    :returns: None
+    """
+    with self._regs_lock:
+      dest = (self._int_to_ip(self._regs[REG_MCDA]), self._regs[REG_MCP] & 0xffff)
+      timeout = self._regs[REG_MCTT] / 1000
+      retries = self._regs[REG_MCRC]
+    if dest[1] == 0:
+      return
+    with self._msg_lock:
+      req_id = self._msg_req_id.get()
+    event = uint16_to_bytes(0) + uint16_to_bytes(event_id) + uint16_to_bytes(0) + uint16_to_bytes(self._block_id) + struct.pack(">Q", time.perf_counter_ns())
+    cmd = EVENTDATA_CMD if len(data) > 0 else EVENT_CMD
+    payload = event + data
+    packet = bytes([GVCP_KEY, 0x01]) + uint16_to_bytes(cmd) + uint16_to_bytes(len(payload)) + uint16_to_bytes(req_id) + payload
+    threading.Thread(target=self._send_event_packet, args=(packet, req_id, dest, timeout, retries), daemon=True).start()
+
+  def _send_event_packet(self, packet: bytes, req_id: int, dest: tuple[str, int], timeout: float, retries: int) -> None:
+    # Every event has its own socket, so acknowledgements of parallel events do not mix
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as soc:
+      soc.settimeout(timeout)
+      for _ in range(retries + 1):
+        try:
+          soc.sendto(packet, dest)
+          self.events_sent += 1
+          while True:
+            ack = soc.recv(ETH_MAX_MTU)
+            if len(ack) >= GVCP_HEADER_SIZE and bytes_to_uint16(ack[6:8]) == req_id:
+              self.events_acknowledged += 1
+              return
+        except socket.timeout:
+          continue
+        except OSError:
+          return
+
+  def _init_registers(self, frame_rate: float) -> None:
+    regs = self._regs
+    regs[REG_VERSION] = 0x00020000 # GigE Vision 2.0
+    regs[REG_DEVICE_MODE] = 0x80000001 # Big endian, transmitter, UTF-8
+    mac = mac_to_bytes(self.mac)
+    regs[REG_MAC_HIGH] = bytes_to_uint16(mac[:2])
+    regs[REG_MAC_LOW] = bytes_to_uint32(mac[2:])
+    regs[REG_CURRENT_IP] = ip_to_uint32(self.addr)
+    regs[REG_CURRENT_SUBNET] = ip_to_uint32("255.0.0.0")
+    regs[REG_CURRENT_GATEWAY] = 0
+    self._write_string(REG_MANUFACTURER_NAME, "Specim", 32)
+    self._write_string(REG_MODEL_NAME, "FX10e", 32)
+    self._write_string(REG_DEVICE_VERSION, "Emulator 1.0", 32)
+    self._write_string(REG_MANUFACTURER_INFO, "Software emulator", 48)
+    self._write_string(REG_SERIAL_NUMBER, self.serial_number, 16)
+    self._write_string(REG_USER_DEFINED_NAME, "", 16)
+    url = f"Local:{XML_FILE_NAME[:-4]}.zip;{XML_ADDRESS:x};{len(self._xml):x}"
+    self._write_string(REG_FIRST_URL, url, REG_FIRST_URL_LEN)
+    self._write_string(0x0400, "", REG_FIRST_URL_LEN) # Second URL
+    regs[REG_GVCP_CAPABILITY] = 0x00000007 # Concatenation, WRITEMEM, PACKETRESEND
+    regs[REG_HEARTBEAT_TIMEOUT] = 3000
+    regs[REG_CCP] = 0
+    regs[REG_SCP] = 0
+    regs[REG_SCPS] = 1500
+    regs[REG_SCPD] = 0
+    regs[REG_SCDA] = 0
+    regs[REG_NUM_MESSAGE_CHANNELS] = 1
+    regs[REG_MCP] = 0
+    regs[REG_MCDA] = 0
+    regs[REG_MCTT] = 300
+    regs[REG_MCRC] = 3
+
+    regs[REG_TEMPERATURE_PROC] = float32_to_raw_uint(40.0)
+    regs[REG_TEMPERATURE_PROC_LIMIT] = float32_to_raw_uint(70.0)
+    regs[REG_TEMPERATURE_FPGA] = float32_to_raw_uint(45.0)
+    regs[REG_TEMPERATURE_FPGA_LIMIT] = float32_to_raw_uint(80.0)
+    regs[REG_TEMPERATURE_UPDATE] = 0
+    regs[REG_TRIGGER_INTERLEAVE] = 0
+    regs[REG_ABER_CORRECTION] = 0
+    regs[REG_TRIGGER_MODE] = 1
+    regs[REG_EXPOSURE_MODE] = 2
+    regs[REG_EN_FRAME_RATE] = 0
+    regs[REG_EXPOSURE_TIME] = float32_to_raw_uint(10000.0)
+    regs[REG_FRAME_RATE] = float32_to_raw_uint(frame_rate)
+    regs[REG_ACQUISITION_MODE] = 1
+    regs[REG_ACQUISITION_START] = 0
+    regs[REG_ACQUISITION_STOP] = 0
+    regs[REG_SHUTTER_FWD] = 0
+    regs[REG_SHUTTER_REV] = 0
+    regs[REG_BINNING_HORIZONTAL] = 1
+    regs[REG_BINNING_VERTICAL] = 1
+    regs[REG_PIXEL_FORMAT] = MONO12
+    self._update_image_format()
+
+  def _create_xml_zip(self) -> bytes:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as z_file:
+      z_file.writestr(XML_FILE_NAME, create_device_description())
+    return data.getvalue()
+
+  def _write_string(self, addr: int, value: str, length: int) -> None:
+    data = value.encode("utf-8")[:length].ljust(length, b"\x00")
+    for i in range(0, length, 4):
+      self._regs[addr + i] = bytes_to_uint32(data[i:i+4])
+
+  def _update_image_format(self) -> None:
+    # Protected by self._regs_lock (or called before threads are started)
+    regs = self._regs
+    regs[REG_WIDTH] = SENSOR_WIDTH // max(regs[REG_BINNING_HORIZONTAL], 1)
+    regs[REG_HEIGHT] = SENSOR_HEIGHT // max(regs[REG_BINNING_VERTICAL], 1)
+    pixel_size = 1 if regs[REG_PIXEL_FORMAT] == MONO8 else 2
+    frame_size = regs[REG_WIDTH] * regs[REG_HEIGHT] * pixel_size
+    # Last packet is padded, so that payload size is a multiple of the packet payload
+    packet_payload = (regs[REG_SCPS] & 0xffff) - GVSP_TOTAL_HEADER_SIZE
+    regs[REG_PAYLOAD_SIZE] = -(-frame_size // packet_payload) * packet_payload
+
+  def _read_memory(self, addr: int, count: int) -> Union[bytes, None]:
+    # Device description file is served from its own memory area
+    if addr >= XML_ADDRESS and addr + count <= XML_ADDRESS + XML_MEMORY_SIZE:
+      offset = addr - XML_ADDRESS
+      return self._xml[offset:offset+count].ljust(count, b"\x00")
+    data = bytes()
+    with self._regs_lock:
+      for reg in range(addr, addr + count, 4):
+        if reg not in self._regs:
+          return None
+        data += uint32_to_bytes(self._regs[reg])
+    return data
+
+  def _write_registers(self, addrs: list[int], values: list[int]) -> int:
+    """Write registers and apply their side effects, returns number of registers written."""
+    start = False
+    stop = False
+    with self._regs_lock:
+      for i, (addr, value) in enumerate(zip(addrs, values)):
+        if addr not in self._regs:
+          return i
+        self._regs[addr] = value
+        if addr in (REG_BINNING_HORIZONTAL, REG_BINNING_VERTICAL, REG_PIXEL_FORMAT, REG_SCPS):
+          self._update_image_format()
+        elif addr == REG_TEMPERATURE_UPDATE:
+          self._regs[addr] = 0
+          self._regs[REG_TEMPERATURE_PROC] = float32_to_raw_uint(40.0 + self._random.uniform(-0.5, 0.5))
+          self._regs[REG_TEMPERATURE_FPGA] = float32_to_raw_uint(45.0 + self._random.uniform(-0.5, 0.5))
+        elif addr == REG_ACQUISITION_START:
+          self._regs[addr] = 0 # Command is done
+          start = True
+        elif addr == REG_ACQUISITION_STOP:
+          self._regs[addr] = 0
+          stop = True
+        elif addr == REG_SHUTTER_FWD:
+          self._shutter_open = False
+        elif addr == REG_SHUTTER_REV:
+          self._shutter_open = True
+    if stop:
+      self._stop_stream()
+    if start:
+      self._start_stream()
+    return len(addrs)
+
+  def _discovery_payload(self) -> bytes:
+    payload = bytearray(248)
+    with self._regs_lock:
+      regs = self._regs
+      payload[0:4] = uint32_to_bytes(regs[REG_VERSION])
+      payload[4:8] = uint32_to_bytes(regs[REG_DEVICE_MODE])
+      payload[8:12] = uint32_to_bytes(regs[REG_MAC_HIGH])
+      payload[12:16] = uint32_to_bytes(regs[REG_MAC_LOW])
+      payload[16:20] = uint32_to_bytes(0x00000007) # IP config options: persistent, DHCP, LLA
+      payload[20:24] = uint32_to_bytes(0x00000004) # Current IP config: LLA
+      payload[36:40] = uint32_to_bytes(regs[REG_CURRENT_IP])
+      payload[52:56] = uint32_to_bytes(regs[REG_CURRENT_SUBNET])
+      payload[68:72] = uint32_to_bytes(regs[REG_CURRENT_GATEWAY])
+    payload[72:232] = self._read_memory(REG_MANUFACTURER_NAME, 160)
+    payload[232:248] = self._read_memory(REG_USER_DEFINED_NAME, 16)
+    return bytes(payload)
+
+  def _ack(self, status: int, ack: int, ack_id: int, payload: bytes = bytes()) -> bytes:
+    # Error codes have the severity bit set
+    status = status | 0x8000 if status not in (GEV_STATUS_SUCCESS, GEV_STATUS_PACKET_RESEND) else status
+    return uint16_to_bytes(status) + uint16_to_bytes(ack) + uint16_to_bytes(len(payload)) + uint16_to_bytes(ack_id) + payload
+
+  def _gvcp_loop(self) -> None:
+    while not self._stop.is_set():
+      try:
+        data, addr = self._soc.recvfrom(ETH_MAX_MTU)
+      except socket.timeout:
+        continue
+      except OSError:
+        break
+      if len(data) < GVCP_HEADER_SIZE or data[0] != GVCP_KEY:
+        continue
+      ack_required = bool(data[1] & 0x01)
+      cmd = bytes_to_uint16(data[2:4])
+      req_id = bytes_to_uint16(data[6:8])
+      payload = data[GVCP_HEADER_SIZE:GVCP_HEADER_SIZE + bytes_to_uint16(data[4:6])]
+      response = self._handle_command(cmd, req_id, payload, addr)
+      if response != None and (ack_required or cmd == DISCOVERY_CMD):
+        try:
+          self._soc.sendto(response, addr)
+        except OSError:
+          break
+
+  def _handle_command(self, cmd: int, req_id: int, payload: bytes, addr: tuple[str, int]) -> Union[bytes, None]:
+    if cmd == DISCOVERY_CMD:
+      return self._ack(GEV_STATUS_SUCCESS, DISCOVERY_ACK, req_id, self._discovery_payload())
+
+    elif cmd == READREG_CMD:
+      values = bytes()
+      for reg in bytes_to_uint32_list(payload):
+        value = self._read_memory(reg, 4)
+        if value == None:
+          return self._ack(GEV_STATUS_INVALID_ADDRESS, READREG_ACK, req_id, values)
+        values += value
+      return self._ack(GEV_STATUS_SUCCESS, READREG_ACK, req_id, values)
+
+    elif cmd == WRITEREG_CMD:
+      words = bytes_to_uint32_list(payload)
+      addrs = words[0::2]
+      written = self._write_registers(addrs, words[1::2])
+      status = GEV_STATUS_SUCCESS if written == len(addrs) else GEV_STATUS_INVALID_ADDRESS
+      return self._ack(status, WRITEREG_ACK, req_id, uint16_to_bytes(0) + uint16_to_bytes(written))
+
+    elif cmd == READMEM_CMD:
+      mem_addr = bytes_to_uint32(payload[0:4])
+      count = bytes_to_uint16(payload[6:8])
+      data = self._read_memory(mem_addr, count)
+      if data == None:
+        return self._ack(GEV_STATUS_INVALID_ADDRESS, READMEM_ACK, req_id)
+      return self._ack(GEV_STATUS_SUCCESS, READMEM_ACK, req_id, payload[0:4] + data)
+
+    elif cmd == WRITEMEM_CMD:
+      mem_addr = bytes_to_uint32(payload[0:4])
+      values = bytes_to_uint32_list(payload[4:])
+      written = self._write_registers(list(range(mem_addr, mem_addr + 4 * len(values), 4)), values)
+      status = GEV_STATUS_SUCCESS if written == len(values) else GEV_STATUS_INVALID_ADDRESS
+      return self._ack(status, WRITEMEM_ACK, req_id, uint16_to_bytes(0) + uint16_to_bytes(4 * written))
+
+    elif cmd == PACKETRESEND_CMD:
+      block_id = bytes_to_uint16(payload[2:4])
+      first = bytes_to_uint32(payload[4:8])
+      last = bytes_to_uint32(payload[8:12])
+      self._resend(block_id, first, last)
+      return None
+
+    # FORCEIP, ACTION etc. are not emulated
+    return self._ack(GEV_STATUS_NOT_IMPLEMENTED, cmd + 1, req_id)
+
+  def _start_stream(self) -> None:
+    if self.is_streaming:
+      return
+    self._stream_stop.clear()
+    self._stream_thread = threading.Thread(target=self._stream_loop, daemon=True)
+    self._stream_thread.start()
+    self.send_event(EVENT_ACQUISITION_START)
+    if self.verbose:
+      print("EMU: Acquisition started")
+
+  def _stop_stream(self) -> None:
+    if not self.is_streaming:
+      return
+    self._stream_stop.set()
+    self._stream_thread.join()
+    self.send_event(EVENT_ACQUISITION_END)
+    if self.verbose:
+      print("EMU: Acquisition stopped")
+
+  def _create_cube(self, height: int, width: int, pixel_format: int) -> np.ndarray:
+    spectrum = np.linspace(0.25, 1.0, height, dtype=np.float32)[:, np.newaxis]
+    x = np.arange(width, dtype=np.float32) / width
+    phase = np.arange(CUBE_LINES, dtype=np.float32)[:, np.newaxis] / CUBE_LINES
+    stripes = 0.5 + 0.5 * np.sin(2 * np.pi * (4 * x + phase))
+    cube = (spectrum[np.newaxis] * stripes[:, np.newaxis] * 3500).astype(np.uint16)
+    cube += self._noise.integers(90, 110, cube.shape, np.uint16) # Dark level and noise
+    return (cube >> 4).astype(np.uint8) if pixel_format == MONO8 else cube.astype("<u2")
+
+  def _frame_packets(self, frame: np.ndarray, block_id: int, pixel_format: int, packet_payload: int) -> list[bytes]:
+    height, width = frame.shape
+    data = memoryview(frame.tobytes())
+    timestamp = time.perf_counter_ns()
+    status = uint16_to_bytes(GEV_STATUS_SUCCESS)
+    block = uint16_to_bytes(block_id)
+    leader = struct.pack(">HHQIIIIIHH", 0, 0x0001, timestamp, pixel_format, width, height, 0, 0, 0, 0)
+    packets = [status + block + b"\x01\x00\x00\x00" + leader]
+    packet_id = 1
+    for start in range(0, len(data), packet_payload):
+      chunk = data[start:start+packet_payload]
+      if len(chunk) < packet_payload:
+        chunk = bytes(chunk).ljust(packet_payload, b"\x00")
+      packets.append(status + block + bytes([0x03]) + packet_id.to_bytes(3, "big") + bytes(chunk))
+      packet_id += 1
+    trailer = struct.pack(">HHI", 0, 0x0001, height)
+    packets.append(status + block + bytes([0x02]) + packet_id.to_bytes(3, "big") + trailer)
+    return packets
+
+  def _stream_loop(self) -> None:
+    line = 0
+    next_frame = time.perf_counter()
+    with self._regs_lock:
+      regs = self._regs
+      dest = (self._int_to_ip(regs[REG_SCDA]), regs[REG_SCP] & 0xffff)
+    while not self._stream_stop.is_set():
+      with self._regs_lock:
+        height = regs[REG_HEIGHT]
+        width = regs[REG_WIDTH]
+        pixel_format = regs[REG_PIXEL_FORMAT]
+        packet_payload = (regs[REG_SCPS] & 0xffff) - GVSP_TOTAL_HEADER_SIZE
+        packet_delay = regs[REG_SCPD] * 1e-8 # In 10 ns steps
+        if regs[REG_EN_FRAME_RATE]:
+          period = 1.0 / max(bytes_to_float32(uint32_to_bytes(regs[REG_FRAME_RATE])), 0.001)
+        else:
+          period = bytes_to_float32(uint32_to_bytes(regs[REG_EXPOSURE_TIME])) * 1e-6
+      if self._cube is None or self._cube.shape[1:] != (height, width) or self._cube.dtype != (np.uint8 if pixel_format == MONO8 else np.uint16):
+        self._cube = self._create_cube(height, width, pixel_format)
+      frame = self._cube[line % CUBE_LINES] if self._shutter_open else self._cube[0] & 0x7
+      self._block_id = self._block_id % 0xffff + 1
+      packets = self._frame_packets(frame, self._block_id, pixel_format, packet_payload)
+      with self._gvsp_lock:
+        self._history.append((self._block_id, packets))
+
+      # Send packets, inter-packet delay is applied in 1 ms steps as sleep is not more precise
+      send_time = time.perf_counter()
+      for packet in packets:
+        if self.loss > 0.0 and self._random.random() < self.loss:
+          self.packets_lost += 1
+        else:
+          self._send_packet(packet, dest)
+        if packet_delay > 0.0:
+          send_time += packet_delay
+          ahead = send_time - time.perf_counter()
+          if ahead > 0.001:
+            time.sleep(ahead)
+      self.frames_sent += 1
+      line += 1
+
+      # Wait for the next frame, do not try to catch up if sending was late
+      next_frame = max(next_frame + period, time.perf_counter())
+      self._stream_stop.wait(max(next_frame - time.perf_counter(), 0.0))
+
+  def _int_to_ip(self, value: int) -> str:
+    return bytes_to_ip(uint32_to_bytes(value))
+
+  def _send_packet(self, packet: bytes, dest: tuple[str, int]) -> None:
+    try:
+      self._gvsp_soc.sendto(packet, dest)
+      self.packets_sent += 1
+    except OSError:
+      pass
+
+  def _resend(self, block_id: int, first: int, last: int) -> None:
+    with self._gvsp_lock:
+      packets = next((p for b, p in self._history if b == block_id), None)
+    with self._regs_lock:
+      dest = (self._int_to_ip(self._regs[REG_SCDA]), self._regs[REG_SCP] & 0xffff)
+    status = uint16_to_bytes(GEV_STATUS_PACKET_RESEND)
+    for packet_id in range(first, last + 1):
+      if packets == None or packet_id >= len(packets):
+        # Block is not in memory anymore, error statuses have the severity bit set like in _ack
+        unavailable = uint16_to_bytes(0x8000 | GEV_STATUS_PACKET_UNAVAILABLE) + uint16_to_bytes(block_id) + bytes([0x03]) + packet_id.to_bytes(3, "big")
+        self._send_packet(unavailable, dest)
+        return
+      self._send_packet(status + packets[packet_id][2:], dest)
+      self.packets_resent += 1
+
+if __name__ == "__main__":
+  import argparse
+  parser = argparse.ArgumentParser(description="Specim FX10e camera emulator")
+  parser.add_argument("--addr", default="127.0.0.1", help="IP address to listen")
+  parser.add_argument("--port", type=int, default=GVCP_PORT, help="UDP port for GVCP")
+  parser.add_argument("--loss", type=float, default=0.0, help="Probability of a dropped GVSP packet")
+  args = parser.parse_args()
+  emulator = FX10Emulator(args.addr, args.port, loss=args.loss)
+  emulator.verbose = True
+  emulator.start()
+  try:
+    while True:
+      time.sleep(1.0)
+  except KeyboardInterrupt:
+    emulator.stop()
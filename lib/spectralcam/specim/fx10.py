@@ -21,25 +21,28 @@ class FX10(FXBase):
     """
     self._check_connection()
 
-    trigger_interleave = self.get("Trigger_Interleave")
+    # Current values are read with one request, features that are set already are not written again
+    values = self.get_many(["Trigger_Interleave", "AberCorrection_Enable", "FrameStart_TriggerMode", "ExposureMode", "EnAcquisitionFrameRate", "AcquisitionMode"])
+
+    trigger_interleave = values["Trigger_Interleave"]
     if not trigger_interleave:
       self.set("Trigger_Interleave", True)
 
-    en_aber_correction = self.get("AberCorrection_Enable")
+    en_aber_correction = values["AberCorrection_Enable"]
     if not en_aber_correction:
       self.set("AberCorrection_Enable", True)
 
     # TODO Temperature_Update, Temperature_FPGA, Temperature_Proc
 
-    frame_start_trigger_mode = self.get("FrameStart_TriggerMode")
+    frame_start_trigger_mode = values["FrameStart_TriggerMode"]
     if frame_start_trigger_mode != "Off":
       self.set("FrameStart_TriggerMode", "Off")
 
-    exposure_mode = self.get("ExposureMode")
+    exposure_mode = values["ExposureMode"]
     if exposure_mode != "Timed":
       self.set("ExposureMode", "Timed")
 
-    en_frame_rate = self.get("EnAcquisitionFrameRate")
+    en_frame_rate = values["EnAcquisitionFrameRate"]
     if not en_frame_rate:
       self.set("EnAcquisitionFrameRate", True)
 
@@ -47,7 +50,7 @@ class FX10(FXBase):
     self.set("ExposureTime", exposure_time)
     self.set("AcquisitionFrameRate", frame_rate)
 
-    acquisition_mode = self.get("AcquisitionMode")
+    acquisition_mode = values["AcquisitionMode"]
     if acquisition_mode != "Continuous":
       self.set("AcquisitionMode", "Continuous")
 
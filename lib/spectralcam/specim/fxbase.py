@@ -1,18 +1,24 @@
-from collections import deque
-from typing import Union
+from typing import Iterable, Union, TYPE_CHECKING
 import time
+import os
+import json
+import math
 from threading import Event
 import threading
 
 import numpy as np
 from genicam.genapi import NodeMap
-from genicam.genapi import IValue, ICategory, ICommand, IEnumeration
+from genicam.genapi import IValue, ICategory, ICommand, IEnumeration, IBoolean, IInteger, IFloat, IString, IPort, IEnumEntry, EAccessMode, ELinkType
 
 from ...spectralcam.utils import *
-from ...spectralcam.gige import GVCP, GVCPDiscoveryAck, PortGVCP, GVCP_PORT, gvsp
-from ...spectralcam.preview import PreviewFactory
+from ...spectralcam.gige import GVCP, GVCPDiscoveryAck, PortGVCP, GVCP_PORT, CACHE_NEVER, GVCPEvent, GVCPMessageChannel, gvsp
 from ...spectralcam.gentl import GCDeviceInfo, DiscoverableGigeDevice
 from ...spectralcam.exceptions import *
+from ...spectralcam.specim.recorder import FrameRecorder, MemoryRecorder, DiskRecorder
+from ...spectralcam.specim.node_index import NodeIndex
+
+if TYPE_CHECKING:
+  from ...spectralcam.preview import PreviewFactory # vispy is imported by the system that creates the factory
 
 class FXBase(DiscoverableGigeDevice):
   """
@@ -24,16 +30,19 @@ class FXBase(DiscoverableGigeDevice):
   in the future this class can be probably used as a base for such class.
   """
 
-  def __init__(self, dev_info: GCDeviceInfo, port: int = GVCP_PORT, preview_factory: PreviewFactory = None):
+  def __init__(self, dev_info: GCDeviceInfo, port: int = GVCP_PORT, preview_factory: "PreviewFactory" = None):
 
     # GVSP
     self._gvsp_port = 0
     self._gvsp_p = None
     self._is_acquiring = False
+    self._bands = None
+    self._band_binning = 1
+    self._preview_rows = None
     self.preview_factory = preview_factory
 
     # Buffer to save data to
-    self.buffer = deque()
+    self.buffer: FrameRecorder = MemoryRecorder()
     self.record = False
 
     # Show messages in CLI
@@ -53,15 +62,29 @@ class FXBase(DiscoverableGigeDevice):
       print("FX: Device info updated")
 
     # Fetch device description file and create nodes
-    xml_str = self.gvcp.get_device_description_file()
+    xml_str = self.gvcp.get_device_description_file(cache_dir=self.xml_cache_dir)
     gc_port = PortGVCP(self.gvcp)
     gc_xml = NodeMap()
     gc_xml.load_xml_from_string(xml_str)
     gc_xml.connect(gc_port)
     self._gc_xml = gc_xml
+    self._gc_port = gc_port
+    self._index = NodeIndex(gc_xml.nodes)
+    self._registers: dict[str, list[tuple[int, int]]] = {} # Feature name: registers, see _feature_registers
     if self._verbose:
       print("FX: Device description file fetched")
 
+    # Registers are cached until something they depend on is written
+    gc_port.set_invalidators(self._invalidator_registers())
+
+    # Values that change on their own are always read from the camera
+    for feature in self.get_features():
+      if isinstance(feature, ICommand) or any(name in feature.node.name for name in self.VOLATILE_FEATURES):
+        self.set_cache_policy(feature, CACHE_NEVER)
+
+    # Events from the camera
+    self._msg_channel = GVCPMessageChannel(self.gvcp)
+
     # Temperature monitoring
     self.en_temp_warning = True
     self.temp_update_rate = 30.0 # in seconds
@@ -107,8 +130,61 @@ class FXBase(DiscoverableGigeDevice):
     """Frame acquiring is active"""
     return self._is_acquiring
 
+  @property
+  def cache_stats(self) -> dict:
+    """Register cache statistics: number of reads served from the cache (hits) and from the camera (misses)."""
+    return {"hits": self._gc_port.cache_hits, "misses": self._gc_port.cache_misses}
+
+  @property
+  def stream_stats(self) -> Union[dict, None]:
+    """
+    Statistics of the stream channel since acquiring was started, or None if the stream channel is
+    not open. See gvsp.get_stats for the keys, times are in seconds.
+    """
+    if self._gvsp_p == None:
+      return None
+    return gvsp.get_stats(self._gvsp_p)
+
+  VOLATILE_FEATURES = ("Temperature", "Status", "Timestamp")
+  """Features with any of these in their name are never cached (see set_cache_policy)."""
+
+  xml_cache_dir = os.path.join(os.path.expanduser("~"), ".spectralcam", "device_descriptions")
+  """
+  Directory where device description files are cached between connections, None disables the
+  cache. A file is downloaded again if the model, serial number, firmware version or URL of the
+  device description file changes.
+  """
+
+  profile_dir = os.path.join(os.path.expanduser("~"), ".spectralcam", "profiles")
+  """Directory of named configuration profiles (see save_profile and apply_profile)."""
+
+  PROFILE_EXCLUDE = ("GevSCDA", "GevSCPHostPort", "PacketSize", "GevMCDA", "GevMCP", "GevHeartbeat", "MotorShutter")
+  """
+  Features with any of these in their name are left out of profiles. They belong to the current
+  connection or network path, or writing them does something right away (e.g. moves the shutter).
+  """
+
+  PROFILE_ORDER = ("Binning", "Decimation", "Width", "Height", "Offset")
+  """Integer features with these in their name are written in this order before other integers."""
+
+  temp_event_id = None
+  """
+  Event ID the camera sends when its temperature changes, if it has one. While the message channel
+  is open temperatures are then read only when the event is received instead of polling them every
+  temp_update_rate seconds.
+  """
+
   frame_cb = None
-  """Frame callback function. It is called every time a new frame is received."""
+  """
+  Frame callback function. It is called every time a new frame is received, or with a block of
+  frames (lines, bands, width) if the stream channel was opened with more than 1 line per callback.
+  Arguments are the frame data and bit depth, and block ID and camera timestamp of the frames if
+  frame_cb_metadata is True (see gvsp.set_frame_cb). Return True to prevent recording and previewing
+  the frames.
+  """
+
+  frame_cb_metadata = False
+  """Pass block ID and camera timestamp of the frames to frame_cb as a third argument."""
 
   def init_preview(self) -> None:
     self.preview = None
@@ -116,6 +192,7 @@ class FXBase(DiscoverableGigeDevice):
     self.red_band = round(spectral * 1/6)
     self.green_band = round(spectral * 3/6)
     self.blue_band = round(spectral * 5/6)
+    self._preview_rows = None
     if self.preview_factory != None:
       binning = self.get("BinningHorizontal")
       width = self.get("Width")
@@ -137,6 +214,8 @@ class FXBase(DiscoverableGigeDevice):
           self.stop_acquire()
           time.sleep(0.05) # Weird behaviour of FX17 camera...
         self.close_stream()
+      if self.is_message_channel_open:
+        self.close_message_channel()
       self._temp_stop.set()
       self._temp_thread.join()
       self.gvcp.disconnect()
@@ -156,14 +235,9 @@ class FXBase(DiscoverableGigeDevice):
     """
     self._check_connection()
     if type(name) == str:
-      return getattr(self._gc_xml, name)
+      return self._index.get(name)
     elif type(name) == int:
-      for node in self._gc_xml.nodes:
-        try:
-          if hasattr(node, "address") and node.address == name:
-            return node
-        except:
-          pass
+      return self._index.get_by_address(name)
     else:
       raise TypeError("Invalid name")
 
@@ -175,14 +249,10 @@ class FXBase(DiscoverableGigeDevice):
     :raises NotConnectedError: No connection
     """
     self._check_connection()
-    categories = []
-    i = 0
-    for node in self._gc_xml.nodes:
-      if type(node) == ICategory:
-        categories.append(node)
-        if self.verbose or self.print_info:
-          print("{0}: {1}".format(i, node.node.name))
-        i += 1
+    categories = list(self._index.categories)
+    if self.verbose or self.print_info:
+      for i, node in enumerate(categories):
+        print("{0}: {1}".format(i, node.node.name))
     return categories
 
   def get_features(self, category: Union[None, str, ICategory] = None) -> list[IValue]:
@@ -200,7 +270,7 @@ class FXBase(DiscoverableGigeDevice):
     if isinstance(category, ICategory):
       nodes = category.features
     elif category == None:
-      nodes = self._gc_xml.nodes
+      return list(self._index.features)
     else:
       raise TypeError("Not a category")
     features = []
@@ -220,15 +290,10 @@ class FXBase(DiscoverableGigeDevice):
     :raises NotConnectedError: No connection
     """
     self._check_connection()
-    features = []
-    i = 0
-    search = search.lower()
-    for feature in self._gc_xml.nodes:
-      if is_feature(feature) and feature.node.name.lower().find(search) >= 0:
-        features.append(feature)
-        if self.verbose or self.print_info:
-          print("{0}: {1}".format(i, feature.node.name))
-        i += 1
+    features = self._index.search(search)
+    if self.verbose or self.print_info:
+      for i, feature in enumerate(features):
+        print("{0}: {1}".format(i, feature.node.name))
     return features
 
   def info(self, feature: Union[str, IValue]) -> None:
@@ -281,6 +346,36 @@ class FXBase(DiscoverableGigeDevice):
     else:
       return feature.value
 
+  def get_many(self, features: Iterable[Union[str, IValue]]) -> dict[str, any]:
+    """
+    Read values of many features at once. Registers of the features are first read into the register
+    cache with as few packets as possible (see GVCP.readreg), after that values are read from the cache.
+
+    :param features: Camera features or their names
+    :returns: Dictionary of feature names and values, value is None if the feature cannot be read
+    :raises NotConnectedError: No connection
+    :raises TypeError: Invalid feature
+    """
+    self._check_connection()
+    nodes = []
+    for feature in features:
+      if type(feature) == str:
+        feature = self.get_node(feature)
+      elif not isinstance(feature, IValue):
+        raise TypeError("Invalid feature type")
+      nodes.append(feature)
+    addresses = []
+    for node in nodes:
+      addresses += [address for address, length in self._feature_registers(node) if length == 4]
+    self._gc_port.prefetch(addresses)
+    values = {}
+    for node in nodes:
+      try:
+        values[node.node.name] = self.get(node)
+      except Exception:
+        values[node.node.name] = None
+    return values
+
   def set(self, feature: Union[str, IValue], value: any) -> None:
     """
     Write value of a feature (= register in the camera).
@@ -304,39 +399,218 @@ class FXBase(DiscoverableGigeDevice):
     else:
       feature_obj.value = value
 
-  def open_stream(self) -> None:
+  def set_cache_policy(self, feature: Union[str, IValue], policy: int) -> None:
+    """
+    Set how values of a feature are cached. Registers of the feature are found from the device
+    description, or by reading the feature once if their addresses are computed.
+
+    :param feature: Camera feature or it's name
+    :param policy: CACHE_NEVER, CACHE_UNTIL_WRITE (default, cached until the feature or a feature that invalidates it is written) or CACHE_ALWAYS (cached until the feature itself is written)
+    :returns: None
+    :raises NotConnectedError: No connection
+    :raises TypeError: Invalid feature
+    :raises ValueError: Invalid policy
+    """
+    self._check_connection()
+    if type(feature) == str:
+      feature = self.get_node(feature)
+    elif not isinstance(feature, IValue):
+      raise TypeError("Invalid feature type")
+    addresses = [address for address, length in self._feature_registers(feature)]
+    if len(addresses) == 0:
+      self._gc_port.record_reads(True)
+      try:
+        feature.is_done() if isinstance(feature, ICommand) else feature.value
+      except Exception:
+        pass # Not readable, nothing to cache
+      finally:
+        addresses = self._gc_port.record_reads(False)
+    for address in addresses:
+      self._gc_port.set_cache_policy(address, policy)
+
+  def get_profile_features(self) -> list[IValue]:
+    """
+    Get the features a profile is made of: features that can be read and written, excluding
+    commands, volatile features, features in PROFILE_EXCLUDE and registers behind other features.
+
+    :returns: Features in the order of the device description file
+    """
+    behind = set() # Registers that are the value of another feature, e.g. PixelFormatReg
+    for feature in self._index.features:
+      if "pValue" in feature.node.property_names:
+        behind.update(feature.node.get_property("pValue")[0].split("\t"))
+    result = []
+    for feature in self._index.features:
+      name = feature.node.name
+      if type(feature) not in (IInteger, IFloat, IBoolean, IEnumeration, IString) or name in behind:
+        continue
+      if any(part in name for part in self.VOLATILE_FEATURES + self.PROFILE_EXCLUDE):
+        continue
+      if feature.node.get_access_mode() != EAccessMode.RW:
+        continue
+      result.append(feature)
+    return result
+
+  def list_profiles(self) -> list[str]:
+    """
+    List named profiles saved in profile_dir.
+
+    :returns: Names of the profiles in alphabetical order
+    """
+    if self.profile_dir == None or not os.path.isdir(self.profile_dir):
+      return []
+    return sorted(name[:-5] for name in os.listdir(self.profile_dir) if name.endswith(".json"))
+
+  def save_profile(self, name: str, features: Union[Iterable[Union[str, IValue]], None] = None) -> dict[str, any]:
+    """
+    Save the current configuration of the camera as a profile. Values are read at once with get_many.
+
+    :param name: Name of the profile in profile_dir, or path of a .json file
+    :param features: Features to save or None for all features returned by get_profile_features
+    :returns: Dictionary of feature names and saved values
+    :raises NotConnectedError: No connection
+    :raises TypeError: Invalid feature
+    :raises OSError: Cannot write the file
+    """
+    if features == None:
+      features = self.get_profile_features()
+    values = {name: value for name, value in self.get_many(features).items() if value != None}
+    path = self._profile_path(name)
+    if os.path.dirname(path) != "":
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+    profile = {
+      "model": self._info.device.model_name if self._info.device != None else None,
+      "features": values
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+      json.dump(profile, file, indent=2)
+    os.replace(tmp_path, path)
+    if self._verbose:
+      print(f"FX: Profile saved to {path}, {len(values)} features")
+    return values
+
+  def load_profile(self, name: str) -> dict[str, any]:
+    """
+    Read a profile saved with save_profile without applying it.
+
+    :param name: Name of the profile in profile_dir, or path of a .json file
+    :returns: Dictionary of feature names and values
+    :raises OSError: Cannot read the file
+    :raises ValueError: File is not a profile
+    """
+    with open(self._profile_path(name)) as file:
+      profile = json.load(file)
+    if not isinstance(profile, dict) or not isinstance(profile.get("features"), dict):
+      raise ValueError(f"Not a profile: {name}")
+    model = profile.get("model")
+    if model != None and self._info.device != None and model != self._info.device.model_name:
+      print(f"WARNING: Profile {name} was saved from {model}, camera is {self._info.device.model_name}")
+    return profile["features"]
+
+  def apply_profile(self, profile: Union[str, dict[str, any]]) -> list[str]:
+    """
+    Configure the camera from a profile. Current values are read at once and only features that
+    differ are written. Enumerations and booleans (modes and enables) are written first, then
+    integers (binning before ROI), floats and strings. A feature that cannot be written yet, for
+    example an offset that is out of range until the width is changed, is written again after the
+    others. Writing a feature can also change others (binning changes the height, the camera may
+    clamp a value), so after each round the features are read back from the camera and those that
+    still differ are written again, as long as that makes progress.
+
+    :param profile: Name or path of a profile (see load_profile) or dictionary of feature names and values
+    :returns: Names of the written features
+    :raises NotConnectedError: No connection
+    :raises AttributeError: Profile has a feature the camera does not have
+    :raises OSError: Cannot read the profile file
+    :raises ValueError: Profile file is invalid, or features still differ from the profile after writing them
+    :raises Exception: Features could not be written, the error of the first failing feature is raised
+    """
+    self._check_connection()
+    if type(profile) == str:
+      profile = self.load_profile(profile)
+    nodes = []
+    for name in profile:
+      node = self.get_node(name)
+      if node == None:
+        raise AttributeError(f"Unknown feature in profile: {name}")
+      nodes.append(node)
+    written = []
+    differing = self._profile_differences(nodes, profile)
+    previous = None
+    rounds = 0
+    # Stops when the camera matches, writing did not change anything, or values keep changing
+    while len(differing) > 0 and differing != previous and rounds <= len(nodes):
+      changes = [self.get_node(name) for name, value in differing]
+      changes.sort(key=self._profile_write_order)
+      errors = []
+      for node in changes:
+        try:
+          self.set(node, profile[node.node.name])
+          if node.node.name not in written:
+            written.append(node.node.name)
+        except Exception as error:
+          errors.append(error)
+      if len(errors) == len(changes):
+        raise errors[0]
+      previous = differing
+      differing = self._profile_differences(nodes, profile)
+      rounds += 1
+    if len(differing) > 0:
+      raise ValueError("Features differ from the profile after writing: " + ", ".join(f"{name} is {value}, not {profile[name]}" for name, value in differing))
+    if self._verbose:
+      print(f"FX: Profile applied, {len(written)} of {len(nodes)} features written")
+    return written
+
+  def open_stream(self, lines: int = 1, resend_window: float = 0.05, recv_buffer_size: int = 8 * 1024 * 1024) -> None:
     """
     Open GVSP stream channel and start listening for incoming frames.
 
+    :param lines: Number of frames the receiver collects into one block before passing them on. Larger blocks reduce overhead at high frame rates but add latency.
+    :param resend_window: Time in seconds to wait for dropped packets of a frame to be sent again before the frame is discarded. Set to 0 to discard incomplete frames right away. Only used if the camera supports packet resend.
+    :param recv_buffer_size: Size of the socket receive buffer in bytes. A large buffer absorbs bursts of packets at high frame rates, the OS may limit it (net.core.rmem_max on Linux).
     :returns: None
     :raises NotConnectedError: No connection
     :raises AckError: Problem with an acknowledgement from the camera
     :raises MemoryError: Cannot allocate memory
-    :raises ValueError: Invalid GVSP packet or payload size (likely a problem with the camera or a bug)
+    :raises ValueError: Invalid GVSP packet or payload size (likely a problem with the camera or a bug), or the band filter does not match the frame height
     """
     self._check_connection()
+    self._check_band_filter(self._bands) # Height may have changed since the filter was set
     if self._verbose:
       print("FX: Opening stream channel...")
 
-    def handle_frame(frame, bit_depth):
+    def handle_frame(frame, bit_depth, meta):
       intercept = False
       if self.frame_cb != None:
-        intercept = self.frame_cb(frame, bit_depth)
+        intercept = self.frame_cb(frame, bit_depth, meta) if self.frame_cb_metadata else self.frame_cb(frame, bit_depth)
       if not intercept:
+        frames = frame if frame.ndim == 3 else frame[np.newaxis]
         if self.record:
-          self.buffer.append(frame)
+          self.buffer.extend(frames, meta if meta.ndim == 2 else meta[np.newaxis])
         if self.preview != None and self.preview.is_visible():
-          shift = bit_depth - 8
-          preview = np.array([frame[self.red_band], frame[self.green_band], frame[self.blue_band]]).swapaxes(0, 1) >> shift
-          self.preview.push_row(preview)
+          # Only the preview bands are copied here, the preview converts and draws them in its own thread
+          if self._preview_rows == None or self._preview_rows[0] != frames.shape[1]:
+            self._preview_rows = (frames.shape[1], self._band_rows(frames.shape[1]))
+          self.preview.push_bands(frames[:, self._preview_rows[1]], bit_depth - 8)
 
     # Initialize GVSP module to receive frames
     host_addr = self._info.host_address
     payload_size = self.get("PayloadSize")
     packet_size = self.get("DeviceStreamChannelPacketSize")
-    self._gvsp_p, self._gvsp_port = gvsp.create_socket(host_addr)
-    gvsp.set_frame_cb(self._gvsp_p, handle_frame)
-    gvsp.create_buffer(self._gvsp_p, payload_size, packet_size)
+    self._gvsp_p, self._gvsp_port = gvsp.create_socket(host_addr, recv_buffer_size)
+    gvsp.set_frame_cb(self._gvsp_p, handle_frame, metadata=True)
+    gvsp.create_buffer(self._gvsp_p, payload_size, packet_size, lines)
+    if self._bands != None or self._band_binning > 1:
+      gvsp.set_band_filter(self._gvsp_p, self._bands, self._band_binning)
+
+    # Request dropped packets again through the control channel
+    if self.gvcp.packetresend_support == None:
+      self.gvcp._check_capability()
+    if self.gvcp.packetresend_support and resend_window > 0:
+      gvsp.set_resend(self._gvsp_p, self.gvcp.fileno(), resend_window)
+      if self._verbose:
+        print("FX: Packet resend enabled")
 
     # Set receiver address and port
     self._set_gev_scda(ip_to_uint32(host_addr))
@@ -344,6 +618,72 @@ class FXBase(DiscoverableGigeDevice):
     if self._verbose:
       print("FX: Stream channel open")
 
+  @property
+  def is_message_channel_open(self) -> bool:
+    """Message channel is open and events are received from the camera."""
+    return self._msg_channel.is_open
+
+  def open_message_channel(self, timeout: float = 0.2, retries: int = 3) -> None:
+    """
+    Open GigE Vision message channel to receive events from the camera instead of polling registers.
+    Add callbacks for events with add_event_cb. Which events are sent depends on the camera.
+
+    :param timeout: Time the camera waits for an acknowledgement before sending the event again (in seconds)
+    :param retries: Number of times the camera sends an event again
+    :returns: None
+    :raises NotConnectedError: No connection
+    :raises NotImplementedError: Camera has no message channel
+    :raises IsConnectedError: Message channel is already open
+    :raises AckError: Problem with an acknowledgement from the camera
+    """
+    self._check_connection()
+    self._msg_channel.verbose = self._verbose
+    if self.temp_event_id != None:
+      self._msg_channel.add_callback(self.temp_event_id, self._handle_temperature_event)
+    try:
+      self._msg_channel.open(self._info.host_address, timeout, retries)
+    except:
+      if self.temp_event_id != None:
+        self._msg_channel.remove_callback(self.temp_event_id, self._handle_temperature_event)
+      raise
+    if self._verbose:
+      print("FX: Message channel open")
+
+  def close_message_channel(self) -> None:
+    """
+    Close message channel, the camera stops sending events.
+
+    :returns: None
+    :raises NotConnectedError: Message channel is already closed
+    :raises AckError: Problem with an acknowledgement from the camera
+    """
+    self._msg_channel.close()
+    if self.temp_event_id != None:
+      self._msg_channel.remove_callback(self.temp_event_id, self._handle_temperature_event)
+    if self._verbose:
+      print("FX: Message channel closed")
+
+  def add_event_cb(self, event_id: Union[int, None], callback) -> None:
+    """
+    Call a function when the camera sends an event through the message channel.
+
+    :param event_id: Event identifier (gige.EVENT_* constant or device specific ID) or None for all events
+    :param callback: Function that takes gige.GVCPEvent (event_id, block_id, timestamp, data) as a parameter
+    :returns: None
+    """
+    self._msg_channel.add_callback(event_id, callback)
+
+  def remove_event_cb(self, event_id: Union[int, None], callback) -> None:
+    """
+    Remove a function added with add_event_cb.
+
+    :param event_id: Event identifier given to add_event_cb
+    :param callback: Function given to add_event_cb
+    :returns: None
+    :raises ValueError: Callback was not added
+    """
+    self._msg_channel.remove_callback(event_id, callback)
+
   def close_stream(self) -> None:
     """
     Close GVSP stream channel and stop listening for incoming frames.
@@ -360,14 +700,42 @@ class FXBase(DiscoverableGigeDevice):
     self.set("GevSCPHostPort", 0)
     gvsp.free_buffer(self._gvsp_p)
     gvsp.close_socket(self._gvsp_p)
+    self._gvsp_p = None
     if self._verbose:
       print("FX: Stream channel closed")
 
-  def start_acquire(self, record: bool = False) -> None:
+  def set_band_filter(self, bands: Union[Iterable[int], None] = None, binning: int = 1) -> None:
+    """
+    Keep only selected spectral bands of frames and optionally average adjacent bands together.
+    Bands are left out already when frames are decoded, so frame_cb, the preview and recordings get
+    only the selected bands. The filter stays in use when the stream channel is opened again.
+
+    :param bands: Indices of spectral bands to keep, e.g. range(100, 200), or None to keep all bands
+    :param binning: Number of adjacent selected bands to average into one band, default 1
+    :returns: None
+    :raises ValueError: Invalid bands or binning, or a band is not in the frame (see Height)
+    :raises AckError: Problem with an acknowledgement from the camera
+    """
+    bands = None if bands == None else [int(band) for band in bands]
+    if binning < 1 or (bands != None and (len(bands) < binning or min(bands) < 0)):
+      raise ValueError("Bands must not be negative and binning must be between 1 and the number of bands")
+    if self.is_open:
+      self._check_band_filter(bands)
+    if self._verbose:
+      print("FX: Setting band filter")
+    if self._gvsp_p != None:
+      gvsp.set_band_filter(self._gvsp_p, bands, binning)
+    self._bands = bands
+    self._band_binning = binning
+    self._preview_rows = None
+
+  def start_acquire(self, record: bool = False, lines: int = 0, path: str = None) -> None:
     """
     Start acquiring frames.
 
     :param record: Record frames. Recorded buffer will be returned by stop_acquire.
+    :param lines: Expected number of recorded frames to preallocate memory for, optional
+    :param path: Stream recorded frames straight into this .npy file instead of memory, optional
     :returns: None
     :raises NotConnectedError: No connection
     :raises StreamClosedError: Stream channel is not open
@@ -378,14 +746,19 @@ class FXBase(DiscoverableGigeDevice):
       print("FX: Start acquire")
     self._is_acquiring = True
     self.record = record
+    if record and path != None:
+      self.buffer = DiskRecorder(path)
+    elif record:
+      self.buffer = MemoryRecorder(lines) if lines > 0 else MemoryRecorder()
     gvsp.start_receive(self._gvsp_p, self._info.device.current_ip)
     self.set("AcquisitionStart", 1)
 
-  def stop_acquire(self) -> Union[None, np.ndarray]:
+  def stop_acquire(self, metadata: bool = False) -> Union[None, np.ndarray, tuple[np.ndarray, np.ndarray]]:
     """
     Stop acquiring frames.
 
-    :returns: Numpy array of recorded frames or None if recording was not turned on
+    :param metadata: Return also metadata of the recorded frames: an array of shape (lines, 2) with block ID and camera timestamp of each frame. Gaps in block IDs show dropped frames.
+    :returns: Numpy array of recorded frames (memory map of the file when recording to disk) or None if recording was not turned on. With metadata a tuple (frames, metadata).
     :raises NotConnectedError: No connection
     :raises StreamClosedError: Stream channel is not open
     :raises AckError: Problem with an acknowledgement from the camera
@@ -397,9 +770,8 @@ class FXBase(DiscoverableGigeDevice):
     gvsp.stop_receive(self._gvsp_p)
     self._is_acquiring = False
     if self.record:
-      record = np.array(self.buffer)
-      self.buffer.clear()
-      return record
+      data = self.buffer.finish()
+      return (data, self.buffer.meta) if metadata else data
     else:
       return None
 
@@ -420,23 +792,26 @@ class FXBase(DiscoverableGigeDevice):
     ready = Event()
     frame_no = 0
     old_cb = self.frame_cb
+    old_cb_metadata = self.frame_cb_metadata
     pulse_len = 200
 
     def handle_count(frame, bit_depth):
       nonlocal frame_no
-      frame_no += 1
-      if frame_no == frame_count:
+      frame_no += 1 if frame.ndim == 2 else len(frame)
+      if frame_no >= frame_count:
         ready.set()
       return False
 
     self.frame_cb = handle_count
+    self.frame_cb_metadata = False
     self.set("MotorShutter_PulseFwd", pulse_len)
     time.sleep(pulse_len / 1000)
-    self.start_acquire(True)
+    self.start_acquire(True, frame_count)
 
     ready.wait()
     record = self.stop_acquire()
     self.frame_cb = old_cb
+    self.frame_cb_metadata = old_cb_metadata
     self.set("MotorShutter_PulseRev", pulse_len)
     time.sleep(pulse_len / 1000)
     return record
@@ -479,6 +854,7 @@ class FXBase(DiscoverableGigeDevice):
     self.red_band = red
     self.green_band = green
     self.blue_band = blue
+    self._preview_rows = None
 
   def quick_init(self) -> None:
     """
@@ -495,23 +871,115 @@ class FXBase(DiscoverableGigeDevice):
     self.open_stream()
     self.show_preview()
 
+  def _feature_registers(self, feature: IValue) -> list[tuple[int, int]]:
+    # Address and length of registers the value of a feature comes from, registers with a computed
+    # address are left out
+    if feature.node.name in self._registers:
+      return self._registers[feature.node.name]
+    registers = []
+    self._registers[feature.node.name] = registers
+    for terminal in feature.node._get_children(ELinkType.ctTerminalNodes):
+      properties = terminal.node.property_names
+      if "Address" not in properties or "Length" not in properties or "pAddress" in properties or "pIndex" in properties:
+        continue
+      if hasattr(terminal, "address") and hasattr(terminal, "length"):
+        registers.append((terminal.address, terminal.length)) # Integer registers, faster than reading the properties
+        continue
+      try:
+        address = int(terminal.node.get_property("Address")[0], 0)
+        length = int(terminal.node.get_property("Length")[0], 0)
+      except ValueError:
+        continue
+      registers.append((address, length))
+    return registers
+
+  def _invalidator_registers(self) -> dict[int, Iterable[int]]:
+    # Register address: registers that change when it is written, from pInvalidator elements. GenApi
+    # lists them as invalidating children of a node, together with the port and the node's own value.
+    invalidators = {}
+    for node in self._index.nodes:
+      if isinstance(node, ICategory):
+        continue # Features of a category are listed as its children too
+      own = {terminal.node.name for terminal in node.node._get_children(ELinkType.ctTerminalNodes)}
+      children = [child for child in node.node._get_children(ELinkType.ctInvalidatingChildren)
+        if not isinstance(child, (IPort, IEnumEntry)) and child.node.name not in own]
+      if len(children) == 0:
+        continue
+      registers = [address for address, length in self._feature_registers(node)]
+      for child in children:
+        for address, length in self._feature_registers(child):
+          invalidators.setdefault(address, set()).update(registers)
+    return invalidators
+
+  def _profile_path(self, name: str) -> str:
+    if name.endswith(".json") or os.sep in name:
+      return name
+    if self.profile_dir == None:
+      raise ValueError("No profile_dir for named profiles")
+    return os.path.join(self.profile_dir, name + ".json")
+
+  def _profile_write_order(self, feature: IValue) -> tuple[int, int]:
+    types = (IEnumeration, IBoolean, IInteger, IFloat, IString)
+    type_rank = types.index(type(feature)) if type(feature) in types else len(types)
+    name = feature.node.name
+    order = [i for i, part in enumerate(self.PROFILE_ORDER) if part in name]
+    return (type_rank, order[0] if len(order) > 0 else len(self.PROFILE_ORDER))
+
+  def _profile_differences(self, nodes: list[IValue], profile: dict[str, any]) -> list[tuple[str, any]]:
+    # Names and current values of the features that differ from the profile
+    current = self.get_many(nodes)
+    return [(node.node.name, current[node.node.name]) for node in nodes if not self._profile_value_equal(current[node.node.name], profile[node.node.name])]
+
+  @staticmethod
+  def _profile_value_equal(current: any, value: any) -> bool:
+    if current == None:
+      return False
+    if isinstance(current, float) and isinstance(value, (int, float)):
+      return math.isclose(current, value, rel_tol=1e-6)
+    return current == value
+
+  def _check_band_filter(self, bands: Union[list[int], None]) -> None:
+    # Frames with bands beyond the frame height would be dropped by the receiver
+    if bands == None:
+      return
+    height = self.get("Height")
+    if max(bands) >= height:
+      raise ValueError(f"Band {max(bands)} is not in the frame, frames have {height} bands")
+
+  def _band_rows(self, rows: int) -> list[int]:
+    # Rows of the preview bands in band filtered frames, the nearest kept band is used for left out bands
+    result = []
+    for band in (self.red_band, self.green_band, self.blue_band):
+      if self._bands != None:
+        band = min(range(len(self._bands)), key=lambda i: abs(self._bands[i] - band))
+      result.append(min(band // self._band_binning, rows - 1))
+    return result
+
   def _check_temperature_loop(self):
     if self._verbose:
       print("FX: Monitoring temperature")
     while True:
-      if self.en_temp_warning:
-        # genicam.genapi seems to have some problem with threads, cannot use self.get/set here :(
-        self.gvcp.writereg(0x00300068, 0) # Temperature_Update
-        fpga_temp = self.gvcp.readreg(0x00300050, float) # Temperature_FPGA
-        processor_temp = self.gvcp.readreg(0x00300040, float) # Temperature_Proc
-        if fpga_temp >= self.temp_fpga_warn:
-          print(f"WARNING: FPGA temperature over {self.temp_fpga_warn} °C")
-        if processor_temp >= self.temp_pcb_warn:
-          print(f"WARNING: Processor PCB temperature over {self.temp_pcb_warn} °C")
+      # Temperature events replace polling while the message channel is open
+      if self.en_temp_warning and not (self.temp_event_id != None and self.is_message_channel_open):
+        self._check_temperature()
       self._temp_stop.wait(self.temp_update_rate)
       if self._temp_stop.is_set():
         break
 
+  def _check_temperature(self) -> None:
+    # genicam.genapi seems to have some problem with threads, cannot use self.get/set here :(
+    self.gvcp.writereg(0x00300068, 0) # Temperature_Update
+    fpga_temp = self.gvcp.readreg(0x00300050, float) # Temperature_FPGA
+    processor_temp = self.gvcp.readreg(0x00300040, float) # Temperature_Proc
+    if fpga_temp >= self.temp_fpga_warn:
+      print(f"WARNING: FPGA temperature over {self.temp_fpga_warn} °C")
+    if processor_temp >= self.temp_pcb_warn:
+      print(f"WARNING: Processor PCB temperature over {self.temp_pcb_warn} °C")
+
+  def _handle_temperature_event(self, event: GVCPEvent) -> None:
+    if self.en_temp_warning:
+      self._check_temperature()
+
   def _check_connection(self) -> None:
     if not self.is_open:
       raise NotConnectedError(f"Not connected, ")
@@ -524,4 +992,4 @@ class FXBase(DiscoverableGigeDevice):
   def _set_gev_scda(self, address: int) -> None:
     # Error in FX17e device description XML, this register actually writable so we need to set it the hard way
     scda_addr = self.get_node("GevSCDAReg").address
-    self.gvcp.writereg(scda_addr, address)
+    self._gc_port.write(scda_addr, uint32_to_bytes(address))
@@ -0,0 +1,108 @@
+"""
+  Index of the nodes of a device description file. GenAPI node map only lists its nodes, so looking
+  a node up by register address or searching by name would go through all of them every time.
+"""
+from typing import Union
+
+from genicam.genapi import IValue, ICategory, IPort, GenericException, ELinkType
+
+from ...spectralcam.utils import is_feature
+
+NGRAM_MAX = 3 # Longest substring that is indexed as is, longer searches intersect these
+
+class NodeIndex:
+  """Maps of nodes by name and by register address, and a substring index of feature names."""
+
+  def __init__(self, nodes: list[IValue]) -> None:
+    self.nodes = list(nodes)
+    self.features: list[IValue] = []
+    self.categories: list[ICategory] = []
+    self._by_name: dict[str, IValue] = {}
+    self._by_address: dict[int, IValue] = {}
+    self._computed: list[IValue] = [] # Registers whose address depends on other features
+    self._ngrams: dict[str, set[int]] = {} # Substring: indices to self.features
+    self._lower_names: list[str] = []
+
+    for node in self.nodes:
+      self._by_name[node.node.name] = node
+      if type(node) == ICategory:
+        self.categories.append(node)
+      if hasattr(type(node), "address"):
+        self._add_address(node)
+      if is_feature(node):
+        self._add_feature(node)
+
+  def get(self, name: str) -> Union[IValue, None]:
+    """
+    Get a node by its name.
+
+    :param name: Full name of the node (case sensitive)
+    :returns: Node or None if the name does not match any node
+    """
+    return self._by_name.get(name)
+
+  def get_by_address(self, address: int) -> Union[IValue, None]:
+    """
+    Get a node by its register address. Addresses that depend on other features (pAddress, pIndex)
+    are resolved with the current values of those features.
+
+    :param address: Register address
+    :returns: First node with the address or None if no node has the address
+    """
+    node = self._by_address.get(address)
+    if node != None:
+      return node
+    for node in self._computed:
+      try:
+        if node.address == address:
+          return node
+      except GenericException:
+        continue # Address cannot be resolved now, e.g. the register is not available
+    return None
+
+  def search(self, search: str) -> list[IValue]:
+    """
+    Search features whose name contains a string, case insensitive.
+
+    :param search: String to search
+    :returns: Matching features in the order of the device description file
+    """
+    search = search.lower()
+    if len(search) == 0:
+      return list(self.features)
+    if len(search) <= NGRAM_MAX:
+      matches = self._ngrams.get(search, set())
+    else:
+      # Names containing all substrings of the search are candidates, check them
+      candidates = None
+      for i in range(len(search) - NGRAM_MAX + 1):
+        ngram_matches = self._ngrams.get(search[i:i + NGRAM_MAX], set())
+        candidates = ngram_matches if candidates == None else candidates & ngram_matches
+        if len(candidates) == 0:
+          break
+      matches = [i for i in candidates if search in self._lower_names[i]]
+    return [self.features[i] for i in sorted(matches)]
+
+  def _add_address(self, node: IValue) -> None:
+    # Only registers have an address, a register is its own terminal node
+    if node.node.name not in [terminal.node.name for terminal in node.node._get_children(ELinkType.ctTerminalNodes)]:
+      return
+    # Nodes that are read to get the address (pAddress, pIndex) are children of the register
+    if any(not isinstance(child, IPort) for child in node.node._get_children(ELinkType.ctReadingChildren)):
+      self._computed.append(node) # Resolved on lookup, reading it now would also need the camera
+      return
+    try:
+      address = node.address
+    except GenericException:
+      return
+    if address not in self._by_address:
+      self._by_address[address] = node
+
+  def _add_feature(self, feature: IValue) -> None:
+    i = len(self.features)
+    name = feature.node.name.lower()
+    self.features.append(feature)
+    self._lower_names.append(name)
+    for length in range(1, NGRAM_MAX + 1):
+      for start in range(len(name) - length + 1):
+        self._ngrams.setdefault(name[start:start + length], set()).add(i)
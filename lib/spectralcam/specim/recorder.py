@@ -0,0 +1,215 @@
+"""
+  Recorders collect acquired frames into a single (lines, bands, width) cube. FXBase appends frames
+  to a recorder from the GVSP receiver thread and finishes it when the acquisition is stopped.
+"""
+import os
+from typing import Union
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_SIZE = 128 # Fixed size, so that the header can be rewritten when the final shape is known
+
+class FrameRecorder:
+  """Base class for frame recorders."""
+
+  meta: np.ndarray = None
+  """
+  Metadata of the last finished recording, block ID and camera timestamp of each frame, shape (lines, 2).
+  None if the frames were recorded without metadata.
+  """
+
+  _meta_recorder: "MemoryRecorder" = None
+  _meta_valid = True
+
+  def __len__(self) -> int:
+    raise NotImplementedError("This is an abstract class - concrete implementation is required")
+
+  def append(self, frame: np.ndarray, meta: np.ndarray = None) -> None:
+    """
+    Add a frame to the end of the recording.
+
+    :param frame: Frame to add, shape (bands, width)
+    :param meta: Block ID and camera timestamp of the frame, shape (2,), optional
+    :returns: None
+    """
+    self.extend(frame[np.newaxis], None if meta is None else meta[np.newaxis])
+
+  def extend(self, frames: np.ndarray, meta: np.ndarray = None) -> None:
+    """
+    Add a block of frames to the end of the recording.
+
+    :param frames: Frames to add, shape (lines, bands, width)
+    :param meta: Block ID and camera timestamp of each frame, shape (lines, 2), optional
+    :returns: None
+    :raises ValueError: Metadata does not match the frames
+    """
+    raise NotImplementedError("This is an abstract class - concrete implementation is required")
+
+  def finish(self) -> np.ndarray:
+    """
+    Finish the recording. The recorder is empty afterwards and can be used again.
+
+    :returns: Recorded frames, shape (lines, bands, width)
+    """
+    raise NotImplementedError("This is an abstract class - concrete implementation is required")
+
+  def clear(self) -> None:
+    """Discard all recorded frames."""
+    raise NotImplementedError("This is an abstract class - concrete implementation is required")
+
+  def _extend_meta(self, frames: np.ndarray, meta: Union[np.ndarray, None], lines: int = 1024) -> None:
+    # Metadata is kept only if every frame of the recording has it
+    if meta is None:
+      self._meta_valid = False
+      self._meta_recorder = None
+      return
+    if len(meta) != len(frames):
+      raise ValueError(f"Got metadata for {len(meta)} frames, expected {len(frames)}")
+    if self._meta_valid:
+      if self._meta_recorder is None:
+        self._meta_recorder = MemoryRecorder(lines)
+      self._meta_recorder.extend(meta)
+
+  def _finish_meta(self) -> None:
+    self.meta = self._meta_recorder.finish() if self._meta_recorder is not None else None
+    self._clear_meta()
+
+  def _clear_meta(self) -> None:
+    self._meta_recorder = None
+    self._meta_valid = True
+
+class MemoryRecorder(FrameRecorder):
+  """
+  Record frames into a preallocated contiguous array in memory.
+
+  Frames are copied straight into their final place, so there is no need to stack them when the
+  recording is finished. When the array is full it is grown in place (realloc), which on most
+  systems does not copy the data either.
+  """
+
+  def __init__(self, lines: int = 1024, growth: float = 1.5) -> None:
+    """
+    :param lines: Number of lines to preallocate, e.g. an estimate of the scan length
+    :param growth: Factor to grow the array with when it is full
+    """
+    if lines < 1:
+      raise ValueError("Number of preallocated lines must be greater than 0")
+    if growth <= 1.0:
+      raise ValueError("Growth factor must be greater than 1")
+    self.lines = lines
+    self.growth = growth
+    self._data: np.ndarray = None
+    self._count = 0
+
+  def __len__(self) -> int:
+    return self._count
+
+  @property
+  def capacity(self) -> int:
+    """Number of lines that fit in the currently allocated array."""
+    return 0 if self._data is None else len(self._data)
+
+  def extend(self, frames: np.ndarray, meta: np.ndarray = None) -> None:
+    self._extend_meta(frames, meta, self.lines)
+    count = self._count + len(frames)
+    if self._data is None:
+      self._data = np.empty((max(self.lines, count),) + frames.shape[1:], frames.dtype)
+    elif count > len(self._data):
+      self._resize(max(round(self._count * self.growth), count))
+    self._data[self._count:count] = frames
+    self._count = count
+
+  def finish(self) -> np.ndarray:
+    self._finish_meta()
+    if self._data is None:
+      return np.empty((0,))
+    self._resize(self._count)
+    data = self._data
+    self._data = None
+    self._count = 0
+    return data
+
+  def clear(self) -> None:
+    self._data = None
+    self._count = 0
+    self._clear_meta()
+
+  def _resize(self, lines: int) -> None:
+    # The array is never shared before finish(), so it is safe to skip the reference check
+    self._data.resize((lines,) + self._data.shape[1:], refcheck=False)
+
+class DiskRecorder(FrameRecorder):
+  """
+  Stream frames straight into a .npy file on disk.
+
+  Frames are written to the file as they arrive and the header is finalised when the recording is
+  finished, so the length of a recording is limited by disk space rather than memory. The finished
+  recording is returned as a read-only memory map of the file. Metadata of the frames is saved next
+  to it in a .meta.npy file.
+  """
+
+  def __init__(self, path: str) -> None:
+    """
+    :param path: Path of the .npy file to write, an existing file will be overwritten
+    """
+    self.path = path
+    self.meta_path = os.path.splitext(path)[0] + ".meta.npy"
+    self._file = open(path, "wb")
+    self._dtype: np.dtype = None
+    self._shape: tuple[int, ...] = None
+    self._count = 0
+
+  def __len__(self) -> int:
+    return self._count
+
+  def extend(self, frames: np.ndarray, meta: np.ndarray = None) -> None:
+    if self._dtype is None:
+      self._dtype = frames.dtype
+      self._shape = frames.shape[1:]
+      self._write_header()
+    elif frames.shape[1:] != self._shape:
+      raise ValueError(f"Frame shape {frames.shape[1:]} does not match recorded shape {self._shape}")
+    self._extend_meta(frames, meta)
+    self._file.write(np.ascontiguousarray(frames, self._dtype))
+    self._count += len(frames)
+
+  def finish(self) -> np.ndarray:
+    if self._file is None:
+      raise ValueError("Recording is already finished")
+    self._finish_meta()
+    if self.meta is not None:
+      np.save(self.meta_path, self.meta)
+    if self._dtype is None:
+      self._file.close()
+      self._file = None
+      np.save(self.path, np.empty((0,)))
+      return np.load(self.path)
+    self._file.seek(0)
+    self._write_header()
+    self._file.close()
+    self._file = None
+    if self._count == 0:
+      return np.load(self.path)
+    return np.load(self.path, mmap_mode="r")
+
+  def clear(self) -> None:
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+      os.remove(self.path)
+    self._count = 0
+    self._clear_meta()
+
+  def _write_header(self) -> None:
+    header = {
+      "descr": np.lib.format.dtype_to_descr(self._dtype),
+      "fortran_order": False,
+      "shape": (self._count,) + self._shape,
+    }
+    header_str = repr(header).encode("latin1")
+    header_len = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2
+    if len(header_str) >= header_len:
+      raise ValueError("Frame shape is too large for the .npy header")
+    header_str = header_str.ljust(header_len - 1) + b"\n"
+    self._file.write(NPY_MAGIC + header_len.to_bytes(2, "little") + header_str)
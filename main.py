@@ -11,21 +11,10 @@ from pathlib import Path
 from time import sleep
 import camera_connector
 from calibration import calibrate_white
-from calibration_helpers import calibrate_hyperspectral_scan
-import numpy as np
 import datetime
 
 log_path = Path(__file__).parent / "app_log.txt"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(log_path, mode="w"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
 # Redirect print to logging
 print = lambda *args, **kwargs: logging.info(" ".join(map(str, args)))
 
@@ -103,6 +92,7 @@ async def handler(websocket):
                                         if (cam_was_scanning["cam_was_scanning"] == True):
                                             cam_was_scanning["cam_was_scanning"] = False
                                             path = camera_connector.extract_data()
+                                            from calibration_helpers import calibrate_hyperspectral_scan
                                             
                                             calibrate_hyperspectral_scan(path, "calibration/white_gemiddelde.npy", "calibration/black_gemiddelde.npy")
                             
@@ -133,6 +123,15 @@ def launchWebsocketServerOnNewThread():
     asyncio.run(launchWebsocketServer())
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(log_path, mode="w"),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
     # the daemon=True flag ensures the thread will exit when the main program exits.
     websocketServerThread = threading.Thread(target=launchWebsocketServerOnNewThread, daemon=True)
     websocketServerThread.start()
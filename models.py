@@ -2,7 +2,8 @@ import queue
 
 camera_data = {
     "system": None,                 # GCSystem
-    "cam": None                     # FXBase
+    "cam": None,                    # FXBase
+    "scan_path": None               # str, file the current scan is recorded to
 }
 
 app_context = {
@@ -9,9 +9,6 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.patches import Rectangle
 from matplotlib.widgets import RectangleSelector
-from PIL import Image
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 
 class HyperspectralViewer(QMainWindow):
     def __init__(self):
@@ -724,6 +721,10 @@ class HyperspectralViewer(QMainWindow):
             return
         
         try:
+            # sklearn laden duurt lang, daarom wordt het pas bij de eerste PCA geïmporteerd
+            from sklearn.decomposition import PCA
+            from sklearn.preprocessing import StandardScaler
+
             # Toon voortgangsinformatie
             self.info_label.setText("PCA berekenen voor ui vs. gras detectie, even geduld...")
             QApplication.processEvents()  # Ververs UI tijdens berekening
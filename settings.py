@@ -1,7 +1,9 @@
 from tkinter import Toplevel, Frame, ttk, StringVar, Entry, Label, Button
 from models import camera_data, app_context
-from lib.spectralcam.specim import FXBase
-from genicam.genapi import AccessException
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from lib.spectralcam.specim import FXBase
 
 def open_settings_window(master):
     def item_selected(event):
@@ -19,6 +21,18 @@ def open_settings_window(master):
     container = Frame(win)
     container.pack(fill="both", expand=True)
 
+    cam: "FXBase" = camera_data["cam"]
+
+    # Profiles: type a name and save, or pick a saved one and apply
+    profile_row = Frame(container)
+    profile_row.pack(fill="x", padx=5, pady=5)
+    Label(profile_row, text="Profile").pack(side="left")
+    profile_var = StringVar()
+    profile_box = ttk.Combobox(profile_row, textvariable=profile_var, values=cam.list_profiles())
+    profile_box.pack(side="left", fill="x", expand=True, padx=5)
+    Button(profile_row, text="Apply", command=lambda: apply_profile()).pack(side="left")
+    Button(profile_row, text="Save", command=lambda: save_profile()).pack(side="left")
+
     search_var = StringVar()
     search_entry = Entry(container, textvariable=search_var)
     search_entry.pack(fill="x", padx=5, pady=5)
@@ -33,17 +47,14 @@ def open_settings_window(master):
     scrollbar.pack(side="right", fill="y")
 
     all_rows = []
-    cam: FXBase = camera_data["cam"]
 
     def load_settings():
         all_rows.clear()
         features = cam.get_features()
+        values = cam.get_many(features)
         for feature in sorted(features, key=lambda f: str(f.node.name).lower()):
-            try:
-                value = cam.get(feature)
-            except Exception:
-                value = "N/A"
-            all_rows.append((str(feature.node.name), str(value)))
+            value = values[feature.node.name]
+            all_rows.append((str(feature.node.name), "N/A" if value is None else str(value)))
         search_var.set("")
         update_treeview(all_rows)
 
@@ -58,16 +69,23 @@ def open_settings_window(master):
         if not query:
             filtered = all_rows
         else:
+            # Names are matched with the feature index of the camera, search prints matches by default
+            print_info, cam.print_info = cam.print_info, False
+            try:
+                matching_names = {str(feature.node.name) for feature in cam.search(query)}
+            finally:
+                cam.print_info = print_info
             filtered = [
                 (setting, value)
                 for setting, value in all_rows
-                if query in setting.lower() or query in value.lower()
+                if setting in matching_names or query in value.lower()
             ]
         update_treeview(filtered)
 
     search_var.trace_add("write", on_search)
 
     def confirm_set_value(setting, value, window):
+        from genicam.genapi import AccessException
         try:
             cam.set(setting, value)
             window.destroy()
@@ -77,6 +95,27 @@ def open_settings_window(master):
         except Exception as error:
             app_context["message_box"](error)
 
+    def save_profile():
+        name = profile_var.get().strip()
+        if not name:
+            app_context["message_box"]("Give a name for the profile")
+            return
+        try:
+            cam.save_profile(name)
+            profile_box["values"] = cam.list_profiles()
+        except Exception as error:
+            app_context["message_box"](error)
+
+    def apply_profile():
+        name = profile_var.get().strip()
+        if not name:
+            return
+        try:
+            cam.apply_profile(name)
+        except Exception as error:
+            app_context["message_box"](error)
+        load_settings()
+
     def set_value_window(setting, value):
         win = Toplevel(master)
         win.title("Set Value")
@@ -0,0 +1,103 @@
+"""
+Measure how long importing the apps takes. Every module is imported in a fresh interpreter with
+"python -X importtime", which reports the import cost of every module it loads. Modules that are
+imported on first use (e.g. the camera library, torch, detectron2) do not show up here.
+
+Usage:
+    python startup_benchmark.py                  # main, app and the helper apps
+    python startup_benchmark.py trainer --top 20 # one module, more details
+    python startup_benchmark.py --budget 1.0     # exit with 1 if a module takes longer or fails to import
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_MODULES = ["main", "app", "settings", "calibration", "camera_connector", "trainer", "pca", "scan_editor"]
+
+def measure_import(module, runs=3):
+    """
+    Import a module in a new interpreter and collect import times.
+
+    Returns (wall time in seconds, list of (cumulative us, self us, depth, name) of the direct imports
+    of the module, list of all (self us, name), error message or None). The fastest of the runs is
+    used so that a cold disk cache does not count.
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=Path(__file__).parent, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+            return wall, [], [], error
+        if best is None or wall < best[0]:
+            best = (wall, result.stderr)
+
+    wall, output = best
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(cumulative_us), int(self_us), depth, name.strip()))
+
+    # Children are listed right before their parent, interpreter startup (site) is left out
+    ends = [i for i, entry in enumerate(entries) if entry[3] == module]
+    if len(ends) == 0:
+        return wall, [], [], None # Imported during interpreter startup already
+    end = ends[-1]
+    module_depth = entries[end][2]
+    start = end
+    while start > 0 and entries[start - 1][2] > module_depth:
+        start -= 1
+    subtree = entries[start:end + 1]
+    direct = [entry for entry in subtree if entry[2] == module_depth + 1]
+    all_modules = [(self_us, name) for _, self_us, _, name in subtree]
+    return wall, direct, all_modules, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the apps")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--top", type=int, default=8, help="Number of most expensive imports to show")
+    parser.add_argument("--runs", type=int, default=3, help="Imports per module, the fastest is shown")
+    parser.add_argument("--budget", type=float, default=None, help="Fail if a module takes longer (seconds) or cannot be imported")
+    args = parser.parse_args()
+
+    baseline, _, _, _ = measure_import("sys", args.runs) # Interpreter startup without the apps
+    print(f"Interpreter startup: {baseline * 1000:.0f} ms\n")
+
+    over_budget = []
+    failed = []
+    for module in args.modules:
+        wall, direct, all_modules, error = measure_import(module, args.runs)
+        if error is not None:
+            print(f"{module}: cannot import ({error})\n")
+            failed.append(module)
+            continue
+        import_time = max(wall - baseline, 0)
+        if args.budget is not None and import_time > args.budget:
+            over_budget.append(module)
+        print(f"{module}: {import_time * 1000:.0f} ms ({len(all_modules)} modules)")
+        print("  Direct imports (cumulative):")
+        for cumulative_us, _, _, name in sorted(direct, reverse=True)[:args.top]:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+        print("  Slowest modules (self):")
+        for self_us, name in sorted(all_modules, reverse=True)[:args.top]:
+            print(f"    {self_us / 1000:8.1f} ms  {name}")
+        print()
+
+    if len(failed) > 0:
+        print(f"Cannot import: {', '.join(failed)}")
+    if len(over_budget) > 0:
+        print(f"Over budget of {args.budget} s: {', '.join(over_budget)}")
+    if args.budget is not None and len(failed) + len(over_budget) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,7 @@
 import os
 import sys
 import logging
-import cv2
 import numpy as np
-import torch
 import yaml
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QFileDialog, QSpinBox, 
@@ -12,15 +10,8 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget, QVB
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize
 
-# Detectron2 imports
-from detectron2 import model_zoo
-from detectron2.engine import DefaultPredictor, DefaultTrainer
-from detectron2.config import get_cfg
-from detectron2.data import MetadataCatalog, DatasetCatalog
-from detectron2.utils.visualizer import Visualizer, ColorMode
-from detectron2.data.datasets import register_coco_instances
-from detectron2.data import detection_utils as utils
-from detectron2.data.transforms import RandomFlip, RandomBrightness, RandomContrast, RandomRotation
+# torch, cv2 and detectron2 take seconds to import, so they are imported in the methods that use
+# them and the window opens right away. GpuCheckThread imports torch in the background.
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -63,6 +54,12 @@ class TrainingThread(QThread):
     def run(self):
         try:
             self.progress_update.emit("Preparing training environment...")
+            import torch
+            from detectron2 import model_zoo
+            from detectron2.engine import DefaultTrainer
+            from detectron2.config import get_cfg
+            from detectron2.data import MetadataCatalog, DatasetCatalog
+            from detectron2.data.datasets import register_coco_instances
             
             # Register the custom dataset
             dataset_name = "my_dataset_train"
@@ -168,6 +165,14 @@ class PredictionThread(QThread):
         
     def run(self):
         try:
+            import cv2
+            import torch
+            from detectron2 import model_zoo
+            from detectron2.engine import DefaultPredictor
+            from detectron2.config import get_cfg
+            from detectron2.data import MetadataCatalog, DatasetCatalog
+            from detectron2.data.datasets import register_coco_instances
+
             # Find the model config file
             model_dir = os.path.dirname(self.model_path)
             config_path = os.path.join(model_dir, "model_config.yaml")
@@ -240,6 +245,19 @@ class PredictionThread(QThread):
             self.error_signal.emit(error_msg)
 
 
+class GpuCheckThread(QThread):
+    """Thread for checking if a GPU is available, importing torch takes a while"""
+    result_ready = pyqtSignal(bool)
+
+    def run(self):
+        try:
+            import torch
+            self.result_ready.emit(torch.cuda.is_available())
+        except Exception as e:
+            logger.error(f"GPU check failed: {str(e)}")
+            self.result_ready.emit(False)
+
+
 class MainWindow(QMainWindow):
     """Main GUI window for training and prediction"""
     def __init__(self):
@@ -249,6 +267,11 @@ class MainWindow(QMainWindow):
         
         # Initialize UI
         self.init_ui()
+
+        # GPU availability is shown when known
+        self.gpu_check_thread = GpuCheckThread()
+        self.gpu_check_thread.result_ready.connect(self.gpu_checked)
+        self.gpu_check_thread.start()
         
     def init_ui(self):
         # Create tab widget
@@ -327,10 +350,9 @@ class MainWindow(QMainWindow):
         self.use_gpu_check.setChecked(True)
         params_layout.addWidget(self.use_gpu_check, 3, 1)
         
-        # Show if GPU is available
-        gpu_available = torch.cuda.is_available()
-        gpu_info = f"GPU {'available' if gpu_available else 'not available'}"
-        params_layout.addWidget(QLabel(gpu_info), 3, 2)
+        # Show if GPU is available, see gpu_checked
+        self.gpu_info_label = QLabel("Checking GPU...")
+        params_layout.addWidget(self.gpu_info_label, 3, 2)
         
         # Class names
         params_layout.addWidget(QLabel("Classes:"), 4, 0)
@@ -392,10 +414,9 @@ class MainWindow(QMainWindow):
         self.device_combo.addItems(["CPU", "GPU"])
         device_layout.addWidget(self.device_combo)
         
-        if not torch.cuda.is_available():
-            self.device_combo.setCurrentText("CPU")
-            self.device_combo.setEnabled(False)
-            device_layout.addWidget(QLabel("(GPU not available)"))
+        self.device_combo.setEnabled(False) # Until GPU check is done, see gpu_checked
+        self.device_info_label = QLabel("")
+        device_layout.addWidget(self.device_info_label)
         
         layout.addLayout(device_layout)
         
@@ -436,6 +457,15 @@ class MainWindow(QMainWindow):
         
         self.prediction_tab.setLayout(layout)
         
+    def gpu_checked(self, gpu_available):
+        """Show the result of the GPU check"""
+        self.gpu_info_label.setText(f"GPU {'available' if gpu_available else 'not available'}")
+        if gpu_available:
+            self.device_combo.setEnabled(True)
+        else:
+            self.device_combo.setCurrentText("CPU")
+            self.device_info_label.setText("(GPU not available)")
+
     def select_train_dir(self):
         """Select training data directory"""
         dir_path = QFileDialog.getExistingDirectory(self, "Select Training Data Directory", self.train_dir_edit.text())
@@ -570,6 +600,9 @@ class MainWindow(QMainWindow):
         
     def display_prediction(self, image, outputs):
         """Display prediction results"""
+        from detectron2.data import MetadataCatalog
+        from detectron2.utils.visualizer import Visualizer, ColorMode
+
         # Create visualization
         dataset_name = "my_dataset_train"
         if dataset_name in MetadataCatalog.list():